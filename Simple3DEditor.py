@@ -8,6 +8,12 @@ Starting App
 
 Take Help
     py Simple3DEditor --help
+Startup timing
+    py Simple3DEditor --profile-startup
+Batch processing without a window
+    py Simple3DEditor stats scene.s3d
+    py Simple3DEditor convert --to s3d *.pkl
+    py Simple3DEditor render -o thumbs *.s3d
 Features
     "Save" button to save scene as pkl file
     "Load" button to load scene from pkl file
@@ -34,10 +40,13 @@ To add contur you need plane to add it to this plane to border it
 Of course you can rotate and zoom scene by scroll bars
 """
 import sys
-import subprocess
+import time
+
+CLI_COMMANDS = ("render", "convert", "stats")
 
 
 def main():
+    start = time.perf_counter()
     args = sys.argv[1:]
 
     if "--help" in args:
@@ -46,7 +55,18 @@ def main():
                 print(line)
         return
 
-    subprocess.run(["python", "src/QtApp.py"])
+    if args and args[0] in CLI_COMMANDS:
+        # пакетная обработка без окна, Qt не загружается
+        from src.SceneCli import main as cli_main
+        sys.exit(cli_main(args))
+
+    # тяжелые модули (Qt, OpenGL, numpy) грузятся только при запуске окна
+    from src.QtApp import StartupProfile, run_app
+    startup_profile = None
+    if "--profile-startup" in args:
+        startup_profile = StartupProfile(start)
+        startup_profile.mark("imports")
+    sys.exit(run_app(startup_profile))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Сравнение пакетного и последовательного (по одной грани) расчета нормалей
+граней Figure3.
+Запуск из корня репозитория:
+    python -m benchmarks.bench_figure3_normals
+"""
+import time
+
+from src.Simple2DEditorImports import *
+
+SPHERE_SIZES = {
+    100: (10, 10),
+    1000: (40, 25),
+    10000: (100, 100),
+}
+
+
+def build_sphere(faces_count):
+    n, m = SPHERE_SIZES[faces_count]
+    scene = Scene(lambda: None)
+    scene.add_sphere_nm("sphere", n, m, 1.0)
+    return scene.entities["sphere"]
+
+
+def invalidate_normals(figure):
+    for face in figure.faces:
+        face.normal_cache = None
+
+
+def per_face_path(figure):
+    center = figure.get_center()
+    for face in figure.faces:
+        face.get_normal(center)
+
+
+def batch_path(figure):
+    figure.update_face_normals()
+
+
+def measure(func, figure, repeats):
+    best = None
+    for _ in range(repeats):
+        invalidate_normals(figure)
+        start = time.perf_counter()
+        func(figure)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    print("{:>8} {:>12} {:>12} {:>8}".format(
+        "faces", "per face, ms", "batch, ms", "speedup"
+    ))
+    for faces_count in SPHERE_SIZES:
+        figure = build_sphere(faces_count)
+        repeats = 5 if faces_count < 10000 else 2
+        per_face = measure(per_face_path, figure, repeats)
+        batch = measure(batch_path, figure, repeats)
+        print("{:>8} {:>12.2f} {:>12.2f} {:>7.1f}x".format(
+            len(figure.faces), per_face * 1000, batch * 1000,
+            per_face / batch
+        ))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,348 @@
+#!/usr/bin/env python3
+"""
+Набор замеров производительности: построение сцены, кадр, сохранение и
+загрузка, перестроение дерева сущностей.
+Результаты пишутся в JSON и сравниваются с сохраненной базой.
+Запуск из корня репозитория:
+    python -m benchmarks.bench_suite --quick
+    python -m benchmarks.bench_suite --save-baseline
+    python -m benchmarks.bench_suite --threshold 0.25 -o results.json
+"""
+import argparse
+import statistics
+import tempfile
+import time
+
+from src.Simple2DEditorImports import *
+from src.SceneCli import create_renderer, fit_camera_distance
+
+# после хаба: OpenGL.platform перекрыл бы модуль
+import platform
+
+BASELINE_PATH = Path(__file__).parent / "baseline.json"
+DEFAULT_THRESHOLD = 0.2
+FRAME_SIZE = 256
+# сфера n x m дает n * m граней
+SPHERE_BY_FACES = {
+    10000: (100, 100),
+    100000: (400, 250),
+}
+
+
+class BenchmarkSkipped(Exception):
+    # замер невозможен на этой машине, например нет контекста OpenGL
+    pass
+
+
+# QApplication живет, пока идут замеры
+applications = []
+# имя -> (функция подготовки, полные параметры, параметры для --quick)
+BENCHMARKS = dict()
+
+
+def benchmark(params: list, quick_params: list = None):
+    def register(setup: callable):
+        BENCHMARKS[setup.__name__.removeprefix("bench_")] = (
+            setup, params, params[:1] if quick_params is None else quick_params
+        )
+        return setup
+    return register
+
+
+def build_sphere_scene(faces_count: int):
+    scene = Scene()
+    scene.add_light("light", 16384, 100.0, 100.0, 100.0)
+    scene.add_sphere_nm("sphere", *SPHERE_BY_FACES[faces_count], 1.0)
+    return scene
+
+
+# функция подготовки возвращает замеряемую функцию без аргументов
+
+@benchmark([(10, 10), (40, 25), (100, 100)], [(10, 10), (40, 25)])
+def bench_add_sphere_nm(n_m):
+    def run():
+        Scene().add_sphere_nm("sphere", *n_m, 1.0)
+    return run
+
+
+@benchmark([100, 1000])
+def bench_add_prism_n_bulk(count):
+    def run():
+        scene = Scene()
+        with scene.batch():
+            for i in range(count):
+                scene.add_prism_n("prism_{}".format(i), 6, 1.0, 2.0)
+    return run
+
+
+def create_gl_frame(faces_count: int):
+    scene = build_sphere_scene(faces_count)
+    try:
+        renderer = create_renderer("gl", FRAME_SIZE, FRAME_SIZE)
+    except (Exception, SystemExit) as e:
+        # программный растеризатор paintGL не использует: не сравнимо
+        raise BenchmarkSkipped("нет контекста OpenGL: {}".format(e))
+    camera = (0.0, math.pi / 9, fit_camera_distance(scene.entities))
+    # отсечение как в GLWidget при включенном use_culling
+    frustum = Frustum.from_camera(*camera, 1.0)
+    renderer.draw_frame(scene.entities, camera, frustum)
+    return scene, renderer, camera, frustum
+
+
+@benchmark([10000, 100000])
+def bench_frame(faces_count):
+    # установившийся кадр paintGL: буферы уже в видеопамяти
+    scene, renderer, camera, frustum = create_gl_frame(faces_count)
+
+    def run():
+        renderer.draw_frame(scene.entities, camera, frustum)
+    return run
+
+
+@benchmark([10000, 100000])
+def bench_frame_rebuild(faces_count):
+    # кадр после правки сцены: упаковка и загрузка буферов
+    scene, renderer, camera, frustum = create_gl_frame(faces_count)
+
+    def run():
+        renderer.renderer.invalidate()
+        renderer.draw_frame(scene.entities, camera, frustum)
+    return run
+
+
+@benchmark([10000, 100000])
+def bench_software_render(faces_count):
+    # render --backend software, не кадр окна
+    scene = build_sphere_scene(faces_count)
+    renderer = create_renderer("software", FRAME_SIZE, FRAME_SIZE)
+    camera = (0.0, math.pi / 9, fit_camera_distance(scene.entities))
+
+    def run():
+        renderer.render(scene.entities, camera)
+    return run
+
+
+@benchmark([10000, 100000])
+def bench_frustum_cull(faces_count):
+    scene = build_sphere_scene(faces_count)
+    culler = FrustumCuller()
+    # камера вплотную к сфере: видна часть граней
+    frustum = Frustum.from_camera(0.0, math.pi / 9, 1.5, 1.0)
+
+    def run():
+        culler.cull(scene.entities, frustum)
+    return run
+
+
+def sphere_triangles(n: int, m: int):
+    # n x m четырехугольников широта-долгота, по два треугольника
+    angles = np.linspace(0.0, 2 * math.pi, n, endpoint=False)
+    heights = np.linspace(0.01, math.pi - 0.01, m + 1)
+    grid = np.stack([
+        np.outer(np.sin(heights), np.cos(angles)),
+        np.outer(np.sin(heights), np.sin(angles)),
+        np.outer(np.cos(heights), np.ones(n)),
+    ], axis=-1)
+    a, b = grid[:-1], grid[1:]
+    c, d = np.roll(b, -1, axis=1), np.roll(a, -1, axis=1)
+    return np.concatenate([
+        np.stack([a, b, c], axis=2).reshape(-1, 3, 3),
+        np.stack([a, c, d], axis=2).reshape(-1, 3, 3),
+    ])
+
+
+@benchmark([1000000], [100000])
+def bench_pick(triangles_count):
+    # иерархия строится из массива: сцена в 1M граней собиралась бы минуты;
+    # за замер 100 лучей
+    n = int(math.sqrt(triangles_count))
+    bvh = BoundingVolumeHierarchy(sphere_triangles(n, n // 2))
+    rays = [
+        camera_ray(0.0, math.pi / 9, 5.0, 1.0, x, y)
+        for x, y in np.random.default_rng(0).uniform(-0.3, 0.3, (100, 2))
+    ]
+
+    def run():
+        for origin, direction in rays:
+            bvh.intersect(origin, direction)
+    return run
+
+
+@benchmark(
+    [(".s3d", 10000), (".pkl", 10000), (".s3d", 100000)],
+    [(".s3d", 10000), (".pkl", 10000)]
+)
+def bench_save_load(suffix_faces):
+    suffix, faces_count = suffix_faces
+    scene = build_sphere_scene(faces_count)
+    # каталог удаляется вместе с замыканием, когда замер закончен
+    directory = tempfile.TemporaryDirectory()
+
+    def run():
+        path = Path(directory.name) / ("scene" + suffix)
+        scene.save_entities_to_file(path)
+        Scene().load_entities_from_file(path)
+    return run
+
+
+@benchmark([10000])
+def bench_entity_tree_rebuild(faces_count):
+    window = create_main_window()
+    scene = build_sphere_scene(faces_count)
+    window.scene.replace_entities(scene.entities, scene.point_store)
+
+    def run():
+        window.update_entity_tree()
+    return run
+
+
+def create_main_window():
+    if not (os.environ.get("DISPLAY") or os.environ.get("WAYLAND_DISPLAY")):
+        os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    if QApplication.instance() is None:
+        applications.append(QApplication(sys.argv[:1]))
+    return MainWindow()
+
+
+def renderer_backend():
+    # без окна и контекста результаты кадра разных бэкендов не сравнимы
+    try:
+        return type(create_renderer("auto", 1, 1)).__name__
+    except Exception as e:
+        return type(e).__name__
+
+
+def case_name(name: str, param):
+    if isinstance(param, tuple):
+        param = ",".join(str(el) for el in param)
+    return "{}[{}]".format(name, param)
+
+
+def measure(run: callable, repeats: int):
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - start)
+    return {
+        "min": min(times),
+        "median": statistics.median(times),
+        "repeats": repeats,
+    }
+
+
+def run_suite(
+    pattern: str = None, quick: bool = False, repeats: int = 3,
+    report: callable = None
+):
+    results = dict()
+    for name, (setup, params, quick_params) in BENCHMARKS.items():
+        for param in quick_params if quick else params:
+            case = case_name(name, param)
+            if pattern is not None and pattern not in case:
+                continue
+            try:
+                results[case] = measure(setup(param), repeats)
+            except BenchmarkSkipped as e:
+                results[case] = {"skipped": str(e)}
+            if report is not None:
+                report(case, results[case])
+    return results
+
+
+def machine_info():
+    return {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "renderer": renderer_backend(),
+    }
+
+
+def compare_results(results: dict, baseline: dict, threshold: float):
+    # сравниваются минимумы: они меньше всего зависят от шума
+    regressions = dict()
+    for case, result in results.items():
+        if "skipped" in result or "min" not in baseline.get(case, {}):
+            continue
+        ratio = result["min"] / baseline[case]["min"]
+        if ratio > 1 + threshold:
+            regressions[case] = ratio
+    return regressions
+
+
+def read_results(path: Path):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def write_results(path: Path, results: dict):
+    data = {"machine": machine_info(), "results": results}
+    write_file_atomic(
+        path, lambda f: f.write(json.dumps(data, indent=2).encode("utf-8"))
+    )
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks.bench_suite",
+        description="Замеры производительности редактора"
+    )
+    parser.add_argument("-k", dest="pattern", default=None,
+                        help="только замеры, в имени которых есть строка")
+    parser.add_argument("--quick", action="store_true",
+                        help="только малые параметры")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("-o", "--output", type=Path, default=None)
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="допустимое замедление, доля от базы")
+    return parser
+
+
+def report_result(case: str, result: dict):
+    if "skipped" in result:
+        print("{:<36} пропущен: {}".format(case, result["skipped"]))
+        return
+    print("{:<36} {:>10.2f} {:>10.2f}".format(
+        case, result["min"] * 1000, result["median"] * 1000
+    ))
+
+
+def main(args: list[str] = None):
+    options = build_parser().parse_args(args)
+    print("{:<36} {:>10} {:>10}".format("case", "min, ms", "median, ms"))
+    results = run_suite(
+        options.pattern, options.quick, options.repeats,
+        report_result
+    )
+    if options.output is not None:
+        write_results(options.output, results)
+    if options.save_baseline:
+        write_results(options.baseline, results)
+        return 0
+    if not options.baseline.exists():
+        # без базы сравнивать не с чем: это не успешная проверка
+        print(
+            "Нет базы {}, сначала запустите с --save-baseline".format(
+                options.baseline
+            ),
+            file=sys.stderr
+        )
+        return 2
+    baseline = read_results(options.baseline)
+    if baseline["machine"] != machine_info():
+        print("База снята на другой машине", file=sys.stderr)
+    regressions = compare_results(
+        results, baseline["results"], options.threshold
+    )
+    for case, ratio in regressions.items():
+        print("{}: медленнее базы в {:.2f} раза".format(case, ratio),
+              file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
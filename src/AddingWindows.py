@@ -1,4 +1,4 @@
-from src.QtApp import *
+from src.Simple2DEditorImports import *
 
 
 class ListStringsInput(QWidget):
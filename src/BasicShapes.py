@@ -1,14 +1,51 @@
-from src.Simple2DEditorImports import *
+from collections import defaultdict
+from contextlib import contextmanager
+
+import numpy as np
+
+
+class DrawBackendMissingException(Exception):
+    def __init__(self):
+        super().__init__("Модуль отрисовки не подключен")
+
+
+draw_backend = None
+
+
+def set_draw_backend(backend):
+    # backend - модуль или объект с функциями draw_point, draw_segment, ...
+    global draw_backend
+    draw_backend = backend
+
+
+def get_draw_backend():
+    if draw_backend is None:
+        raise DrawBackendMissingException()
+    return draw_backend
+
+
+@contextmanager
+def using_draw_backend(backend):
+    global draw_backend
+    previous = draw_backend
+    draw_backend = backend
+    try:
+        yield backend
+    finally:
+        draw_backend = previous
 
 
 class BasicShape:
     def __init__(self, name: str):
         self.name = name
+        self.init_coordinates()
+        self.child_shapes = None
+        self.last_update = 0
+
+    def init_coordinates(self):
         self.x = 0.0
         self.y = 0.0
         self.z = 0.0
-        self.child_shapes = None
-        self.last_update = 0
 
     def set(self, **kwargs):
         if self.last_update == kwargs["upd"]:
@@ -28,6 +65,18 @@ class BasicShape:
     def update_coordinates(self):
         pass
 
+    def edited_points(self):
+        # точки, которые сдвигает правка x, y, z этой сущности
+        return []
+
+    def refresh(self):
+        # пересчет после изменения того, из чего сущность построена
+        return False
+
+    def get_bounding_box(self):
+        # None - без границ, такую сущность рисуют всегда
+        return None
+
     def get_edit_params(self):
         return [
             ("x", "X", float),
@@ -41,29 +90,168 @@ class BasicShape:
     def add_children(self, list_children):
         self.child_shapes = list(list_children)
 
+    def dependencies(self):
+        # ребра графа сцены: из чего сущность построена
+        return self.child_shapes or []
+
+    def unlink(self):
+        pass
+
+
+class CoordinateStore:
+    def __init__(self, capacity: int = 64, dtype=float):
+        self.data = np.zeros(shape=(max(capacity, 1), 3), dtype=dtype)
+        self.size = 0
+        self.free_indices = []
+
+    def allocate(self, coordinates) -> int:
+        if self.free_indices:
+            index = self.free_indices.pop()
+        else:
+            if self.size == len(self.data):
+                self.grow(2 * len(self.data))
+            index = self.size
+            self.size += 1
+        self.data[index] = coordinates
+        return index
+
+    def allocate_many(self, coordinates) -> np.ndarray:
+        coordinates = np.asarray(coordinates).reshape(-1, 3)
+        start = self.size
+        if start + len(coordinates) > len(self.data):
+            self.grow(max(2 * len(self.data), start + len(coordinates)))
+        self.data[start:start + len(coordinates)] = coordinates
+        self.size += len(coordinates)
+        return np.arange(start, self.size)
+
+    def release(self, index: int):
+        self.data[index] = 0.0
+        self.free_indices.append(index)
+
+    def grow(self, capacity: int):
+        data = np.zeros(shape=(capacity, 3), dtype=self.data.dtype)
+        data[:self.size] = self.data[:self.size]
+        self.data = data
+
+    @property
+    def used(self):
+        return self.data[:self.size]
+
+
+def coordinate_property(index):
+    def getter(self):
+        return float(self.store.data[self.index, index])
+
+    def setter(self, value):
+        self.store.data[self.index, index] = value
+        self.notify_moved()
+
+    return property(getter, setter)
+
 
 class Point(BasicShape):
-    def __init__(self, name: str, x: float, y: float, z: float):
+    x = coordinate_property(0)
+    y = coordinate_property(1)
+    z = coordinate_property(2)
+
+    def __init__(
+            self, name: str, x: float, y: float, z: float,
+            store: CoordinateStore = None
+    ):
+        self.store = CoordinateStore(capacity=1) if store is None else store
+        self.index = self.store.allocate((x, y, z))
+        self.dependents = []
         super().__init__(name)
-        self.x = x
-        self.y = y
-        self.z = z
+
+    @classmethod
+    def from_store(cls, name: str, store: CoordinateStore, index: int):
+        point = cls.__new__(cls)
+        point.store = store
+        point.index = index
+        point.dependents = []
+        BasicShape.__init__(point, name)
+        return point
+
+    def init_coordinates(self):
+        # координаты уже лежат в хранилище
+        pass
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        for tag in ("store", "index", "dependents"):
+            del state[tag]
+        state["coordinates"] = self.coordinates.tolist()
+        return state
+
+    def __setstate__(self, state):
+        coordinates = state.pop("coordinates", None)
+        if coordinates is None:
+            # старые сохранения хранят x, y, z прямо в __dict__
+            coordinates = [state.pop(tag, 0.0) for tag in ("x", "y", "z")]
+        self.__dict__.update(state)
+        self.store = CoordinateStore(capacity=1)
+        self.index = self.store.allocate(coordinates)
+        self.dependents = []
+
+    @property
+    def coordinates(self):
+        # view в общий массив сцены: не хранить, он меняется при росте
+        return self.store.data[self.index]
+
+    def move_to_store(self, store: CoordinateStore):
+        index = store.allocate(self.coordinates)
+        self.store.release(self.index)
+        self.store = store
+        self.index = index
+
+    def add_dependent(self, shape):
+        if shape not in self.dependents:
+            self.dependents.append(shape)
+
+    def remove_dependent(self, shape):
+        if shape in self.dependents:
+            self.dependents.remove(shape)
+
+    def notify_moved(self):
+        for shape in self.dependents:
+            shape.on_point_moved(self)
+
+    def move_to(self, coordinates):
+        self.store.data[self.index] = coordinates
+        self.notify_moved()
+
+    def edited_points(self):
+        return [self]
 
     def draw_shape(self):
-        draw_point(self)
+        get_draw_backend().draw_point(self)
+
+    def get_bounding_box(self):
+        return self.coordinates, self.coordinates
 
     @property
     def np_vector(self):
-        return np.array([self.x, self.y, self.z])
+        # только для чтения: запись в обход move_to не дошла бы до
+        # зависимых фигур; после роста хранилища это снимок старых данных
+        vector = self.coordinates.view()
+        vector.flags.writeable = False
+        return vector
 
 
 class LightPoint(Point):
-    def __init__(self, name: str, lightGL, x: float, y: float, z: float):
-        super().__init__(name, x, y, z)
+    def __init__(
+            self, name: str, lightGL, x: float, y: float, z: float,
+            store: CoordinateStore = None
+    ):
+        super().__init__(name, x, y, z, store)
         self.lightGL = lightGL
 
     def draw_shape(self):
-        draw_light(self)
+        get_draw_backend().draw_light(self)
+
+    def get_bounding_box(self):
+        # свет влияет на всю сцену, отсекать его нельзя
+        return None
 
 
 class Segment(BasicShape):
@@ -73,7 +261,15 @@ class Segment(BasicShape):
         self.point_b = b
 
     def draw_shape(self):
-        draw_segment(self)
+        get_draw_backend().draw_segment(self)
+
+    def edited_points(self):
+        return [self.point_a, self.point_b]
+
+    def get_bounding_box(self):
+        a = self.point_a.coordinates
+        b = self.point_b.coordinates
+        return np.minimum(a, b), np.maximum(a, b)
 
     def update_coordinates(self):
         if self.point_a.last_update != self.last_update:
@@ -95,9 +291,62 @@ class Figure2(BasicShape):
     def __init__(self, name: str, points: list[Point]):
         super().__init__(name)
         self.points = list(points)
+        self.centroid_cache = None
+        self.normal_cache = None
+        self.bounds_cache = None
+        self.link_points()
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.centroid_cache = None
+        self.normal_cache = None
+        self.bounds_cache = None
+        self.link_points()
+
+    def link_points(self):
+        for point in self.points:
+            point.add_dependent(self)
+
+    def unlink(self):
+        for point in self.points:
+            point.remove_dependent(self)
+
+    def on_point_moved(self, point):
+        self.normal_cache = None
+        self.bounds_cache = None
+
+    def update_normal(self):
+        self.centroid_cache, self.normal_cache = find_centroid_and_normal(
+            np.array([el.coordinates for el in self.points], dtype=float)
+        )
+
+    def get_centroid(self):
+        if self.normal_cache is None:
+            self.update_normal()
+        return self.centroid_cache
+
+    def get_normal(self, inner_point=None):
+        if self.normal_cache is None:
+            self.update_normal()
+        if inner_point is None or np.dot(
+                self.centroid_cache - inner_point, self.normal_cache
+        ) > 0:
+            return self.normal_cache
+        return self.normal_cache * (-1)
 
     def draw_shape(self):
-        draw_figure2(self)
+        get_draw_backend().draw_figure2(self)
+
+    def get_bounding_box(self):
+        if self.bounds_cache is None:
+            coordinates = gather_coordinates([self.points])[0]
+            self.bounds_cache = (
+                coordinates.min(axis=0), coordinates.max(axis=0)
+            )
+        return self.bounds_cache
+
+    def edited_points(self):
+        return list(self.points)
 
     def update_coordinates(self):
         for point in self.points:
@@ -123,51 +372,127 @@ class Plane(BasicShape):
         super().__init__(name)
         self.normal = np.array([0.0, 0.0, 0.0], dtype=float)
         self.point_a = point
-        self.redraw = 0
         self.contur = []
+        self.is_dirty = True
+        self.revision = 0
+        self.link_points()
+
+    def __setstate__(self, state):
+        # в старых сохранениях счетчик случайной перерисовки
+        state.pop("redraw", None)
+        self.__dict__.update(state)
+        self.is_dirty = True
+        self.revision = 0
+        self.link_points()
+
+    def defining_points(self):
+        return [self.point_a]
+
+    def link_points(self):
+        for point in self.defining_points():
+            point.add_dependent(self)
+
+    def unlink(self):
+        for point in self.defining_points():
+            point.remove_dependent(self)
+
+    def on_point_moved(self, point):
+        self.is_dirty = True
+
+    def needs_update(self):
+        return self.is_dirty
+
+    def refresh(self):
+        if not self.needs_update():
+            return False
+        self.update_plane()
+        # проекция контура двигает точки, флаг снимается после нее
+        self.is_dirty = False
+        self.revision += 1
+        return True
 
     def update_plane(self):
-        pass
+        self.update_contur()
+
+    def contur_points(self):
+        return [
+            point for contur in self.contur for segment in contur.segments
+            for point in (segment.point_a, segment.point_b)
+        ]
+
+    def edited_points(self):
+        return [self.point_a]
+
+    def dependencies(self):
+        # отрезки контура не в child_shapes, но их точки лежат на плоскости
+        return list(self.child_shapes or []) + [
+            segment.name for contur in self.contur
+            for segment in contur.segments
+        ]
 
     def update_contur(self):
-        for contur in self.contur:
-            for i in range(len(contur.segments)):
-                new_z = self.count_new_z(
-                    contur.segments[i].point_a.x,
-                    contur.segments[i].point_a.y
-                )
-                contur.segments[i].point_a.z = new_z
-                contur.segments[i - 1].point_b.z = new_z
+        points = list(dict.fromkeys(self.contur_points()))
+        length = np.dot(self.normal, self.normal)
+        if not points or length == 0:
+            # вырожденная плоскость: проецировать не на что
+            return []
+        # все вершины сразу, вдоль нормали - годится и для вертикальных
+        coordinates = gather_coordinates([points])[0]
+        distances = (coordinates - self.point_a.coordinates) @ self.normal
+        projected = coordinates - np.outer(distances / length, self.normal)
+        changed = np.any(projected != coordinates, axis=1)
+        moved = [el for el, flag in zip(points, changed.tolist()) if flag]
+        scatter_coordinates(moved, projected[changed])
+        return moved
+
+    def infinite_corners(self, size: float):
+        # квадрат в плоскости с центром в ближайшей к началу координат точке
+        length = np.linalg.norm(self.normal)
+        if length == 0:
+            return None
+        normal = self.normal / length
+        center = normal * np.dot(self.point_a.coordinates, normal)
+        axis = np.zeros(3)
+        axis[np.argmin(np.abs(normal))] = 1.0
+        u = np.cross(normal, axis)
+        u *= size / np.linalg.norm(u)
+        v = np.cross(normal, u)
+        return np.array(
+            [center + u + v, center + u - v, center - u - v, center - u + v]
+        )
 
     def add_contur(self, contur: Contur2):
         self.contur.append(contur)
         self.update_contur()
 
-    def count_new_z(self, x, y):
-        return sum(
-            [
-                (self.point_a.x - x) * self.normal[0],
-                (self.point_a.y - y) * self.normal[1],
-                self.point_a.z * self.normal[2]
-            ]
-        ) / self.normal[2]
-
     def draw_shape(self):
-        self.redraw -= 1
-        if self.redraw < 0:
-            self.redraw = np.random.randint(5, 15)
-            self.update_plane()
-        draw_plane(self)
+        self.refresh()
+        get_draw_backend().draw_plane(self)
+
+    def get_bounding_box(self):
+        # плоскость без контура бесконечна
+        self.refresh()
+        points = self.contur_points()
+        if not points:
+            return None
+        coordinates = gather_coordinates([points])[0]
+        return coordinates.min(axis=0), coordinates.max(axis=0)
 
 
 class PlaneBy3Point(Plane):
     def __init__(
             self, name: str, point_a: Point, point_b: Point, point_c: Point
     ):
-        super().__init__(name, point_a)
         self.point_b = point_b
         self.point_c = point_c
-        self.update_plane()
+        super().__init__(name, point_a)
+        self.refresh()
+
+    def defining_points(self):
+        return [self.point_a, self.point_b, self.point_c]
+
+    def edited_points(self):
+        return self.defining_points()
 
     def update_plane(self):
         self.normal = np.cross(
@@ -191,17 +516,23 @@ class PlaneBy3Point(Plane):
 class PlaneByPointSegment(PlaneBy3Point):
     def __init__(self, name: str, point: Point, segment: Segment):
         super().__init__(name, point, segment.point_a, segment.point_b)
-        self.update_plane()
 
 
 class PlaneByPlane(Plane):
     def __init__(self, name: str, point: Point, plane: Plane):
         super().__init__(name, point)
         self.base_plane = plane
-        self.update_plane()
+        self.base_revision = None
+        self.refresh()
+
+    def needs_update(self):
+        # плоскость-основа пересчитывается первой
+        self.base_plane.refresh()
+        return self.is_dirty or self.base_revision != self.base_plane.revision
 
     def update_plane(self):
         self.normal = np.array(self.base_plane.normal)
+        self.base_revision = self.base_plane.revision
         self.update_contur()
 
     def update_coordinates(self):
@@ -222,10 +553,54 @@ class Figure3(BasicShape):
         self.points = set()
         self.init_points()
 
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        for tag in (
+                "point_indices", "point_array", "points_sum",
+                "bounds_min", "bounds_max", "bounds_dirty"
+        ):
+            state.pop(tag, None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.init_points()
+
     def init_points(self):
         for face in self.faces:
             for point in face.points:
                 self.points.add(point)
+        self.point_indices = {
+            point: i for i, point in enumerate(self.points)
+        }
+        self.point_array = np.array(
+            [point.coordinates for point in self.point_indices], dtype=float
+        ).reshape(-1, 3)
+        self.points_sum = self.point_array.sum(axis=0)
+        self.bounds_min = None
+        self.bounds_max = None
+        self.bounds_dirty = True
+        for point in self.point_indices:
+            point.add_dependent(self)
+
+    def unlink(self):
+        for point in self.point_indices:
+            point.remove_dependent(self)
+
+    def on_point_moved(self, point):
+        index = self.point_indices[point]
+        old = self.point_array[index].copy()
+        new = np.array(point.coordinates, dtype=float)
+        self.point_array[index] = new
+        self.points_sum += new - old
+        if self.bounds_dirty:
+            return
+        if np.any(old == self.bounds_min) or np.any(old == self.bounds_max):
+            # точка лежала на границе - пересчитаем при запросе
+            self.bounds_dirty = True
+            return
+        np.minimum(self.bounds_min, new, out=self.bounds_min)
+        np.maximum(self.bounds_max, new, out=self.bounds_max)
 
     def update_coordinates(self):
         for face in self.faces:
@@ -236,8 +611,78 @@ class Figure3(BasicShape):
         self.y = 0.0
         self.z = 0.0
 
+    def update_face_normals(self):
+        stale_faces = defaultdict(list)
+        for face in self.faces:
+            if face.normal_cache is None:
+                stale_faces[len(face.points)].append(face)
+        if not stale_faces:
+            return
+        center = self.get_center()
+        for faces in stale_faces.values():
+            centroids, normals = find_centroids_and_normals(
+                gather_coordinates([face.points for face in faces])
+            )
+            outside = np.einsum("ij,ij->i", centroids - center, normals) > 0
+            normals[~outside] *= -1
+            for face, centroid, normal in zip(faces, centroids, normals):
+                face.centroid_cache = centroid
+                face.normal_cache = normal
+
     def draw_shape(self):
-        draw_figure3(self)
+        get_draw_backend().draw_figure3(self)
+
+    def edited_points(self):
+        return list(self.point_indices)
 
     def get_center(self):
-        return np.mean([p.np_vector for p in self.points], axis=0)
+        return self.points_sum / len(self.point_array)
+
+    def get_bounding_box(self):
+        if self.bounds_dirty:
+            self.bounds_min = self.point_array.min(axis=0)
+            self.bounds_max = self.point_array.max(axis=0)
+            self.bounds_dirty = False
+        return self.bounds_min, self.bounds_max
+
+
+def gather_coordinates(points_lists):
+    store = points_lists[0][0].store
+    if all(el.store is store for points in points_lists for el in points):
+        return store.data[
+            np.array([[el.index for el in points] for points in points_lists])
+        ]
+    return np.array(
+        [[el.coordinates for el in points] for points in points_lists],
+        dtype=float
+    )
+
+
+def scatter_coordinates(points: list[Point], coordinates):
+    # обратная к gather_coordinates запись с уведомлением зависимых
+    if not points:
+        return
+    store = points[0].store
+    if all(el.store is store for el in points):
+        store.data[[el.index for el in points]] = coordinates
+        for point in points:
+            point.notify_moved()
+        return
+    for point, value in zip(points, coordinates):
+        point.move_to(value)
+
+
+def find_centroid_and_normal(points):
+    centroid = np.mean(points, axis=0)
+    _, _, right_matrix = np.linalg.svd(points - centroid)
+    return centroid, right_matrix[2]
+
+
+def find_centroids_and_normals(points_stack):
+    # метод Ньюэлла для всех граней сразу, points_stack: (faces, points, 3)
+    centroids = np.mean(points_stack, axis=1)
+    centered = points_stack - centroids[:, None]
+    normals = np.cross(centered, np.roll(centered, -1, axis=1)).sum(axis=1)
+    lengths = np.linalg.norm(normals, axis=1, keepdims=True)
+    np.divide(normals, lengths, out=normals, where=lengths > 0)
+    return centroids, normals
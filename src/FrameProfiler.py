@@ -0,0 +1,194 @@
+import csv
+import json
+import time
+from collections import deque, defaultdict
+from contextlib import contextmanager
+from pathlib import Path
+
+# кадров в кольцевом буфере, примерно 4 секунды при 60 fps
+PROFILER_CAPACITY = 240
+HUD_LINES = 6
+
+
+class FrameStats:
+    def __init__(self, frame: int):
+        self.frame = frame
+        self.start = time.perf_counter()
+        self.total = 0.0
+        self.phases = defaultdict(float)
+        # имя сущности -> (тип, секунды)
+        self.entities = dict()
+        # счетчики кадра: смены состояния GL и т.п.
+        self.counters = dict()
+
+
+class FrameProfiler:
+    def __init__(self, capacity: int = PROFILER_CAPACITY, sync=None):
+        # sync дожидается выполнения команд, иначе мерится только отправка
+        self.sync = sync
+        self.enabled = False
+        self.frames = deque(maxlen=capacity)
+        self.current = None
+
+    def set_enabled(self, enabled: bool):
+        self.enabled = enabled
+        self.current = None
+
+    def clear(self):
+        self.frames.clear()
+        self.current = None
+
+    def begin_frame(self, frame: int):
+        self.current = FrameStats(frame)
+
+    def end_frame(self):
+        if self.current is None:
+            return
+        self.current.total = time.perf_counter() - self.current.start
+        self.frames.append(self.current)
+        self.current = None
+
+    @contextmanager
+    def phase(self, name: str):
+        if self.current is None:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            if self.sync is not None:
+                self.sync()
+            self.current.phases[name] += time.perf_counter() - start
+
+    def record_entity(self, entity, seconds: float, own_phase=True):
+        # own_phase=False: время уже вошло в объемлющую фазу
+        if self.current is None:
+            return
+        kind = type(entity).__name__
+        _, previous = self.current.entities.get(entity.name, (kind, 0.0))
+        self.current.entities[entity.name] = (kind, previous + seconds)
+        if own_phase:
+            self.current.phases["draw " + kind] += seconds
+
+    def record_batch(self, entities: list, weights, seconds: float):
+        if self.current is None:
+            return
+        total = sum(weights)
+        if total == 0:
+            return
+        for entity, weight in zip(entities, weights):
+            if weight:
+                self.record_entity(entity, seconds * weight / total, False)
+
+    def record_counters(self, counters: dict):
+        if self.current is None:
+            return
+        for name, value in counters.items():
+            self.current.counters[name] = (
+                self.current.counters.get(name, 0) + value
+            )
+
+    def mean_frame_time(self):
+        if not self.frames:
+            return 0.0
+        return sum(el.total for el in self.frames) / len(self.frames)
+
+    def frames_per_second(self):
+        if len(self.frames) < 2:
+            return 0.0
+        elapsed = self.frames[-1].start - self.frames[0].start
+        return (len(self.frames) - 1) / elapsed if elapsed > 0 else 0.0
+
+    def mean_phases(self):
+        totals = defaultdict(float)
+        for frame in self.frames:
+            for name, seconds in frame.phases.items():
+                totals[name] += seconds
+        return {
+            name: seconds / len(self.frames)
+            for name, seconds in totals.items()
+        }
+
+    def mean_counters(self):
+        totals = defaultdict(int)
+        for frame in self.frames:
+            for name, value in frame.counters.items():
+                totals[name] += value
+        return {
+            name: value / len(self.frames) for name, value in totals.items()
+        }
+
+    def top_entities(self, count: int = 10):
+        # средняя стоимость по кадрам, в которых сущность рисовалась
+        totals = dict()
+        for frame in self.frames:
+            for name, (kind, seconds) in frame.entities.items():
+                _, total, frames = totals.get(name, (kind, 0.0, 0))
+                totals[name] = (kind, total + seconds, frames + 1)
+        result = [
+            (name, kind, total / frames)
+            for name, (kind, total, frames) in totals.items()
+        ]
+        result.sort(key=lambda el: el[2], reverse=True)
+        return result[:count]
+
+    def summary_lines(self, entity_count: int = 10):
+        lines = ["кадр {:.2f} мс, {:.1f} fps".format(
+            self.mean_frame_time() * 1000, self.frames_per_second()
+        )]
+        phases = sorted(
+            self.mean_phases().items(), key=lambda el: el[1], reverse=True
+        )
+        for name, seconds in phases:
+            lines.append("  {:<20}{:8.2f} мс".format(name, seconds * 1000))
+        for name, value in self.mean_counters().items():
+            lines.append("  {:<20}{:8.1f}".format(name, value))
+        entities = self.top_entities(entity_count)
+        if entities:
+            lines.append("дороже всего:")
+        for name, kind, seconds in entities:
+            lines.append("  {:<20}{:<10}{:8.3f} мс".format(
+                name, kind, seconds * 1000
+            ))
+        return lines
+
+    def hud_lines(self):
+        return self.summary_lines(0)[:HUD_LINES]
+
+    def to_records(self):
+        return [
+            {
+                "frame": frame.frame,
+                "total": frame.total,
+                "phases": dict(frame.phases),
+                "counters": dict(frame.counters),
+                "entities": {
+                    name: {"type": kind, "time": seconds}
+                    for name, (kind, seconds) in frame.entities.items()
+                },
+            }
+            for frame in self.frames
+        ]
+
+    def export_json(self, path: Path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"frames": self.to_records()}, f, indent=1)
+
+    def export_csv(self, path: Path):
+        # одна строка на фазу или сущность кадра, время в секундах
+        with open(path, "w", encoding="utf-8", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["frame", "section", "name", "type", "time"])
+            for frame in self.frames:
+                writer.writerow(
+                    [frame.frame, "frame", "total", "", frame.total]
+                )
+                for name, seconds in frame.phases.items():
+                    writer.writerow([frame.frame, "phase", name, "", seconds])
+                for name, value in frame.counters.items():
+                    writer.writerow([frame.frame, "counter", name, "", value])
+                for name, (kind, seconds) in frame.entities.items():
+                    writer.writerow(
+                        [frame.frame, "entity", name, kind, seconds]
+                    )
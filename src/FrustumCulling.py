@@ -0,0 +1,107 @@
+import numpy as np
+
+from src.SceneCamera import (
+    FIELD_OF_VIEW, NEAR_PLANE, FAR_PLANE, perspective_matrix,
+    look_at_matrix, camera_eye
+)
+
+
+class Frustum:
+    def __init__(self, matrix):
+        # плоскости отсечения из произведения проекции и вида
+        # (Gribb, Hartmann), нормали смотрят внутрь
+        rows = np.asarray(matrix, dtype=float)
+        planes = np.array([
+            rows[3] + rows[0], rows[3] - rows[0],
+            rows[3] + rows[1], rows[3] - rows[1],
+            rows[3] + rows[2], rows[3] - rows[2],
+        ])
+        if not np.isfinite(planes).all():
+            # вырожденная камера (глаз в центре сцены): не отсекаем ничего
+            planes = np.zeros(shape=(0, 4), dtype=float)
+        self.normals = planes[:, :3]
+        self.offsets = planes[:, 3]
+
+    @classmethod
+    def from_camera(
+            cls, rotation: float, lifting: float, distance: float, aspect
+    ):
+        # та же камера, что set_camera задает через gluPerspective/gluLookAt
+        with np.errstate(invalid="ignore", divide="ignore"):
+            view = look_at_matrix(
+                camera_eye(rotation, lifting, distance),
+                [0.0, 0.0, 0.0], [0.0, 0.0, 1.0]
+            )
+        projection = perspective_matrix(
+            FIELD_OF_VIEW, aspect, NEAR_PLANE, FAR_PLANE
+        )
+        return cls(projection @ view)
+
+    def boxes_visible(self, lows, highs):
+        lows = np.asarray(lows, dtype=float).reshape(-1, 3)
+        highs = np.asarray(highs, dtype=float).reshape(-1, 3)
+        return self.centered_boxes_visible(
+            (lows + highs) / 2, (highs - lows) / 2
+        )
+
+    def centered_boxes_visible(self, centers, extents):
+        # коробка снаружи, если снаружи от какой-то плоскости ее угол,
+        # ближайший к внутренней стороне
+        distances = centers @ self.normals.T + self.offsets
+        radii = extents @ np.abs(self.normals).T
+        return (distances + radii >= 0).all(axis=1)
+
+
+class FrustumCuller:
+    def __init__(self):
+        self.culled_count = 0
+        self.drawn_count = 0
+        self.rebuild_count = 0
+        self.cache_hits = 0
+        self.invalidate()
+
+    def invalidate(self):
+        # как SceneBufferRenderer: габариты собираются заново после правки
+        self.is_dirty = True
+        self.cached_planes = None
+        self.cached_items = []
+
+    def rebuild(self, entities: dict):
+        self.items = list(entities.items())
+        boxes = [entity.get_bounding_box() for _, entity in self.items]
+        self.unbounded = np.array([box is None for box in boxes], dtype=bool)
+        lows = np.zeros(shape=(len(boxes), 3), dtype=float)
+        highs = np.zeros(shape=(len(boxes), 3), dtype=float)
+        for i, box in enumerate(boxes):
+            if box is not None:
+                lows[i], highs[i] = box
+        self.centers = (lows + highs) / 2
+        self.extents = (highs - lows) / 2
+        self.is_dirty = False
+        self.rebuild_count += 1
+
+    def cull(self, entities: dict, frustum: Frustum):
+        if self.is_dirty:
+            self.rebuild(entities)
+        planes = np.column_stack([frustum.normals, frustum.offsets])
+        if self.cached_planes is not None and np.array_equal(
+                planes, self.cached_planes
+        ):
+            # камера и сцена не менялись: прошлый результат
+            self.cache_hits += 1
+            return list(self.cached_items)
+        visible = self.unbounded | frustum.centered_boxes_visible(
+            self.centers, self.extents
+        )
+        indices = np.flatnonzero(visible).tolist()
+        self.drawn_count = len(indices)
+        self.culled_count = len(self.items) - self.drawn_count
+        self.cached_planes = planes
+        self.cached_items = [self.items[i] for i in indices]
+        return list(self.cached_items)
+
+    def frame_stats(self):
+        return {
+            "drawn entities": self.drawn_count,
+            "culled entities": self.culled_count,
+        }
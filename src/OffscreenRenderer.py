@@ -0,0 +1,65 @@
+from src.Simple2DEditorImports import *
+
+
+class OffscreenRenderException(Exception):
+    def __init__(self, message):
+        super().__init__("Отрисовка без окна невозможна: {}".format(message))
+
+
+def ensure_gui_application():
+    if QtGui.QGuiApplication.instance() is not None:
+        return QtGui.QGuiApplication.instance()
+    if not (os.environ.get("DISPLAY") or os.environ.get("WAYLAND_DISPLAY")):
+        # на сборочных машинах нет дисплея
+        os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    return QtGui.QGuiApplication(sys.argv[:1])
+
+
+class OffscreenGLRenderer:
+    def __init__(self, width: int, height: int):
+        self.width = width
+        self.height = height
+        self.application = ensure_gui_application()
+        surface_format = QtGui.QSurfaceFormat()
+        surface_format.setDepthBufferSize(24)
+        self.surface = QtGui.QOffscreenSurface()
+        self.surface.setFormat(surface_format)
+        self.surface.create()
+        self.context = QtGui.QOpenGLContext()
+        self.context.setFormat(surface_format)
+        if not self.context.create():
+            raise OffscreenRenderException("не создан контекст OpenGL")
+        if not self.context.makeCurrent(self.surface):
+            raise OffscreenRenderException("контекст OpenGL не активен")
+        self.framebuffer = QtGui.QOpenGLFramebufferObject(
+            width, height, QtGui.QOpenGLFramebufferObject.Depth
+        )
+        self.framebuffer.bind()
+        init_gl_state()
+        glViewport(0, 0, width, height)
+        self.renderer = SceneBufferRenderer()
+
+    def draw_frame(self, entities: dict, camera, frustum: Frustum = None):
+        # кадр как в paintGL: буферы пересобираются только после invalidate
+        self.context.makeCurrent(self.surface)
+        self.framebuffer.bind()
+        glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
+        set_camera(*camera, self.width / self.height)
+        self.renderer.draw(entities, None, frustum)
+        glFinish()
+
+    def render(self, entities: dict, camera):
+        # сцены задания разные, буферы прошлой не годятся
+        self.renderer.invalidate()
+        self.draw_frame(entities, camera)
+        glPixelStorei(GL_PACK_ALIGNMENT, 1)
+        buffer = glReadPixels(
+            0, 0, self.width, self.height, GL_RGB, GL_UNSIGNED_BYTE
+        )
+        return buffer, self.width, self.height
+
+    def release(self):
+        self.context.makeCurrent(self.surface)
+        self.renderer.release()
+        self.framebuffer.release()
+        self.context.doneCurrent()
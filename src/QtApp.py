@@ -1,10 +1,85 @@
 #!/usr/bin/env python3
 
 from src.Simple2DEditorImports import *
-from tkinter import filedialog
+import importlib.util
+import io
+import time
+
+
+def file_dialog():
+    # tkinter грузится только при первом открытии диалога
+    from tkinter import filedialog
+    return filedialog
+
+
+class StartupProfile:
+    def __init__(self, start: float = None):
+        self.start = time.perf_counter() if start is None else start
+        self.last = self.start
+        self.phases = []
+
+    def mark(self, phase: str):
+        now = time.perf_counter()
+        self.phases.append((phase, now - self.last))
+        self.last = now
+
+    def report(self, file=sys.stderr):
+        total = ("total", self.last - self.start)
+        for phase, seconds in self.phases + [total]:
+            print("{:<16}{:8.1f} ms".format(phase, seconds * 1000), file=file)
+
+
+def load_ui(widget, ui_path: Path):
+    # форма компилируется в .py один раз, дальше грузится как модуль
+    cache_path = ui_path.parent / "__pycache__" / (ui_path.stem + "_ui.py")
+    try:
+        if (
+                not cache_path.exists()
+                or cache_path.stat().st_mtime < ui_path.stat().st_mtime
+        ):
+            cache_path.parent.mkdir(exist_ok=True)
+            # недописанный модуль не должен остаться в кэше
+            source = io.StringIO()
+            uic.compileUi(str(ui_path), source)
+            write_file_atomic(
+                cache_path,
+                lambda f: f.write(source.getvalue().encode("utf-8"))
+            )
+    except OSError:
+        uic.loadUi(str(ui_path), widget)
+        return
+    spec = importlib.util.spec_from_file_location(
+        ui_path.stem + "_ui", cache_path
+    )
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    form_class = next(
+        value for name, value in vars(module).items()
+        if name.startswith("Ui_")
+    )
+    form = form_class()
+    form.setupUi(widget)
+    # как uic.loadUi: виджеты формы становятся атрибутами окна
+    for name, value in vars(form).items():
+        setattr(widget, name, value)
+
+
+UI_PATH = Path(__file__).resolve().parent.parent / "untitled.ui"
+# сцены с открытым журналом; после падения список не пуст
+OPEN_JOURNALS_KEY = "open_journals"
+# режим отрисовки: (буферы VBO, очередь состояний, дисплейные списки)
+RENDER_MODES = {
+    "Буферы": (True, False, False),
+    "Очередь + списки": (False, True, True),
+    "Очередь": (False, True, False),
+    "Списки": (False, False, True),
+    "Напрямую": (False, False, False),
+}
 
 
 class GLWidget(QGLWidget):
+    entity_picked = QtCore.pyqtSignal(str)
+
     def __init__(self, parent=None, scene=None):
         super(GLWidget, self).__init__(parent)
         self.scene = scene
@@ -20,51 +95,209 @@ class GLWidget(QGLWidget):
         self.basis_y = Segment("", self.basis_p_y, self.basis_p_0)
         self.basis_z = Segment("", self.basis_p_z, self.basis_p_0)
         self.basis_render_size = 0.3
+        self.renderer = SceneBufferRenderer()
+        self.display_lists = DisplayListCache()
+        self.render_queue = RenderQueue()
+        # переключается из дока профилировщика
+        (
+            self.retained_rendering,
+            self.use_render_queue,
+            self.use_display_lists,
+        ) = RENDER_MODES["Буферы"]
+        self.culler = FrustumCuller()
+        self.use_culling = True
+        self.picker = ScenePicker()
+        self.continuous_timer = QtCore.QTimer(self)
+        self.continuous_timer.timeout.connect(self.update)
+        self.startup_profile = None
+        self.profiler = FrameProfiler(sync=glFinish)
+        self.show_hud = False
 
     def initializeGL(self):
-        glEnable(GL_DEPTH_TEST)
-        glClearColor(0.3, 0.3, 0.3, 1.0)
-        glEnable(GL_LIGHTING)
-        glEnable(GL_LIGHT0)
-        glLightModelfv(GL_LIGHT_MODEL_AMBIENT, [1.0, 1.0, 1.0, 1])
-        # Настройка источника света
-        # Направленный свет
-        glLightfv(GL_LIGHT0, GL_POSITION, [-100.0, 100.0, 100.0, 0.0])
-        # Цвет рассеянного света
-        glLightfv(GL_LIGHT0, GL_DIFFUSE, [1.0, 1.0, 1.0, 1.0])
-        # Цвет зеркального отражения
-        glLightfv(GL_LIGHT0, GL_SPECULAR, [1.0, 1.0, 1.0, 1.0])
-        # включение нормалей
-        glEnable(GL_NORMALIZE)
-        glLineWidth(2.0)
-        glEnable(GL_LINE_SMOOTH)
-        glHint(GL_LINE_SMOOTH_HINT, GL_NICEST)
-        glPointSize(4.0)
-        glEnable(GL_POINT_SMOOTH)
-        glHint(GL_POINT_SMOOTH_HINT, GL_NICEST)
+        # вызывается и при пересоздании контекста
+        self.flush_gl_caches(context_lost=True)
+        init_gl_state()
+        if self.startup_profile is not None:
+            self.startup_profile.mark("gl init")
 
     def paintGL(self):
+        if self.profiler.enabled:
+            self.paint_profiled()
+        else:
+            self.paint_scene()
+            if self.show_hud:
+                self.draw_hud()
+        if self.startup_profile is not None:
+            glFinish()
+            self.startup_profile.mark("first frame")
+            self.startup_profile.report()
+            self.startup_profile = None
+
+    def paint_scene(self):
         glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
-        glMatrixMode(GL_PROJECTION)
-        glLoadIdentity()
-        gluPerspective(70, self.width() / self.height(), 0.1, 100.0)
-        gluLookAt(
-            math.cos(self.camera_rotation_angle) *
-            math.cos(self.camera_lifting_angle) * self.camera_distance,
-            math.sin(self.camera_rotation_angle) *
-            math.cos(self.camera_lifting_angle) * self.camera_distance,
-            math.sin(self.camera_lifting_angle) * self.camera_distance,
-            0, 0, 0,
-            0, 0, 1
+        set_camera(
+            self.camera_rotation_angle,
+            self.camera_lifting_angle,
+            self.camera_distance,
+            self.width() / self.height()
         )
         self.frame_counter += 1
 
         self.draw_basis()
-        for name, entity in self.scene.entities.items():
+        if self.retained_rendering:
+            # буферы отсекаются кусками, а не сущностями
+            self.renderer.draw(
+                self.scene.entities, None, self.camera_frustum()
+            )
+        elif self.use_render_queue:
+            self.display_lists.begin_frame()
+            self.enqueue_entities(self.visible_entities())
+            self.flush_render_queue()
+        else:
+            self.display_lists.begin_frame()
+            for name, entity in self.visible_entities():
+                self.draw_entity(name, entity)
+
+    def paint_profiled(self):
+        # тот же кадр, что paint_scene, но с замером каждой фазы
+        profiler = self.profiler
+        profiler.begin_frame(self.frame_counter + 1)
+        with profiler.phase("clear"):
+            glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
+            set_camera(
+                self.camera_rotation_angle,
+                self.camera_lifting_angle,
+                self.camera_distance,
+                self.width() / self.height()
+            )
+        self.frame_counter += 1
+        with profiler.phase("basis"):
+            self.draw_basis()
+        if self.retained_rendering:
+            self.renderer.draw(
+                self.scene.entities, profiler, self.camera_frustum()
+            )
+            profiler.record_counters(self.renderer.frame_stats())
+        elif self.use_render_queue:
+            self.display_lists.begin_frame()
+            with profiler.phase("cull"):
+                entities = self.visible_entities()
+            profiler.record_counters(self.culler.frame_stats())
+            # сущностям достается постановка в очередь и их вызовы GL
+            with profiler.phase("enqueue"):
+                self.enqueue_entities(entities, profiler)
+            with profiler.phase("queue"):
+                profiler.record_counters(self.flush_render_queue(profiler))
+        else:
+            self.display_lists.begin_frame()
+            with profiler.phase("cull"):
+                entities = self.visible_entities()
+            profiler.record_counters(self.culler.frame_stats())
+            for name, entity in entities:
+                start = time.perf_counter()
+                self.draw_entity(name, entity)
+                profiler.record_entity(entity, time.perf_counter() - start)
+            # сущности замерены без ожидания GPU, ожидание - отдельно
+            with profiler.phase("gpu"):
+                glFinish()
+        if self.show_hud:
+            self.draw_hud()
+        with profiler.phase("swap"):
+            self.swapBuffers()
+        profiler.end_frame()
+
+    def draw_entity(self, name: str, entity):
+        if self.use_display_lists:
+            self.display_lists.draw(entity, self.scene.graph.version(name))
+        else:
             entity.draw_shape()
 
+    def camera_frustum(self):
+        if not self.use_culling:
+            return None
+        return Frustum.from_camera(
+            self.camera_rotation_angle,
+            self.camera_lifting_angle,
+            self.camera_distance,
+            self.width() / self.height()
+        )
+
+    def visible_entities(self):
+        frustum = self.camera_frustum()
+        if frustum is None:
+            return list(self.scene.entities.items())
+        return self.culler.cull(self.scene.entities, frustum)
+
+    def enqueue_entities(self, entities: list, profiler=None):
+        with using_draw_backend(self.render_queue):
+            for name, entity in entities:
+                start = time.perf_counter()
+                self.render_queue.begin_entity(
+                    name, self.scene.graph.version(name), entity
+                )
+                entity.draw_shape()
+                if profiler is not None:
+                    profiler.record_entity(
+                        entity, time.perf_counter() - start, False
+                    )
+
+    def flush_render_queue(self, profiler=None):
+        return self.render_queue.flush(
+            self.display_lists if self.use_display_lists else None,
+            profiler
+        )
+
+    def flush_gl_caches(self, context_lost: bool = False):
+        if context_lost:
+            self.display_lists.forget()
+            self.renderer.forget()
+            return
+        self.makeCurrent()
+        self.display_lists.flush()
+        self.renderer.release()
+
+    def set_profiling(self, enabled: bool):
+        self.profiler.set_enabled(enabled)
+        # буфер переключается в paint_profiled, чтобы замерить swap
+        self.setAutoBufferSwap(not enabled)
         self.update()
 
+    def set_hud_visible(self, visible: bool):
+        self.show_hud = visible
+        self.update()
+
+    def draw_hud(self):
+        glDisable(GL_LIGHTING)
+        glColor3f(1.0, 1.0, 1.0)
+        for i, line in enumerate(self.profiler.hud_lines()):
+            self.renderText(8, 16 + 14 * i, line)
+        glEnable(GL_LIGHTING)
+
+    def pick_entity(self, x: float, y: float):
+        # x, y - координаты курсора в виджете, y вниз
+        width = max(self.width(), 1)
+        height = max(self.height(), 1)
+        origin, direction = camera_ray(
+            self.camera_rotation_angle,
+            self.camera_lifting_angle,
+            self.camera_distance,
+            width / height,
+            2 * x / width - 1,
+            1 - 2 * y / height
+        )
+        return self.picker.pick(
+            self.scene.entities, origin, direction,
+            pick_radius(self.camera_distance, height)
+        )
+
+    def mousePressEvent(self, event):
+        if event.button() != QtCore.Qt.LeftButton:
+            super().mousePressEvent(event)
+            return
+        name = self.pick_entity(event.x(), event.y())
+        if name is not None:
+            self.entity_picked.emit(name)
+
     def resizeGL(self, w, h):
         glViewport(0, 0, w, h)
 
@@ -77,27 +310,89 @@ class GLWidget(QGLWidget):
         draw_segment(self.basis_y, color=[0.0, 1.0, 0.0])
         draw_segment(self.basis_z, color=[0.0, 0.0, 1.0])
 
-    def save_to_png(self, filepath):
+    def read_frame(self):
         glPixelStorei(GL_PACK_ALIGNMENT, 1)
         viewport = glGetIntegerv(GL_VIEWPORT)
         buffer = glReadPixels(
             0, 0, viewport[2], viewport[3], GL_RGB, GL_UNSIGNED_BYTE
         )
-        image = Image.frombytes('RGB', (viewport[2], viewport[3]), buffer)
-        image = image.transpose(Image.FLIP_TOP_BOTTOM)
-        image.save(str(filepath), format='PNG')
+        return buffer, int(viewport[2]), int(viewport[3])
+
+    def save_to_png(self, filepath):
+        encode_png(*self.read_frame(), filepath, TaskProgress())
 
     def get_frame_count_since_startup(self):
         return self.frame_counter
 
+    def invalidate_scene(self, change=None):
+        self.renderer.invalidate()
+        self.culler.invalidate()
+        self.picker.invalidate(change)
+        # измененные перекомпилируются по версии, удаленные - выбросить
+        if change is None or change.is_reset:
+            self.display_lists.discard_all()
+        else:
+            self.display_lists.discard(change.removed)
+        self.update()
+
+    def set_render_mode(self, mode: str):
+        (
+            self.retained_rendering,
+            self.use_render_queue,
+            self.use_display_lists,
+        ) = RENDER_MODES[mode]
+        self.update()
+
+    def set_culling(self, enabled: bool):
+        self.use_culling = enabled
+        self.update()
+
+    def set_continuous_rendering(self, enabled: bool, max_fps: float = 60.0):
+        if not enabled:
+            self.continuous_timer.stop()
+            return
+        self.continuous_timer.start(max(1, int(1000 / max_fps)))
+
+    def is_continuous_rendering(self):
+        return self.continuous_timer.isActive()
+
+
+class MainThreadInvoker(QtCore.QObject):
+    called = QtCore.pyqtSignal(object)
 
-class MainWindow(QMainWindow):
     def __init__(self):
         super().__init__()
-        self.scene = Scene(self.scene_update)
+        self.called.connect(self.call)
+
+    @QtCore.pyqtSlot(object)
+    def call(self, function):
+        function()
+
+    def post(self, function):
+        # из рабочего потока сигнал доставляется через очередь событий
+        self.called.emit(function)
+
+
+class MainWindow(QMainWindow):
+    def __init__(
+            self, startup_profile: StartupProfile = None,
+            settings: QtCore.QSettings = None
+    ):
+        super().__init__()
+        if settings is None:
+            settings = QtCore.QSettings("SimpleBlender", "SimpleBlender")
+        self.settings = settings
+        self.scene = Scene()
+        self.scene.add_listener(self.scene_update)
+        self.tree_items = defaultdict(list)
+        self.apply_edit_handler = None
+        self.journal = None
+        self.invoker = MainThreadInvoker()
+        self.task_runner = SceneTaskRunner(self.invoker.post)
+        self.current_task = None
 
         self.openGL_widget = GLWidget(scene=self.scene)
-        uic.loadUi("untitled.ui", self)
+        load_ui(self, UI_PATH)
         self.setWindowTitle("SimpleBlender")
         self.OpenGLContainer.layout().addWidget(self.openGL_widget)
 
@@ -112,29 +407,73 @@ class MainWindow(QMainWindow):
         self.spinbox_zooming = QDoubleSpinBox()
         self.init_scroll()
         self.init_saving_field()
+        self.init_profiler_dock()
         self.init_scene()
+        self.openGL_widget.startup_profile = startup_profile
+        if startup_profile is not None:
+            startup_profile.mark("ui build")
 
-    def scene_update(self):
-        self.update_entity_tree()
+    def scene_update(self, change=None):
+        self.openGL_widget.invalidate_scene(change)
+        if change is None or change.is_reset:
+            self.update_entity_tree()
+        else:
+            self.apply_entity_tree_change(change)
 
     def update_entity_tree(self):
         self.entity_tree.clear()
+        self.tree_items.clear()
         for el in self.scene.entities:
             self.update_entity_tree_node(self.entity_tree, el)
 
+    def apply_entity_tree_change(self, change):
+        for name in change.removed:
+            for item in list(self.tree_items.get(name, [])):
+                parent = item.parent()
+                if parent is None:
+                    parent = self.entity_tree.invisibleRootItem()
+                parent.removeChild(item)
+                self.forget_entity_tree_node(item)
+        for name in change.modified:
+            entity = self.scene.entities[name]
+            links = change.links.get(name, entity.child_shapes or [])
+            for item in list(self.tree_items.get(name, [])):
+                item.setText(1, type(entity).__name__)
+                rows = [
+                    item.child(i).text(0) for i in range(item.childCount())
+                ]
+                if rows != links:
+                    self.rebuild_entity_tree_children(item, links)
+        for name in change.added:
+            self.update_entity_tree_node(self.entity_tree, name)
+
+    def rebuild_entity_tree_children(self, item, links):
+        # дети сменились, например set_children из журнала
+        for child in item.takeChildren():
+            self.forget_entity_tree_node(child)
+        for child_name in links:
+            self.update_entity_tree_node(item, child_name)
+
     def update_entity_tree_node(self, node, entity_name):
         new_node = QTreeWidgetItem(node)
         new_node.setText(0, entity_name)
         new_node.setText(1, type(self.scene.entities[entity_name]).__name__)
+        self.tree_items[entity_name].append(new_node)
         children = self.scene.entities[entity_name].child_shapes
         if children is not None:
             for child_name in children:
                 self.update_entity_tree_node(new_node, child_name)
 
+    def forget_entity_tree_node(self, item):
+        items = self.tree_items.get(item.text(0), [])
+        if item in items:
+            items.remove(item)
+        for i in range(item.childCount()):
+            self.forget_entity_tree_node(item.child(i))
+
     def init_tree_interaction(self):
         def tree_clicked(item, column):
             entity = self.scene.entities[item.text(0)]
-            options = entity.get_edit_params()
             self.label_name_view.setText(entity.name)
             self.double_edit_x.setValue(entity.x)
             self.double_edit_y.setValue(entity.y)
@@ -144,17 +483,30 @@ class MainWindow(QMainWindow):
                 values = {
                     "x": float(self.double_edit_x.value()),
                     "y": float(self.double_edit_y.value()),
-                    "z": float(self.double_edit_z.value()),
-                    "upd": self.openGL_widget.get_frame_count_since_startup()
+                    "z": float(self.double_edit_z.value())
                 }
-                options[1](**values)
+                self.scene.set_entity(entity.name, **values)
                 self.double_edit_x.setValue(entity.x)
                 self.double_edit_y.setValue(entity.y)
                 self.double_edit_z.setValue(entity.z)
 
+            if self.apply_edit_handler is not None:
+                self.button_edit_apply.clicked.disconnect(
+                    self.apply_edit_handler
+                )
+            self.apply_edit_handler = apply_clicked
             self.button_edit_apply.clicked.connect(apply_clicked)
 
+        def entity_picked(name):
+            items = self.tree_items.get(name)
+            if not items:
+                return
+            self.entity_tree.setCurrentItem(items[0])
+            self.entity_tree.scrollToItem(items[0])
+            tree_clicked(items[0], 0)
+
         self.entity_tree.itemClicked.connect(tree_clicked)
+        self.openGL_widget.entity_picked.connect(entity_picked)
 
     def init_saving_field(self):
         layout = QHBoxLayout()
@@ -163,44 +515,259 @@ class MainWindow(QMainWindow):
         def save_click():
             save_path = path_line.text().strip()
             if not save_path:
-                save_path = filedialog.asksaveasfilename(
-                    defaultextension=".pkl",
-                    filetypes=[("Pickle files", "*.pkl")]
+                save_path = file_dialog().asksaveasfilename(
+                    defaultextension=".s3d",
+                    filetypes=[
+                        ("Scene files", "*.s3d"), ("Pickle files", "*.pkl")
+                    ]
                 )
             if save_path:
-                self.scene.save_entities_to_file(Path(save_path))
+                self.save_scene(Path(save_path))
                 path_line.setText(str(Path(save_path)))
         save_button = QPushButton(text="Save")
         save_button.clicked.connect(save_click)
 
         def load_click():
-            load_path = filedialog.askopenfilename(
-                filetypes=[("Pickle files", "*.pkl")]
+            load_path = file_dialog().askopenfilename(
+                filetypes=[
+                    ("Scene files", "*.s3d"), ("Pickle files", "*.pkl")
+                ]
             )
             if load_path:
                 if not os.path.exists(load_path):
                     QMessageBox.warning(self, "Ошибка", "Файл не найден")
-                self.scene.load_entities_from_file(Path(load_path))
+                self.load_scene(Path(load_path))
                 path_line.setText(str(Path(load_path)))
         load_button = QPushButton(text="Load")
         load_button.clicked.connect(load_click)
 
         def save_frame():
-            picture_path = filedialog.asksaveasfilename(
+            picture_path = file_dialog().asksaveasfilename(
                 defaultextension=".png",
                 filetypes=[("Picture PNG", "*.png")]
             )
             if picture_path:
-                self.openGL_widget.save_to_png(Path(picture_path))
+                self.save_frame(Path(picture_path))
         shoot_button = QPushButton(text="ScreenShoot")
         shoot_button.clicked.connect(save_frame)
 
+        self.task_progress_bar = QtWidgets.QProgressBar()
+        self.task_progress_bar.setRange(0, 100)
+        self.task_progress_bar.hide()
+        self.task_cancel_button = QPushButton(text="Cancel")
+        self.task_cancel_button.clicked.connect(self.cancel_task)
+        self.task_cancel_button.hide()
+        self.task_buttons = [shoot_button, load_button, save_button]
+
         layout.addWidget(shoot_button)
         layout.addWidget(load_button)
         layout.addWidget(path_line)
         layout.addWidget(save_button)
+        layout.addWidget(self.task_progress_bar)
+        layout.addWidget(self.task_cancel_button)
         self.widget.layout().addLayout(layout)
 
+    def init_profiler_dock(self):
+        glwidget = self.openGL_widget
+        panel = QtWidgets.QWidget()
+        layout = QVBoxLayout(panel)
+        options = QHBoxLayout()
+        for text, handler in (
+                ("Замер", glwidget.set_profiling),
+                ("HUD", glwidget.set_hud_visible),
+                ("Непрерывно", glwidget.set_continuous_rendering),
+        ):
+            check_box = QtWidgets.QCheckBox(text)
+            check_box.toggled.connect(handler)
+            options.addWidget(check_box)
+        culling_box = QtWidgets.QCheckBox("Отсечение")
+        culling_box.setChecked(glwidget.use_culling)
+        culling_box.toggled.connect(glwidget.set_culling)
+        options.addWidget(culling_box)
+        self.render_mode_box = QtWidgets.QComboBox()
+        self.render_mode_box.addItems(list(RENDER_MODES))
+        self.render_mode_box.currentTextChanged.connect(
+            glwidget.set_render_mode
+        )
+        options.addWidget(self.render_mode_box)
+        layout.addLayout(options)
+        self.profiler_view = QtWidgets.QPlainTextEdit()
+        self.profiler_view.setReadOnly(True)
+        layout.addWidget(self.profiler_view)
+
+        def export(extension, write):
+            path = file_dialog().asksaveasfilename(
+                defaultextension=extension,
+                filetypes=[(extension[1:].upper(), "*" + extension)]
+            )
+            if path:
+                write(Path(path))
+
+        buttons = QHBoxLayout()
+        for extension, write in (
+                (".json", glwidget.profiler.export_json),
+                (".csv", glwidget.profiler.export_csv),
+        ):
+            button = QPushButton(text=extension[1:].upper())
+            button.clicked.connect(
+                lambda checked, e=extension, w=write: export(e, w)
+            )
+            buttons.addWidget(button)
+        clear_button = QPushButton(text="Clear")
+        clear_button.clicked.connect(glwidget.profiler.clear)
+        buttons.addWidget(clear_button)
+        layout.addLayout(buttons)
+
+        self.profiler_dock = QtWidgets.QDockWidget("Профилировщик", self)
+        self.profiler_dock.setObjectName("profiler_dock")
+        self.profiler_dock.setWidget(panel)
+        self.addDockWidget(QtCore.Qt.RightDockWidgetArea, self.profiler_dock)
+        self.profiler_dock.hide()
+        self.menuBar().addMenu("Вид").addAction(
+            self.profiler_dock.toggleViewAction()
+        )
+        # панель обновляется по таймеру, а не из paintGL
+        self.profiler_timer = QtCore.QTimer(self)
+        self.profiler_timer.timeout.connect(self.update_profiler_view)
+        self.profiler_timer.start(500)
+
+    def update_profiler_view(self):
+        if self.profiler_dock.isVisible():
+            self.profiler_view.setPlainText("\n".join(
+                self.openGL_widget.profiler.summary_lines()
+            ))
+
+    def start_task(self, work: callable, on_done: callable = None):
+        for button in self.task_buttons:
+            button.setEnabled(False)
+        self.task_progress_bar.setValue(0)
+        self.task_progress_bar.show()
+        self.task_cancel_button.show()
+
+        def done(result):
+            self.finish_task()
+            if on_done is not None:
+                on_done(result)
+
+        def failed(error):
+            self.finish_task()
+            if not isinstance(error, TaskCancelledException):
+                QMessageBox.warning(self, "Ошибка", str(error))
+
+        self.current_task = self.task_runner.submit(
+            work, done, failed,
+            lambda fraction: self.task_progress_bar.setValue(
+                int(fraction * 100)
+            )
+        )
+        return self.current_task
+
+    def finish_task(self):
+        self.current_task = None
+        for button in self.task_buttons:
+            button.setEnabled(True)
+        self.task_progress_bar.hide()
+        self.task_cancel_button.hide()
+
+    def cancel_task(self):
+        if self.current_task is not None:
+            self.current_task.cancel()
+
+    def save_frame(self, path: Path):
+        # в потоке GL только чтение кадра, PNG кодируется в фоне
+        buffer, width, height = self.openGL_widget.read_frame()
+        return self.start_task(
+            lambda progress: encode_png(buffer, width, height, path, progress)
+        )
+
+    def save_scene(self, path: Path):
+        if self.journal is not None and self.journal.scene_path == path:
+            # правки уже в журнале, осталось дождаться записи
+            journal = self.journal
+            return self.start_task(lambda progress: journal.sync())
+        self.close_journal()
+        if path.suffix != ".s3d":
+            snapshot = snapshot_scene(self.scene, path)
+            return self.start_task(
+                lambda progress: write_scene_snapshot(snapshot, path, progress)
+            )
+        journal = self.start_journal(path)
+        return self.start_task(lambda progress: journal.sync())
+
+    def load_scene(self, path: Path):
+        self.close_journal()
+
+        def loaded(result):
+            # подмена сцены целиком, уже в потоке интерфейса
+            self.scene.replace_entities(*result)
+            if path.suffix == ".s3d":
+                replay_journal(self.scene, path)
+                self.start_journal(path)
+
+        return self.start_task(
+            lambda progress: read_entities_from_file(path, progress.report),
+            loaded
+        )
+
+    def start_journal(self, path: Path):
+        self.journal = SceneJournal(self.scene, path)
+        self.journal.start()
+        self.set_journal_open(path, True)
+        return self.journal
+
+    def close_journal(self):
+        if self.journal is None:
+            return
+        journal, self.journal = self.journal, None
+        try:
+            journal.close()
+        except Exception as e:
+            # окно закрывается в любом случае, сцена уже в памяти
+            self.statusbar.showMessage(
+                "Ошибка журнала {}: {}".format(journal.journal_path, e)
+            )
+        finally:
+            self.set_journal_open(journal.scene_path, False)
+
+    def open_journals(self):
+        return [
+            Path(el) for el in
+            self.settings.value(OPEN_JOURNALS_KEY, [], type=list)
+        ]
+
+    def set_journal_open(self, path: Path, is_open: bool):
+        paths = [el for el in self.open_journals() if el != path]
+        if is_open:
+            paths.append(path)
+        self.settings.setValue(OPEN_JOURNALS_KEY, [str(el) for el in paths])
+
+    def recover_journals(self):
+        # журнал, не закрытый прошлым запуском, - правки после падения
+        for path in self.open_journals():
+            self.set_journal_open(path, False)
+            try:
+                count = len(pending_records(path))
+            except (OSError, ValueError, SceneJournalException):
+                continue
+            if count == 0:
+                continue
+            answer = QMessageBox.question(
+                self, "Восстановление",
+                "Прошлый запуск завершился с открытой сценой {}.\n"
+                "Открыть ее и применить правки из журнала ({})?".format(
+                    path, count
+                )
+            )
+            if answer == QMessageBox.Yes:
+                return self.load_scene(path)
+        return None
+
+    def closeEvent(self, event):
+        self.cancel_task()
+        self.task_runner.shutdown()
+        self.close_journal()
+        super().closeEvent(event)
+
     def init_scroll(self):
         self.scroll_rotation.setRange(-120, 360)
         self.scroll_rotation.setValue(0)
@@ -222,9 +789,11 @@ class MainWindow(QMainWindow):
 
     def set_camera_rotation(self, angle):
         self.openGL_widget.camera_rotation_angle = math.pi * angle / 180
+        self.openGL_widget.update()
 
     def set_camera_lifting(self, angle):
         self.openGL_widget.camera_lifting_angle = -math.pi * angle / 180
+        self.openGL_widget.update()
 
     def set_camera_distance(self, distance):
         if distance >= self.scroll_zooming.maximum():
@@ -235,6 +804,7 @@ class MainWindow(QMainWindow):
         self.openGL_widget.camera_distance = distance
         self.scroll_zooming.setValue(int(distance))
         self.spinbox_zooming.setValue(float(distance))
+        self.openGL_widget.update()
 
     def init_scene(self):
         # self.scene.add_prism_n("five", 4, 1, 0.5)
@@ -379,8 +949,15 @@ class MainWindow(QMainWindow):
         }
 
 
-if __name__ == "__main__":
-    app = QApplication([])
-    window = MainWindow()
+def run_app(startup_profile: StartupProfile = None):
+    app = QApplication(sys.argv[:1])
+    if startup_profile is not None:
+        startup_profile.mark("qt init")
+    window = MainWindow(startup_profile)
     window.show()
-    app.exec_()
+    window.recover_journals()
+    return app.exec_()
+
+
+if __name__ == "__main__":
+    run_app()
@@ -1,4 +1,19 @@
-from src.Simple2DEditorImports import *
+import os
+import math
+import pickle
+from collections import deque
+from contextlib import contextmanager
+from pathlib import Path
+
+import numpy as np
+
+from src.BasicShapes import (
+    BasicShape, CoordinateStore, Point, LightPoint, Segment, Figure2,
+    Contur2, Plane, PlaneBy3Point, PlaneByPointSegment, PlaneByPlane,
+    Figure3
+)
+from src.SceneFileFormat import save_scene_columnar, load_scene_columnar
+from src.SceneGraph import DependencyGraph
 
 
 class EntityNotFoundException(Exception):
@@ -25,26 +40,195 @@ class EntityNameAlreadyExistsException(Exception):
         super().__init__("Сущьность с таким именем уже существует")
 
 
+class SceneChange:
+    def __init__(self):
+        # словари как упорядоченные множества имен
+        self.added = dict()
+        self.removed = dict()
+        self.modified = dict()
+        self.links = dict()
+        self.is_reset = False
+
+    def is_empty(self):
+        return not (
+            self.added or self.removed or self.modified or self.is_reset
+        )
+
+    def record_added(self, name: str):
+        if name in self.removed:
+            del self.removed[name]
+            self.modified[name] = None
+        else:
+            self.added[name] = None
+
+    def record_removed(self, name: str):
+        self.modified.pop(name, None)
+        if name in self.added:
+            del self.added[name]
+        else:
+            self.removed[name] = None
+
+    def record_modified(self, name: str):
+        if name not in self.added:
+            self.modified[name] = None
+
+
+SCENE_FILE_SUFFIXES = (".s3d", ".pkl")
+
+
+class ProgressReader:
+    def __init__(self, file, size: int, progress: callable):
+        self.file = file
+        self.size = max(size, 1)
+        self.progress = progress
+
+    def report(self, data):
+        self.progress(self.file.tell() / self.size)
+        return data
+
+    def read(self, size=-1):
+        return self.report(self.file.read(size))
+
+    def readline(self, size=-1):
+        return self.report(self.file.readline(size))
+
+    def readinto(self, buffer):
+        return self.report(self.file.readinto(buffer))
+
+
+def read_entities_from_file(filepath: Path, progress: callable = None):
+    if filepath.suffix not in SCENE_FILE_SUFFIXES:
+        raise TypeError("file is not .pkl or .s3d")
+    progress = progress or (lambda fraction: None)
+    if filepath.suffix == ".s3d":
+        point_store = CoordinateStore()
+        entities = load_scene_columnar(filepath, point_store, progress)
+        return entities, point_store
+    with open(filepath, 'rb') as f:
+        entities = pickle.load(
+            ProgressReader(f, os.path.getsize(filepath), progress)
+        )
+    point_store = CoordinateStore(capacity=len(entities))
+    for el in entities.values():
+        el.last_update = 0
+        if isinstance(el, Point):
+            el.move_to_store(point_store)
+    progress(1.0)
+    return entities, point_store
+
+
+def in_batch(method):
+    def result(self, *args, **kwargs):
+        with self.batch():
+            return method(self, *args, **kwargs)
+    return result
+
+
 class Scene:
-    def __init__(self, app_update: callable):
+    def __init__(self, app_update: callable = None):
         self.path = None
         self.app_update = app_update
+        self.listeners = []
         self.entities = dict()
+        self.point_store = CoordinateStore()
         self.stack_last_actions = deque()
         self.stack_undo_actions = deque()
+        self.batch_depth = 0
+        self.batch_undo_actions = []
+        self.pending_change = SceneChange()
+        self.graph = DependencyGraph()
+
+    def add_listener(self, listener: callable):
+        self.listeners.append(listener)
+
+    def remove_listener(self, listener: callable):
+        self.listeners.remove(listener)
+
+    @contextmanager
+    def batch(self):
+        savepoint = len(self.batch_undo_actions)
+        self.batch_depth += 1
+        try:
+            yield self
+        except BaseException:
+            self.rollback_to(savepoint)
+            self.batch_depth -= 1
+            if self.batch_depth == 0:
+                self.pending_change = SceneChange()
+            raise
+        self.batch_depth -= 1
+        if self.batch_depth == 0:
+            self.batch_undo_actions.clear()
+            self.flush_change()
+
+    def rollback_to(self, savepoint: int):
+        while len(self.batch_undo_actions) > savepoint:
+            self.batch_undo_actions.pop()()
+
+    def record_undo(self, action: callable):
+        if self.batch_depth > 0:
+            self.batch_undo_actions.append(action)
+
+    def notify_update(self):
+        if self.batch_depth == 0:
+            self.flush_change()
+
+    def flush_change(self):
+        change = self.pending_change
+        self.pending_change = SceneChange()
+        if change.is_empty():
+            return
+        for name in list(change.added) + list(change.modified):
+            children = self.entities[name].child_shapes
+            change.links[name] = list(children) if children else []
+        for listener in list(self.listeners):
+            listener(change)
+        if self.app_update is not None:
+            self.app_update()
+
+    def insert_entity(self, name: str, entity):
+        self.entities[name] = entity
+        self.graph.link(name, entity.dependencies())
+        self.pending_change.record_added(name)
+        self.record_undo(lambda: self.drop_entity(name))
+
+    def insert_entities(self, entities: dict):
+        names = list(entities)
+        self.entities.update(entities)
+        self.graph.add_entities(entities)
+        for name in names:
+            self.pending_change.record_added(name)
+
+        def undo():
+            for name in reversed(names):
+                self.drop_entity(name)
+
+        self.record_undo(undo)
+
+    def drop_entity(self, name: str):
+        entity = self.entities.pop(name)
+        self.graph.remove(name)
+        self.pending_change.record_removed(name)
+        entity.unlink()
+        if isinstance(entity, Point) and entity.store is self.point_store:
+            self.point_store.release(entity.index)
 
     def load_entities_from_file(self, filepath: Path):
-        if filepath.suffix != ".pkl":
-            raise TypeError("file is not .pkl")
-        with open(filepath, 'rb') as f:
-            self.entities = pickle.load(f)
-        for el in self.entities.values():
-            el.last_update = 0
-        self.app_update()
+        self.replace_entities(*read_entities_from_file(filepath))
+
+    def replace_entities(self, entities: dict, point_store: CoordinateStore):
+        self.entities = entities
+        self.point_store = point_store
+        self.graph.rebuild(entities)
+        self.pending_change.is_reset = True
+        self.notify_update()
 
     def save_entities_to_file(self, filepath: Path):
-        if filepath.suffix != ".pkl":
-            raise TypeError("file is not .pkl")
+        if filepath.suffix not in SCENE_FILE_SUFFIXES:
+            raise TypeError("file is not .pkl or .s3d")
+        if filepath.suffix == ".s3d":
+            save_scene_columnar(self.entities, filepath)
+            return
         with open(filepath, 'wb') as f:
             pickle.dump(self.entities, f)
 
@@ -64,48 +248,163 @@ class Scene:
             if self.entities.get(new_entity) is not None:
                 raise EntityNameAlreadyExistsException()
 
+    def collect_descendants(self, name: str):
+        return {
+            el: self.entities[el]
+            for el in self.graph.descendants_of([name])
+            if el in self.entities
+        }
+
+    def set_children(self, name: str, children: list[str]):
+        self.entities[name].add_children(children)
+        self.relink(name)
+
+    def relink(self, name: str):
+        # после смены детей или контура
+        self.graph.link(name, self.entities[name].dependencies())
+        self.mark_modified(name)
+
+    def mark_modified(self, name: str):
+        self.graph.touch([name])
+        self.pending_change.record_modified(name)
+
+    def propagate(self, names):
+        # от сдвинутых точек вверх по графу, только зависящие от них
+        done = dict()
+        while names:
+            moved = dict()
+            for name in self.graph.propagation_order(names):
+                if name in done:
+                    continue
+                done[name] = None
+                entity = self.entities[name]
+                # плоскость пересчитывается сразу и проецирует контур
+                if entity.refresh() and isinstance(entity, Plane):
+                    moved.update(
+                        (el.name, None) for el in entity.contur_points()
+                    )
+                elif isinstance(entity, Plane):
+                    # сдвинута точка контура: вернуть ее на плоскость
+                    moved.update(
+                        (el.name, None) for el in entity.update_contur()
+                    )
+                self.mark_modified(name)
+            names = [el for el in moved if el not in done]
+        return list(done)
+
+    def set_entity(self, name: str, **kwargs):
+        self.check_contains_errors((name, BasicShape))
+        entity = self.entities[name]
+        # каждая точка сдвигается один раз, метка кадра upd не нужна
+        kwargs.pop("upd", None)
+        points = entity.edited_points()
+        old_coordinates = [point.coordinates.copy() for point in points]
+
+        def undo():
+            for point, coordinates in zip(points, old_coordinates):
+                point.move_to(coordinates)
+
+        if isinstance(entity, Point):
+            entity.move_to([
+                kwargs.get(tag, value)
+                for tag, value in zip("xyz", old_coordinates[0])
+            ])
+        else:
+            delta = np.array([kwargs.get(tag, 0.0) for tag in "xyz"])
+            for point, coordinates in zip(points, old_coordinates):
+                point.move_to(coordinates + delta)
+        self.propagate([name] + [point.name for point in points])
+        self.record_undo(undo)
+        self.notify_update()
+
+    def check_new_names(self, names: list[str]):
+        if len(set(names)) != len(names):
+            raise EntityNameAlreadyExistsException()
+        for name in names:
+            if len(name) == 0:
+                raise EmptyFieldException()
+            if name in self.entities:
+                raise EntityNameAlreadyExistsException()
+
+    def add_points_bulk(self, names: list[str], coordinates):
+        coordinates = np.asarray(coordinates, dtype=float).reshape(-1, 3)
+        if len(names) != len(coordinates):
+            raise ValueError("Кол-во имен и координат не совпадает")
+        self.check_new_names(names)
+        indices = self.point_store.allocate_many(coordinates)
+        self.insert_entities(
+            {
+                name: Point.from_store(name, self.point_store, index)
+                for name, index in zip(names, indices.tolist())
+            }
+        )
+        self.notify_update()
+
+    def add_segments_bulk(
+            self, names: list[str], points_names: list[str], pairs
+    ):
+        pairs = np.asarray(pairs, dtype=int).reshape(-1, 2)
+        self.add_linked_bulk(
+            lambda name, points: Segment(name, *points),
+            names, points_names, pairs
+        )
+
+    def add_faces_bulk(self, names: list[str], points_names: list[str], faces):
+        faces = np.asarray(faces, dtype=int)
+        self.add_linked_bulk(Figure2, names, points_names, faces)
+
+    def add_linked_bulk(self, factory, names, points_names, indices):
+        if len(names) != len(indices):
+            raise ValueError("Кол-во имен и наборов точек не совпадает")
+        self.check_new_names(names)
+        self.check_contains_errors(
+            *[(el, Point) for el in dict.fromkeys(points_names)]
+        )
+        points = [self.entities[el] for el in points_names]
+        entities = dict()
+        for name, row in zip(names, indices.tolist()):
+            entities[name] = factory(name, [points[i] for i in row])
+            entities[name].add_children([points_names[i] for i in row])
+        self.insert_entities(entities)
+        self.notify_update()
+
     def add_point(self, name: str, x: float, y: float, z: float):
         self.check_contains_errors(new_entity=name)
-        self.entities[name] = Point(name, x, y, z)
-        self.app_update()
+        self.insert_entity(name, Point(name, x, y, z, self.point_store))
+        self.notify_update()
 
     def add_light(self, name: str, lightGL, x: float, y: float, z: float):
-        self.entities[name] = LightPoint(name, lightGL, x, y, z)
-        self.app_update()
+        self.insert_entity(name, LightPoint(
+            name, lightGL, x, y, z, self.point_store
+        ))
+        self.notify_update()
 
     def add_segment(self, name: str, point_a_name: str, point_b_name: str):
         self.check_contains_errors(
             (point_a_name, Point), (point_b_name, Point), new_entity=name
         )
-        self.entities[name] = Segment(
+        segment = Segment(
             name, self.entities[point_a_name], self.entities[point_b_name]
         )
-        self.entities[name].add_children([point_a_name, point_b_name])
-        self.app_update()
+        segment.add_children([point_a_name, point_b_name])
+        self.insert_entity(name, segment)
+        self.notify_update()
 
     def add_figure2(self, name: str, points_names: list[str]):
         self.check_contains_errors(
             *[(el, Point) for el in points_names], new_entity=name
         )
-        self.entities[name] = Figure2(
-            name, [self.entities[el] for el in points_names]
-        )
-        self.entities[name].add_children(points_names)
-        self.app_update()
+        figure = Figure2(name, [self.entities[el] for el in points_names])
+        figure.add_children(points_names)
+        self.insert_entity(name, figure)
+        self.notify_update()
 
+    @in_batch
     def add_figure2_n(self, name: str, n: int, radius: float):
         self.check_contains_errors(new_entity=name)
         points = [f"figure2_point_{name}_{i}" for i in range(1, n + 1)]
-        arc = 2 * math.pi / n
-        for i, point_name in enumerate(points):
-            self.add_point(
-                point_name,
-                math.sin(arc * i) * radius,
-                math.cos(arc * i) * radius,
-                0.0
-            )
+        self.add_points_bulk(points, circle_coordinates(n, radius))
         self.add_figure2(name, points)
-        self.app_update()
 
     def add_plane_by_points(
         self, name: str, point1_name: str, point2_name: str, point3_name: str
@@ -121,11 +420,10 @@ class Scene:
         point3 = self.entities[point3_name]
         if is_point_collinear(point1, point2, point3):
             raise ValueError()
-        self.entities[name] = PlaneBy3Point(name, point1, point2, point3)
-        self.entities[name].add_children(
-            [point1_name, point2_name, point3_name]
-        )
-        self.app_update()
+        plane = PlaneBy3Point(name, point1, point2, point3)
+        plane.add_children([point1_name, point2_name, point3_name])
+        self.insert_entity(name, plane)
+        self.notify_update()
 
     def add_plane_by_point_and_segment(
         self, name: str, point_name: str, segment_name: str
@@ -137,9 +435,10 @@ class Scene:
         segment = self.entities[segment_name]
         if is_point_collinear(point, segment.point_a, segment.point_b):
             raise ValueError()
-        self.entities[name] = PlaneByPointSegment(name, point, segment)
-        self.entities[name].add_children([point_name, segment_name])
-        self.app_update()
+        plane = PlaneByPointSegment(name, point, segment)
+        plane.add_children([point_name, segment_name])
+        self.insert_entity(name, plane)
+        self.notify_update()
 
     def add_plane_by_plane(
         self, name: str, point_name: str, plane_name: str
@@ -149,9 +448,10 @@ class Scene:
         )
         point = self.entities[point_name]
         plane = self.entities[plane_name]
-        self.entities[name] = PlaneByPlane(name, point, plane)
-        self.entities[name].add_children([point_name, plane_name])
-        self.app_update()
+        new_plane = PlaneByPlane(name, point, plane)
+        new_plane.add_children([point_name, plane_name])
+        self.insert_entity(name, new_plane)
+        self.notify_update()
 
     def add_contur_to_plane(self, plane_name: str, segments_names: list[str]):
         self.check_contains_errors(
@@ -159,6 +459,18 @@ class Scene:
         )
         plane = self.entities[plane_name]
         contur_name = f"contur_{plane_name}_{len(plane.contur)}"
+        points = [
+            point for el in segments_names
+            for point in (self.entities[el].point_a, self.entities[el].point_b)
+        ]
+        old_coordinates = [point.coordinates.copy() for point in points]
+
+        def undo():
+            plane.contur.pop()
+            self.relink(plane_name)
+            for point, coordinates in zip(points, old_coordinates):
+                point.move_to(coordinates)
+
         plane.add_contur(
             Contur2(
                 contur_name,
@@ -166,164 +478,152 @@ class Scene:
             )
         )
         plane.contur[-1].add_children(segments_names)
-        self.app_update()
+        self.relink(plane_name)
+        # точки контура спроецированы на плоскость
+        self.propagate([plane_name] + [point.name for point in points])
+        self.record_undo(undo)
+        self.notify_update()
 
+    @in_batch
     def add_contur_n_to_plane(self, plane_name: str, n: int, radius: float):
         self.check_contains_errors((plane_name, Plane))
         if n < 3 or radius <= 0:
             raise ValueError("Радиус или кол-во граней - некорректны")
         points = [f"contur_point_{plane_name}_{i}" for i in range(1, n + 1)]
-        arc = 2 * math.pi / n
-        for i, point_name in enumerate(points):
-            self.add_point(
-                point_name,
-                math.sin(arc * i) * radius,
-                math.cos(arc * i) * radius,
-                0.0
-            )
-        segments = []
-        for i in range(1, n + 1):
-            segments.append(f"segment_{plane_name}_{i}")
-            self.add_segment(segments[-1], points[i - 1], points[i % n])
+        self.add_points_bulk(points, circle_coordinates(n, radius))
+        segments = [f"segment_{plane_name}_{i}" for i in range(1, n + 1)]
+        self.add_segments_bulk(segments, points, loop_pairs(n))
         self.add_contur_to_plane(plane_name, segments)
-        self.app_update()
 
     def add_figure3(self, name: str, faces_names: list[str]):
         self.check_contains_errors(
             *[(el, Figure2) for el in faces_names], new_entity=name
         )
-        self.entities[name] = Figure3(
+        figure = Figure3(
             name, [self.entities[face_name] for face_name in faces_names]
         )
-        self.entities[name].add_children(faces_names)
-        self.app_update()
+        figure.add_children(faces_names)
+        self.insert_entity(name, figure)
+        self.notify_update()
 
+    @in_batch
     def add_prism_n(self, name: str, n: int, radius: float, height: float):
         self.check_contains_errors(new_entity=name)
         if n < 3 or radius <= 0 or height <= 0:
             raise ValueError(
                 "Радиус или кол-во граней или высота - некорректны"
             )
-        upper_points = [f"pnt_upr_{name}_{i}" for i in range(1, n + 1)]
-        lower_points = [f"pnt_lwr_{name}_{i}" for i in range(1, n + 1)]
-        arc = 2 * math.pi / n
-        for i, (name_u, name_l) in enumerate(zip(upper_points, lower_points)):
-            self.add_point(
-                name_u,
-                math.sin(arc * i) * radius,
-                math.cos(arc * i) * radius,
-                height
-            )
-            self.add_point(
-                name_l,
-                math.sin(arc * i) * radius,
-                math.cos(arc * i) * radius,
-                0.0
-            )
+        coordinates = np.zeros(shape=(n, 2, 3), dtype=float)
+        coordinates[:, 0] = circle_coordinates(n, radius, height)
+        coordinates[:, 1] = circle_coordinates(n, radius)
+        points = [
+            f"pnt_{level}_{name}_{i}"
+            for i in range(1, n + 1) for level in ("upr", "lwr")
+        ]
+        self.add_points_bulk(points, coordinates)
+        upper = np.arange(0, 2 * n, 2)
+        lower = upper + 1
         faces = [f"face_upper_{name}", f"face_lower_{name}"]
-        self.add_figure2(faces[0], upper_points)
-        self.add_figure2(faces[1], lower_points)
-        for i in range(1, n + 1):
-            faces.append(f"face_middle_{name}_{i}")
-            self.add_figure2(
-                faces[-1],
-                [
-                    upper_points[i - 1],
-                    upper_points[i % n],
-                    lower_points[i % n],
-                    lower_points[i - 1]
-                ]
+        self.add_faces_bulk(faces, points, np.stack([upper, lower]))
+        middle = [f"face_middle_{name}_{i}" for i in range(1, n + 1)]
+        self.add_faces_bulk(
+            middle,
+            points,
+            np.stack(
+                [upper, np.roll(upper, -1), np.roll(lower, -1), lower],
+                axis=1
             )
-        self.add_figure3(name, faces)
-        self.app_update()
+        )
+        self.add_figure3(name, faces + middle)
 
+    @in_batch
     def add_pyramid_n(self, name: str, n: int, radius: float, height: float):
         self.check_contains_errors(new_entity=name)
         if n < 3 or radius <= 0 or height <= 0:
             raise ValueError(
                 "Радиус или кол-во граней или высота - некорректны"
             )
-        upper_point = f"pnt_upr_{name}"
-        lower_points = [f"pnt_lwr_{name}_{i}" for i in range(1, n + 1)]
-        arc = 2 * math.pi / n
-        self.add_point(upper_point, 0.0, 0.0, height)
-        for i, name_l in enumerate(lower_points):
-            self.add_point(
-                name_l,
-                math.sin(arc * i) * radius,
-                math.cos(arc * i) * radius,
-                0.0
-            )
+        points = [f"pnt_upr_{name}"]
+        points += [f"pnt_lwr_{name}_{i}" for i in range(1, n + 1)]
+        coordinates = np.zeros(shape=(n + 1, 3), dtype=float)
+        coordinates[0, 2] = height
+        coordinates[1:] = circle_coordinates(n, radius)
+        self.add_points_bulk(points, coordinates)
+        lower = np.arange(1, n + 1)
         faces = [f"face_lower_{name}"]
-        self.add_figure2(faces[0], lower_points)
-        for i in range(1, n + 1):
-            faces.append(f"face_middle_{name}_{i}")
-            self.add_figure2(
-                faces[-1],
-                [
-                    upper_point,
-                    lower_points[i % n],
-                    lower_points[i - 1]
-                ]
-            )
-        self.add_figure3(name, faces)
-        self.app_update()
+        self.add_faces_bulk(faces, points, lower[None])
+        middle = [f"face_middle_{name}_{i}" for i in range(1, n + 1)]
+        self.add_faces_bulk(
+            middle,
+            points,
+            np.stack([np.zeros_like(lower), np.roll(lower, -1), lower], axis=1)
+        )
+        self.add_figure3(name, faces + middle)
 
+    @in_batch
     def add_sphere_nm(self, name: str, n: int, m: int, radius: float):
         self.check_contains_errors(new_entity=name)
-        if n < 3 or m < 1 or radius <= 0:
+        if n < 3 or m < 2 or radius <= 0:
             raise ValueError(
                 "Радиус или кол-во граней - некорректны"
             )
-        rings = []
-        for i in range(1, m):
-            rings.append([f"pnt_r_{i}_{name}_{j}" for j in range(1, n + 1)])
-        arc = 2 * math.pi / n
-        d_h = math.pi / m
-        for j in range(1, len(rings) + 1):
-            for i, name_p in enumerate(rings[j - 1]):
-                self.add_point(
-                    name_p,
-                    math.sin(d_h * j) * math.sin(arc * i) * radius,
-                    math.sin(d_h * j) * math.cos(arc * i) * radius,
-                    math.cos(d_h * j) * radius
-                )
-        faces = []
-        for j in range(1, len(rings)):
-            for i in range(1, n + 1):
-                faces.append(f"face_r_{j}_{name}_{i}")
-                self.add_figure2(
-                    faces[-1],
-                    [
-                        rings[j - 1][i - 1],
-                        rings[j - 1][i % n],
-                        rings[j][i % n],
-                        rings[j][i - 1]
-                    ]
-                )
-        self.add_point(f"pnt_up_{name}", 0.0, 0.0, radius)
-        self.add_point(f"pnt_down_{name}", 0.0, 0.0, -radius)
-        for i in range(1, n + 1):
-            faces.append(f"face_r_0_{name}_{i}")
-            self.add_figure2(
-                faces[-1],
-                [
-                    f"pnt_up_{name}",
-                    rings[0][i % n],
-                    rings[0][i - 1]
-                ]
-            )
-            faces.append(f"face_r_{m}_{name}_{i}")
-            self.add_figure2(
-                faces[-1],
+        arc = 2 * math.pi / n * np.arange(n)
+        d_h = math.pi / m * np.arange(1, m)
+        coordinates = np.zeros(shape=(m + 1, n, 3), dtype=float)
+        coordinates[:m - 1, :, 0] = np.outer(np.sin(d_h), np.sin(arc))
+        coordinates[:m - 1, :, 1] = np.outer(np.sin(d_h), np.cos(arc))
+        coordinates[:m - 1, :, 2] = np.cos(d_h)[:, None]
+        coordinates = coordinates.reshape(-1, 3)[:(m - 1) * n + 2] * radius
+        coordinates[-2:, 2] = [radius, -radius]
+        points = [
+            f"pnt_r_{j}_{name}_{i}"
+            for j in range(1, m) for i in range(1, n + 1)
+        ]
+        points += [f"pnt_up_{name}", f"pnt_down_{name}"]
+        self.add_points_bulk(points, coordinates)
+        ring = np.arange((m - 1) * n).reshape(m - 1, n)
+        ring_next = np.roll(ring, -1, axis=1)
+        faces = [
+            f"face_r_{j}_{name}_{i}"
+            for j in range(1, m - 1) for i in range(1, n + 1)
+        ]
+        self.add_faces_bulk(
+            faces,
+            points,
+            np.stack(
+                [ring[:-1], ring_next[:-1], ring_next[1:], ring[1:]], axis=-1
+            ).reshape(-1, 4)
+        )
+        poles = [
+            face for i in range(1, n + 1)
+            for face in (f"face_r_0_{name}_{i}", f"face_r_{m}_{name}_{i}")
+        ]
+        up = np.full(n, len(points) - 2)
+        down = np.full(n, len(points) - 1)
+        self.add_faces_bulk(
+            poles,
+            points,
+            np.stack(
                 [
-                    f"pnt_down_{name}",
-                    rings[m - 2][i % n],
-                    rings[m - 2][i - 1]
-                ]
-            )
-        self.add_figure3(name, faces)
-        self.app_update()
+                    np.stack([up, ring_next[0], ring[0]], axis=1),
+                    np.stack([down, ring_next[-1], ring[-1]], axis=1)
+                ],
+                axis=1
+            ).reshape(-1, 3)
+        )
+        self.add_figure3(name, faces + poles)
+
+
+def circle_coordinates(n: int, radius: float, z: float = 0.0):
+    arc = 2 * math.pi / n * np.arange(n)
+    result = np.full(shape=(n, 3), fill_value=z, dtype=float)
+    result[:, 0] = np.sin(arc) * radius
+    result[:, 1] = np.cos(arc) * radius
+    return result
+
+
+def loop_pairs(n: int):
+    return np.stack([np.arange(n), np.roll(np.arange(n), -1)], axis=1)
 
 
 def is_point_collinear(*args):
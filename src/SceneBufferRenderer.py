@@ -0,0 +1,325 @@
+from src.Simple2DEditorImports import *
+import ctypes
+import time
+
+# индексов в куске, который отсекается целиком; делится на 2 и 3
+CHUNK_INDICES = 6144
+
+
+class GeometryGroup:
+    def __init__(self, mode, color, is_lit):
+        self.mode = mode
+        self.color = color
+        self.is_lit = is_lit
+        self.parts = []
+        self.offset = 0
+        self.count = 0
+        # сущности по порядку индексов и конец диапазона каждой
+        self.owners = []
+        self.owner_ends = np.zeros(shape=(0,), dtype=int)
+        # куски группы: начало в индексах группы и габариты для отсечения
+        self.chunk_starts = np.zeros(shape=(0,), dtype=int)
+        self.chunk_centers = np.zeros(shape=(0, 3))
+        self.chunk_extents = np.zeros(shape=(0, 3))
+
+    def set_chunks(self, indices, vertex_array):
+        self.chunk_starts = np.arange(0, len(indices), CHUNK_INDICES)
+        if len(indices) == 0:
+            return
+        coordinates = vertex_array[indices, :3].astype(float)
+        lows = np.minimum.reduceat(coordinates, self.chunk_starts, axis=0)
+        highs = np.maximum.reduceat(coordinates, self.chunk_starts, axis=0)
+        self.chunk_centers = (lows + highs) / 2
+        self.chunk_extents = (highs - lows) / 2
+
+    def drawn_counts(self, ranges):
+        # сколько индексов каждой сущности попало в нарисованные диапазоны
+        starts = np.append(0, self.owner_ends[:-1])
+        drawn = np.zeros(shape=(len(self.owners),), dtype=int)
+        for start, count in ranges:
+            drawn += np.clip(
+                np.minimum(self.owner_ends, start + count)
+                - np.maximum(starts, start), 0, None
+            )
+        return drawn
+
+    def visible_ranges(self, frustum=None):
+        # подряд идущие видимые куски - один вызов glDrawElements
+        if frustum is None:
+            return [(0, self.count)] if self.count else []
+        visible = frustum.centered_boxes_visible(
+            self.chunk_centers, self.chunk_extents
+        )
+        edges = np.flatnonzero(np.diff(np.concatenate(
+            [[False], visible, [False]]
+        ).astype(np.int8)))
+        ends = np.append(self.chunk_starts, self.count)
+        return [
+            (int(ends[first]), int(ends[last] - ends[first]))
+            for first, last in zip(edges[::2], edges[1::2])
+        ]
+
+
+class SceneGeometry:
+    def __init__(self):
+        self.parts = []
+        self.vertex_count = 0
+        # группы по материалу, порядок - порядок отрисовки
+        self.groups = {
+            "faces": GeometryGroup(GL_TRIANGLES, FIGURE2_COLOR, True),
+            "planes": GeometryGroup(GL_TRIANGLES, PLANE_COLOR, True),
+            "edges": GeometryGroup(GL_LINES, EDGE_COLOR, False),
+            "segments": GeometryGroup(GL_LINES, SEGMENT_COLOR, False),
+            "points": GeometryGroup(GL_POINTS, POINT_COLOR, False),
+        }
+        self.lights = []
+        self.vertex_array = np.zeros(shape=(0, 6), dtype=np.float32)
+        self.index_array = np.zeros(shape=(0,), dtype=np.uint32)
+
+    def add_vertices(self, vertices, normal=None):
+        vertices = np.asarray(vertices, dtype=np.float32).reshape(-1, 3)
+        part = np.zeros(shape=(len(vertices), 6), dtype=np.float32)
+        part[:, :3] = vertices
+        if normal is not None:
+            part[:, 3:] = normal
+        self.parts.append(part)
+        start = self.vertex_count
+        self.vertex_count += len(vertices)
+        return start
+
+    def add_indices(self, group_name, indices, owner):
+        group = self.groups[group_name]
+        group.parts.append(np.asarray(indices, dtype=np.uint32).ravel())
+        group.owners.append(owner)
+
+    def add_point(self, point):
+        start = self.add_vertices(point.np_vector)
+        self.add_indices("points", [start], point)
+
+    def add_segment(self, segment):
+        start = self.add_vertices(
+            [segment.point_a.np_vector, segment.point_b.np_vector]
+        )
+        self.add_indices("segments", [start, start + 1], segment)
+
+    def add_figure2(self, figure, inner_point=None):
+        count = len(figure.points)
+        if count < 3:
+            return
+        start = self.add_vertices(
+            [el.np_vector for el in figure.points],
+            find_normal_figure2(figure, inner_point)
+        )
+        self.add_indices("faces", fan_indices(count) + start, figure)
+        self.add_indices("edges", loop_indices(count) + start, figure)
+
+    def add_plane(self, plane):
+        if len(plane.contur) > 0:
+            points = [el.point_a for el in plane.contur[0].segments]
+            if len(points) < 3:
+                return
+            start = self.add_vertices(
+                [el.np_vector for el in points], plane.normal
+            )
+            self.add_indices(
+                "planes", fan_indices(len(points)) + start, plane
+            )
+            self.add_indices(
+                "segments", loop_indices(len(points)) + start, plane
+            )
+            return
+        # не забыть: size меньше 2000,
+        corners = plane.infinite_corners(1000)
+        if corners is None:
+            return
+        start = self.add_vertices(corners, plane.normal)
+        self.add_indices("planes", fan_indices(4) + start, plane)
+
+    def pack(self):
+        if self.parts:
+            self.vertex_array = np.concatenate(self.parts)
+        offset = 0
+        index_parts = []
+        for group in self.groups.values():
+            group.offset = offset
+            group.count = sum(len(el) for el in group.parts)
+            group.owner_ends = np.cumsum(
+                [len(el) for el in group.parts], dtype=int
+            )
+            offset += group.count
+            index_parts.extend(group.parts)
+            group.parts = []
+        if index_parts:
+            self.index_array = np.concatenate(index_parts)
+        for group in self.groups.values():
+            group.set_chunks(
+                self.index_array[group.offset:group.offset + group.count],
+                self.vertex_array
+            )
+        self.parts = []
+
+
+def fan_indices(count):
+    result = np.zeros(shape=(count - 2, 3), dtype=np.uint32)
+    result[:, 1] = np.arange(1, count - 1)
+    result[:, 2] = np.arange(2, count)
+    return result
+
+
+def loop_indices(count):
+    result = np.zeros(shape=(count, 2), dtype=np.uint32)
+    result[:, 0] = np.arange(count)
+    result[:, 1] = np.roll(np.arange(count), -1)
+    return result
+
+
+def pack_scene_geometry(entities: dict):
+    geometry = SceneGeometry()
+    for entity in entities.values():
+        if isinstance(entity, Plane):
+            entity.refresh()
+    packed_faces = set()
+    for entity in entities.values():
+        if isinstance(entity, Figure3):
+            entity.update_face_normals()
+            center = entity.get_center()
+            for face in entity.faces:
+                if id(face) not in packed_faces:
+                    geometry.add_figure2(face, center)
+                    packed_faces.add(id(face))
+    for entity in entities.values():
+        if isinstance(entity, LightPoint):
+            geometry.lights.append(entity)
+        elif isinstance(entity, Point):
+            geometry.add_point(entity)
+        elif isinstance(entity, Segment):
+            geometry.add_segment(entity)
+        elif isinstance(entity, Figure2):
+            if id(entity) not in packed_faces:
+                geometry.add_figure2(entity)
+                packed_faces.add(id(entity))
+        elif isinstance(entity, Plane):
+            geometry.add_plane(entity)
+    geometry.pack()
+    return geometry
+
+
+# без замера фазы ничего не записывают
+idle_profiler = FrameProfiler()
+
+
+class SceneBufferRenderer:
+    def __init__(self):
+        self.geometry = None
+        self.is_dirty = True
+        self.vertex_buffer = None
+        self.index_buffer = None
+        self.rebuild_count = 0
+        self.drawn_chunks = 0
+        self.culled_chunks = 0
+
+    def invalidate(self):
+        self.is_dirty = True
+
+    def rebuild(self, entities: dict):
+        self.geometry = pack_scene_geometry(entities)
+        if self.vertex_buffer is None:
+            self.vertex_buffer, self.index_buffer = glGenBuffers(2)
+        glBindBuffer(GL_ARRAY_BUFFER, self.vertex_buffer)
+        glBufferData(
+            GL_ARRAY_BUFFER,
+            self.geometry.vertex_array.nbytes,
+            self.geometry.vertex_array,
+            GL_STATIC_DRAW
+        )
+        glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, self.index_buffer)
+        glBufferData(
+            GL_ELEMENT_ARRAY_BUFFER,
+            self.geometry.index_array.nbytes,
+            self.geometry.index_array,
+            GL_STATIC_DRAW
+        )
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+        glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, 0)
+        self.is_dirty = False
+        self.rebuild_count += 1
+
+    def release(self):
+        if self.vertex_buffer is not None:
+            glDeleteBuffers(2, [self.vertex_buffer, self.index_buffer])
+        self.forget()
+
+    def forget(self):
+        # без вызовов GL: буферы остались в старом контексте
+        self.vertex_buffer = None
+        self.index_buffer = None
+        self.is_dirty = True
+
+    def frame_stats(self):
+        return {
+            "drawn chunks": self.drawn_chunks,
+            "culled chunks": self.culled_chunks,
+        }
+
+    def draw(
+            self, entities: dict, profiler: FrameProfiler = None,
+            frustum: Frustum = None
+    ):
+        if profiler is None:
+            profiler = idle_profiler
+        if self.is_dirty or self.geometry is None:
+            with profiler.phase("rebuild"):
+                self.rebuild(entities)
+        for light in self.geometry.lights:
+            draw_light(light)
+        self.drawn_chunks = 0
+        self.culled_chunks = 0
+        if self.geometry.vertex_count == 0:
+            return
+        ranges = dict()
+        for name, group in self.geometry.groups.items():
+            ranges[name] = group.visible_ranges(frustum)
+            drawn = sum(
+                -(-count // CHUNK_INDICES) for _, count in ranges[name]
+            )
+            self.drawn_chunks += drawn
+            self.culled_chunks += len(group.chunk_starts) - drawn
+        if not any(ranges.values()):
+            # вся сцена вне кадра: буферы даже не привязываются
+            return
+        stride = self.geometry.vertex_array.strides[0]
+        glBindBuffer(GL_ARRAY_BUFFER, self.vertex_buffer)
+        glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, self.index_buffer)
+        glEnableClientState(GL_VERTEX_ARRAY)
+        glEnableClientState(GL_NORMAL_ARRAY)
+        glVertexPointer(3, GL_FLOAT, stride, ctypes.c_void_p(0))
+        glNormalPointer(GL_FLOAT, stride, ctypes.c_void_p(12))
+        for name, group in self.geometry.groups.items():
+            if not ranges[name]:
+                continue
+            start_time = time.perf_counter()
+            with profiler.phase("draw " + name):
+                if group.is_lit:
+                    set_material(group.color)
+                else:
+                    glDisable(GL_LIGHTING)
+                    glColor3fv(group.color[:3])
+                for start, count in ranges[name]:
+                    glDrawElements(
+                        group.mode,
+                        count,
+                        GL_UNSIGNED_INT,
+                        ctypes.c_void_p((group.offset + start) * 4)
+                    )
+                if not group.is_lit:
+                    glEnable(GL_LIGHTING)
+            if profiler is not idle_profiler:
+                # один вызов на много сущностей: время делится по индексам
+                profiler.record_batch(
+                    group.owners, group.drawn_counts(ranges[name]).tolist(),
+                    time.perf_counter() - start_time
+                )
+        glDisableClientState(GL_NORMAL_ARRAY)
+        glDisableClientState(GL_VERTEX_ARRAY)
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+        glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, 0)
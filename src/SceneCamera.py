@@ -0,0 +1,43 @@
+import math
+
+import numpy as np
+
+# как у GLWidget: gluPerspective
+FIELD_OF_VIEW = 70.0
+NEAR_PLANE = 0.1
+FAR_PLANE = 100.0
+
+
+def perspective_matrix(fovy: float, aspect: float, near: float, far: float):
+    f = 1.0 / math.tan(math.radians(fovy) / 2)
+    result = np.zeros(shape=(4, 4), dtype=float)
+    result[0, 0] = f / aspect
+    result[1, 1] = f
+    result[2, 2] = (far + near) / (near - far)
+    result[2, 3] = 2 * far * near / (near - far)
+    result[3, 2] = -1.0
+    return result
+
+
+def look_at_matrix(eye, target, up):
+    forward = np.asarray(target, dtype=float) - eye
+    forward /= np.linalg.norm(forward)
+    side = np.cross(forward, up)
+    side /= np.linalg.norm(side)
+    up = np.cross(side, forward)
+    result = np.identity(4)
+    result[0, :3] = side
+    result[1, :3] = up
+    result[2, :3] = -forward
+    result[:3, 3] = -result[:3, :3] @ eye
+    return result
+
+
+def camera_eye(rotation: float, lifting: float, distance: float):
+    return np.array(
+        [
+            math.cos(rotation) * math.cos(lifting) * distance,
+            math.sin(rotation) * math.cos(lifting) * distance,
+            math.sin(lifting) * distance
+        ]
+    )
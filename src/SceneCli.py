@@ -0,0 +1,230 @@
+from src.SceneCore import *
+import argparse
+
+# та же камера, что у GLWidget по умолчанию
+DEFAULT_ROTATION = 0.0
+DEFAULT_LIFTING = math.pi / 9
+
+KIND_NAMES = {
+    KIND_POINT: "points",
+    KIND_LIGHT: "lights",
+    KIND_SEGMENT: "segments",
+    KIND_FIGURE2: "faces",
+    KIND_PLANE_BY_3_POINT: "planes",
+    KIND_PLANE_BY_POINT_SEGMENT: "planes",
+    KIND_PLANE_BY_PLANE: "planes",
+    KIND_FIGURE3: "solids",
+}
+
+# рендерер создается один раз на процесс пула
+worker_renderers = dict()
+
+
+def geometry_points(entities: dict):
+    # источники света далеко от фигур и в габариты не входят
+    return [
+        el for el in entities.values()
+        if isinstance(el, Point) and not isinstance(el, LightPoint)
+    ]
+
+
+def scene_stats(entities: dict):
+    counts = dict.fromkeys(dict.fromkeys(KIND_NAMES.values()), 0)
+    for entity in entities.values():
+        counts[KIND_NAMES[entity_kind(entity)]] += 1
+    points = geometry_points(entities)
+    result = {"entities": len(entities), **counts}
+    if points:
+        coordinates = gather_coordinates([points])[0]
+        result["bounds_min"] = coordinates.min(axis=0).tolist()
+        result["bounds_max"] = coordinates.max(axis=0).tolist()
+    return result
+
+
+def fit_camera_distance(entities: dict):
+    points = geometry_points(entities)
+    if not points:
+        return 5.0
+    radius = np.linalg.norm(gather_coordinates([points])[0], axis=1).max()
+    # угол обзора 70 градусов, сфера радиуса radius целиком в кадре
+    return float(np.clip(radius / math.sin(math.radians(35)), 1.0, 90.0))
+
+
+def output_path(path: Path, output_dir: str, suffix: str):
+    directory = path.parent if output_dir is None else Path(output_dir)
+    return directory / (path.stem + suffix)
+
+
+def stats_job(path: Path, options):
+    entities, _ = read_entities_from_file(path)
+    return scene_stats(entities)
+
+
+def convert_job(path: Path, options):
+    target = output_path(path, options.output_dir, "." + options.to)
+    if target == path:
+        raise ValueError("Файл уже в формате {}".format(options.to))
+    scene = Scene()
+    scene.load_entities_from_file(path)
+    write_scene_snapshot(
+        snapshot_scene(scene, target), target, TaskProgress()
+    )
+    return {"output": str(target)}
+
+
+def create_gl_renderer(width: int, height: int):
+    # Qt и OpenGL грузятся только в процессах, которые рисуют
+    import src.Simple2DEditorImports
+    from src.OffscreenRenderer import OffscreenGLRenderer
+    return OffscreenGLRenderer(width, height)
+
+
+def create_renderer(backend: str, width: int, height: int):
+    if backend == "software":
+        return SoftwareRasterizer(width, height)
+    if backend == "gl":
+        return create_gl_renderer(width, height)
+    try:
+        return create_gl_renderer(width, height)
+    except (Exception, SystemExit):
+        # нет Qt/OpenGL или контекста: модуль импорта делает sys.exit
+        return SoftwareRasterizer(width, height)
+
+
+def render_job(path: Path, options):
+    key = (options.backend, options.width, options.height)
+    if key not in worker_renderers:
+        worker_renderers[key] = create_renderer(*key)
+    entities, _ = read_entities_from_file(path)
+    distance = options.distance or fit_camera_distance(entities)
+    frame = worker_renderers[key].render(
+        entities, (options.rotation, options.lifting, distance)
+    )
+    target = output_path(path, options.output_dir, ".png")
+    encode_png(*frame, target, TaskProgress())
+    return {"output": str(target)}
+
+
+JOBS = {
+    "stats": stats_job,
+    "convert": convert_job,
+    "render": render_job,
+}
+
+
+def job_outputs(command: str, paths: list[str], options):
+    if command == "convert":
+        return [
+            output_path(Path(el), options.output_dir, "." + options.to)
+            for el in paths
+        ]
+    if command == "render":
+        return [
+            output_path(Path(el), options.output_dir, ".png") for el in paths
+        ]
+    return [None] * len(paths)
+
+
+def check_outputs(command: str, paths: list[str], options):
+    # один файл дважды выполняется один раз, разные файлы в один - ошибка
+    paths = list(dict.fromkeys(paths))
+    sources = dict()
+    for path, target in zip(paths, job_outputs(command, paths, options)):
+        if target is None:
+            continue
+        if target in sources:
+            raise ValueError("{} и {} записываются в один файл {}".format(
+                sources[target], path, target
+            ))
+        sources[target] = path
+    return paths
+
+
+def run_job(command: str, path: str, options):
+    try:
+        return path, JOBS[command](Path(path), options), None
+    except Exception as e:
+        return path, None, "{}: {}".format(type(e).__name__, e)
+
+
+def run_jobs(command: str, paths: list[str], options):
+    if options.jobs == 1 or len(paths) == 1:
+        yield from (run_job(command, el, options) for el in paths)
+        return
+    with concurrent.futures.ProcessPoolExecutor(options.jobs) as executor:
+        yield from executor.map(
+            run_job,
+            [command] * len(paths), paths, [options] * len(paths)
+        )
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="Simple3DEditor.py",
+        description="Обработка файлов сцен без окна"
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+    for name, help_text in (
+            ("stats", "кол-во сущностей и габариты сцены"),
+            ("convert", "перевод сцены в другой формат"),
+            ("render", "снимок сцены в PNG"),
+    ):
+        command = commands.add_parser(name, help=help_text)
+        command.add_argument("files", nargs="+")
+        command.add_argument(
+            "-j", "--jobs", type=int, default=os.cpu_count() or 1,
+            help="кол-во процессов"
+        )
+        command.add_argument("-o", "--output-dir", default=None)
+        if name == "stats":
+            command.add_argument("--json", action="store_true")
+        if name == "convert":
+            command.add_argument(
+                "--to", choices=["s3d", "pkl"], default="s3d"
+            )
+        if name == "render":
+            command.add_argument("--width", type=int, default=256)
+            command.add_argument("--height", type=int, default=256)
+            command.add_argument(
+                "--rotation", type=float, default=DEFAULT_ROTATION
+            )
+            command.add_argument(
+                "--lifting", type=float, default=DEFAULT_LIFTING
+            )
+            command.add_argument(
+                "--distance", type=float, default=None,
+                help="по умолчанию вся сцена в кадре"
+            )
+            command.add_argument(
+                "--backend", choices=["auto", "gl", "software"],
+                default="auto",
+                help="auto - OpenGL, а без него программная отрисовка"
+            )
+    return parser
+
+
+def format_stats(stats: dict):
+    return " ".join(
+        "{}={}".format(name, value) for name, value in stats.items()
+    )
+
+
+def main(args: list[str] = None):
+    options = build_parser().parse_args(args)
+    try:
+        paths = check_outputs(options.command, options.files, options)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 2
+    failed = 0
+    for path, result, error in run_jobs(options.command, paths, options):
+        if error is not None:
+            failed += 1
+            print("{}: {}".format(path, error), file=sys.stderr)
+        elif options.command == "stats" and options.json:
+            print(json.dumps({"file": path, **result}))
+        elif options.command == "stats":
+            print("{}: {}".format(path, format_stats(result)))
+        else:
+            print("{} -> {}".format(path, result["output"]))
+    return 1 if failed else 0
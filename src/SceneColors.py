@@ -0,0 +1,7 @@
+# Цвета фигур: общие для окна и программной отрисовки
+
+PLANE_COLOR = [0.2, 0.7, 0.3, 1.0]
+FIGURE2_COLOR = [0.2, 0.2, 0.9, 1.0]
+SEGMENT_COLOR = [0.0, 0.9, 0.6, 1.0]
+EDGE_COLOR = [0.0, 0.0, 0.0, 1.0]
+POINT_COLOR = [1.0, 0.0, 0.0, 1.0]
@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+
+# Ядро без Qt, OpenGL и PIL: фигуры, сцена, файлы сцены.
+# Интерфейс и отрисовка подключаются через Simple2DEditorImports.
+
+import sys
+import os
+from collections import deque, defaultdict
+from contextlib import contextmanager
+import math
+import pickle
+import json
+import queue
+import threading
+import uuid
+import zipfile
+import concurrent.futures
+from pathlib import Path
+
+import numpy as np
+
+from src.SceneColors import *
+from src.BasicShapes import *
+from src.SceneFileFormat import *
+from src.SceneGraph import *
+from src.SceneBase import *
+from src.SceneJournal import *
+from src.SceneTasks import *
+from src.FrameProfiler import *
+from src.SceneCamera import *
+from src.SoftwareRasterizer import *
+from src.FrustumCulling import *
+from src.ScenePicking import *
@@ -0,0 +1,333 @@
+import json
+from collections import defaultdict
+from pathlib import Path
+
+import numpy as np
+
+from src.BasicShapes import (
+    CoordinateStore, Point, LightPoint, Segment, Figure2, Contur2, Plane,
+    PlaneBy3Point, PlaneByPointSegment, PlaneByPlane, Figure3,
+    gather_coordinates
+)
+
+# 2: номера источников света в JSON, а не в int64
+SCENE_FORMAT_VERSION = 2
+
+KIND_POINT = 0
+KIND_LIGHT = 1
+KIND_SEGMENT = 2
+KIND_FIGURE2 = 3
+KIND_PLANE_BY_3_POINT = 4
+KIND_PLANE_BY_POINT_SEGMENT = 5
+KIND_PLANE_BY_PLANE = 6
+KIND_FIGURE3 = 7
+
+PLANE_KINDS = {
+    PlaneByPointSegment: KIND_PLANE_BY_POINT_SEGMENT,
+    PlaneBy3Point: KIND_PLANE_BY_3_POINT,
+    PlaneByPlane: KIND_PLANE_BY_PLANE,
+}
+
+KINDS_BY_TYPE = {
+    Point: KIND_POINT,
+    LightPoint: KIND_LIGHT,
+    Segment: KIND_SEGMENT,
+    Figure2: KIND_FIGURE2,
+    Figure3: KIND_FIGURE3,
+    **PLANE_KINDS
+}
+
+
+class SceneFormatException(Exception):
+    def __init__(self, message):
+        super().__init__("Некорректный файл сцены: {}".format(message))
+
+
+def entity_kind(entity):
+    kind = KINDS_BY_TYPE.get(type(entity))
+    if kind is not None:
+        return kind
+    if isinstance(entity, LightPoint):
+        return KIND_LIGHT
+    if isinstance(entity, Point):
+        return KIND_POINT
+    if isinstance(entity, Segment):
+        return KIND_SEGMENT
+    if isinstance(entity, Figure2):
+        return KIND_FIGURE2
+    if isinstance(entity, Figure3):
+        return KIND_FIGURE3
+    for plane_type, kind in PLANE_KINDS.items():
+        if isinstance(entity, plane_type):
+            return kind
+    raise SceneFormatException(
+        "тип {} не поддерживается".format(type(entity).__name__)
+    )
+
+
+def pack_strings(strings: list[str]):
+    encoded = [el.encode("utf-8") for el in strings]
+    offsets = np.zeros(shape=(len(encoded) + 1,), dtype=np.int64)
+    np.cumsum([len(el) for el in encoded], out=offsets[1:])
+    return np.frombuffer(b"".join(encoded), dtype=np.uint8), offsets
+
+
+def unpack_strings(data, offsets):
+    data = data.tobytes()
+    return [
+        data[start:end].decode("utf-8")
+        for start, end in zip(offsets[:-1].tolist(), offsets[1:].tolist())
+    ]
+
+
+def pack_light_ids(lights: list):
+    # номер хранится как есть: GL_LIGHT0 или строка
+    texts = []
+    for light in lights:
+        try:
+            texts.append(json.dumps(light.lightGL))
+        except TypeError:
+            raise SceneFormatException(
+                "номер источника света {!r} не сохраняется".format(
+                    light.lightGL
+                )
+            )
+    return pack_strings(texts)
+
+
+def unpack_light_ids(columns):
+    if "light_ids" in columns:
+        # файлы версии 1
+        return columns["light_ids"].tolist()
+    return [
+        json.loads(el) for el in
+        unpack_strings(columns["light_id_data"], columns["light_id_offsets"])
+    ]
+
+
+def pack_lists(lists: list[list[int]]):
+    offsets = np.zeros(shape=(len(lists) + 1,), dtype=np.int64)
+    np.cumsum([len(el) for el in lists], out=offsets[1:])
+    values = np.fromiter(
+        (value for el in lists for value in el),
+        dtype=np.int32,
+        count=int(offsets[-1])
+    )
+    return values, offsets
+
+
+def unpack_lists(values, offsets):
+    values = values.tolist()
+    return [
+        values[start:end]
+        for start, end in zip(offsets[:-1].tolist(), offsets[1:].tolist())
+    ]
+
+
+class EntitiesCopy:
+    # снимок для записи в фоне: координаты копируются, изменяемые списки
+    # запоминаются, остальная упаковка - в фоновом потоке
+    def __init__(self, entities: dict):
+        self.entities = dict(entities)
+        self.children = [el.child_shapes for el in self.entities.values()]
+        self.conturs = {
+            name: list(el.contur) for name, el in self.entities.items()
+            if isinstance(el, Plane)
+        }
+        points = [el for el in self.entities.values() if isinstance(el, Point)]
+        self.coordinates = np.zeros(shape=(0, 3), dtype=float)
+        if points:
+            self.coordinates = gather_coordinates([points])[0]
+
+
+def entities_to_columns(source):
+    # dict сущностей или EntitiesCopy, снятая в потоке интерфейса
+    copy = source
+    if not isinstance(source, EntitiesCopy):
+        copy = EntitiesCopy(source)
+    entities = copy.entities
+    names = list(entities)
+    ids = {id(entity): i for i, entity in enumerate(entities.values())}
+    kinds = np.array(
+        [entity_kind(el) for el in entities.values()], dtype=np.uint8
+    )
+    by_kind = defaultdict(list)
+    for i, entity in enumerate(entities.values()):
+        by_kind[int(kinds[i])].append((i, entity))
+
+    points = by_kind[KIND_POINT] + by_kind[KIND_LIGHT]
+    points.sort(key=lambda el: el[0])
+    columns = {
+        "format_version": np.array([SCENE_FORMAT_VERSION], dtype=np.int32),
+        "kinds": kinds,
+        "point_entities": np.array([i for i, _ in points], dtype=np.int32),
+        "coordinates": copy.coordinates,
+        "light_entities": np.array(
+            [i for i, _ in by_kind[KIND_LIGHT]], dtype=np.int32
+        ),
+        "segment_entities": np.array(
+            [i for i, _ in by_kind[KIND_SEGMENT]], dtype=np.int32
+        ),
+        "segment_points": np.array(
+            [
+                [ids[id(el.point_a)], ids[id(el.point_b)]]
+                for _, el in by_kind[KIND_SEGMENT]
+            ],
+            dtype=np.int32
+        ).reshape(-1, 2),
+        "face_entities": np.array(
+            [i for i, _ in by_kind[KIND_FIGURE2]], dtype=np.int32
+        ),
+        "solid_entities": np.array(
+            [i for i, _ in by_kind[KIND_FIGURE3]], dtype=np.int32
+        ),
+    }
+    columns["light_id_data"], columns["light_id_offsets"] = pack_light_ids(
+        [el for _, el in by_kind[KIND_LIGHT]]
+    )
+    columns["face_points"], columns["face_offsets"] = pack_lists(
+        [[ids[id(p)] for p in el.points] for _, el in by_kind[KIND_FIGURE2]]
+    )
+    columns["solid_faces"], columns["solid_offsets"] = pack_lists(
+        [[ids[id(f)] for f in el.faces] for _, el in by_kind[KIND_FIGURE3]]
+    )
+
+    planes = [
+        (i, el) for i, el in enumerate(entities.values())
+        if kinds[i] in PLANE_KINDS.values()
+    ]
+    plane_refs = np.full(shape=(len(planes), 3), fill_value=-1, dtype=np.int32)
+    conturs = []
+    for row, (i, plane) in enumerate(planes):
+        if kinds[i] == KIND_PLANE_BY_3_POINT:
+            refs = [plane.point_a, plane.point_b, plane.point_c]
+        elif kinds[i] == KIND_PLANE_BY_POINT_SEGMENT:
+            segment = entities[copy.children[i][1]]
+            refs = [plane.point_a, segment]
+        else:
+            refs = [plane.point_a, plane.base_plane]
+        plane_refs[row, :len(refs)] = [ids[id(el)] for el in refs]
+        for contur in copy.conturs[names[i]]:
+            conturs.append((i, contur))
+    columns["plane_entities"] = np.array(
+        [i for i, _ in planes], dtype=np.int32
+    )
+    columns["plane_refs"] = plane_refs
+    columns["contur_planes"] = np.array(
+        [i for i, _ in conturs], dtype=np.int32
+    )
+    columns["contur_segments"], columns["contur_offsets"] = pack_lists(
+        [[ids[id(s)] for s in el.segments] for _, el in conturs]
+    )
+    # дети хранятся номерами в общей таблице имен
+    table = {name: i for i, name in enumerate(names)}
+    extra_names = [el.name for _, el in conturs]
+    children = []
+    for entity_children in copy.children:
+        children.append([])
+        for name in entity_children or []:
+            if name not in table:
+                table[name] = len(names) + len(extra_names)
+                extra_names.append(name)
+            children[-1].append(table[name])
+    columns["name_data"], columns["name_offsets"] = pack_strings(
+        names + extra_names
+    )
+    columns["contur_count"] = np.array([len(conturs)], dtype=np.int64)
+    columns["has_children"] = np.array(
+        [el is not None for el in copy.children], dtype=bool
+    )
+    columns["children"], columns["children_offsets"] = pack_lists(children)
+    return columns
+
+
+def columns_to_entities(
+        columns, store: CoordinateStore, progress: callable = None
+):
+    progress = progress or (lambda fraction: None)
+    version = int(columns["format_version"][0])
+    if version > SCENE_FORMAT_VERSION:
+        raise SceneFormatException(
+            "версия {} не поддерживается".format(version)
+        )
+    kinds = columns["kinds"]
+    all_names = unpack_strings(columns["name_data"], columns["name_offsets"])
+    names = all_names[:len(kinds)]
+    contur_names = all_names[
+        len(kinds):len(kinds) + int(columns["contur_count"][0])
+    ]
+    built = [None] * len(kinds)
+
+    indices = store.allocate_many(columns["coordinates"]).tolist()
+    for entity, index in zip(columns["point_entities"].tolist(), indices):
+        if kinds[entity] == KIND_LIGHT:
+            built[entity] = LightPoint.from_store(names[entity], store, index)
+        else:
+            built[entity] = Point.from_store(names[entity], store, index)
+    for entity, light_id in zip(
+            columns["light_entities"].tolist(), unpack_light_ids(columns)
+    ):
+        built[entity].lightGL = light_id
+    progress(0.2)
+    for entity, (a, b) in zip(
+            columns["segment_entities"].tolist(),
+            columns["segment_points"].tolist()
+    ):
+        built[entity] = Segment(names[entity], built[a], built[b])
+    progress(0.4)
+    for entity, points in zip(
+            columns["face_entities"].tolist(),
+            unpack_lists(columns["face_points"], columns["face_offsets"])
+    ):
+        built[entity] = Figure2(names[entity], [built[el] for el in points])
+    progress(0.6)
+    for entity, refs in zip(
+            columns["plane_entities"].tolist(), columns["plane_refs"].tolist()
+    ):
+        refs = [built[el] for el in refs if el >= 0]
+        if kinds[entity] == KIND_PLANE_BY_3_POINT:
+            built[entity] = PlaneBy3Point(names[entity], *refs)
+        elif kinds[entity] == KIND_PLANE_BY_POINT_SEGMENT:
+            built[entity] = PlaneByPointSegment(names[entity], *refs)
+        else:
+            built[entity] = PlaneByPlane(names[entity], *refs)
+    for entity, name, segments in zip(
+            columns["contur_planes"].tolist(),
+            contur_names,
+            unpack_lists(columns["contur_segments"], columns["contur_offsets"])
+    ):
+        contur = Contur2(name, [built[el] for el in segments])
+        contur.add_children([el.name for el in contur.segments])
+        # координаты уже спроецированы на плоскость при сохранении
+        built[entity].contur.append(contur)
+    progress(0.7)
+    for entity, faces in zip(
+            columns["solid_entities"].tolist(),
+            unpack_lists(columns["solid_faces"], columns["solid_offsets"])
+    ):
+        built[entity] = Figure3(names[entity], [built[el] for el in faces])
+
+    progress(0.9)
+    for entity, (has_children, children) in enumerate(
+            zip(
+                columns["has_children"].tolist(),
+                unpack_lists(columns["children"], columns["children_offsets"])
+            )
+    ):
+        if has_children:
+            built[entity].add_children([all_names[el] for el in children])
+    progress(1.0)
+    return dict(zip(names, built))
+
+
+def save_scene_columnar(entities: dict, filepath: Path):
+    columns = entities_to_columns(entities)
+    with open(filepath, "wb") as f:
+        np.savez(f, **columns)
+
+
+def load_scene_columnar(
+        filepath: Path, store: CoordinateStore, progress: callable = None
+):
+    with np.load(filepath, allow_pickle=False) as columns:
+        return columns_to_entities(columns, store, progress)
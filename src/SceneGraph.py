@@ -0,0 +1,105 @@
+from collections import deque, defaultdict
+
+
+class DependencyCycleException(Exception):
+    def __init__(self, name):
+        super().__init__("Сущьность {} зависит сама от себя".format(name))
+
+
+class DependencyGraph:
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        # прямые ребра: сущность -> из чего построена (child_shapes)
+        self.children = dict()
+        # обратные: сущность -> что из нее построено, dict как множество
+        self.parents = defaultdict(dict)
+        self.versions = dict()
+        self.version_counter = 0
+
+    def rebuild(self, entities: dict):
+        self.clear()
+        self.add_entities(entities)
+
+    def add_entities(self, entities: dict):
+        # только для новых имен: старых ребер нет, цикл невозможен
+        for name, entity in entities.items():
+            children = list(dict.fromkeys(entity.dependencies()))
+            self.children[name] = children
+            for child in children:
+                self.parents[child][name] = None
+        self.touch(entities)
+
+    def link(self, name: str, children: list[str]):
+        children = list(dict.fromkeys(children or []))
+        if self.parents.get(name):
+            # новая сущность не может быть чьим-то потомком, старую проверим
+            reachable = self.descendants_of(children)
+            if name in reachable:
+                raise DependencyCycleException(name)
+        self.unlink(name)
+        self.children[name] = children
+        for child in children:
+            self.parents[child][name] = None
+        self.touch([name])
+
+    def unlink(self, name: str):
+        for child in self.children.pop(name, []):
+            self.parents[child].pop(name, None)
+            if not self.parents[child]:
+                del self.parents[child]
+
+    def remove(self, name: str):
+        self.unlink(name)
+        self.versions.pop(name, None)
+
+    def children_of(self, name: str):
+        return self.children.get(name, [])
+
+    def parents_of(self, name: str):
+        return list(self.parents.get(name, ()))
+
+    def descendants_of(self, names):
+        return self.walk(names, self.children.get)
+
+    def ancestors_of(self, names):
+        return self.walk(names, self.parents.get)
+
+    @staticmethod
+    def walk(names, neighbours: callable):
+        result = dict()
+        stack = list(names)
+        while stack:
+            current = stack.pop()
+            if current in result:
+                continue
+            result[current] = None
+            stack.extend(neighbours(current) or ())
+        return result
+
+    def propagation_order(self, names):
+        # затронутые сущности, каждая после всех, из которых построена
+        affected = self.ancestors_of(names)
+        pending = {
+            name: sum(el in affected for el in self.children_of(name))
+            for name in affected
+        }
+        ready = deque(name for name, count in pending.items() if count == 0)
+        order = []
+        while ready:
+            name = ready.popleft()
+            order.append(name)
+            for parent in self.parents.get(name, ()):
+                pending[parent] -= 1
+                if pending[parent] == 0:
+                    ready.append(parent)
+        return order
+
+    def touch(self, names):
+        for name in names:
+            self.version_counter += 1
+            self.versions[name] = self.version_counter
+
+    def version(self, name: str):
+        return self.versions.get(name, 0)
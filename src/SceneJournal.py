@@ -0,0 +1,328 @@
+import os
+import json
+import tempfile
+import queue
+import threading
+import uuid
+from pathlib import Path
+
+import numpy as np
+
+from src.BasicShapes import (
+    Point, LightPoint, Segment, Figure2, Contur2, Plane, PlaneBy3Point,
+    PlaneByPointSegment, PlaneByPlane, Figure3
+)
+from src.SceneFileFormat import (
+    KIND_POINT, KIND_LIGHT, KIND_SEGMENT, KIND_FIGURE2,
+    KIND_PLANE_BY_3_POINT, KIND_PLANE_BY_POINT_SEGMENT, KIND_PLANE_BY_PLANE,
+    KIND_FIGURE3, EntitiesCopy, entity_kind, entities_to_columns
+)
+from src.SceneBase import Scene, SceneChange
+
+JOURNAL_FORMAT_VERSION = 1
+JOURNAL_SUFFIX = ".journal"
+
+
+class SceneJournalException(Exception):
+    def __init__(self, message):
+        super().__init__("Журнал сцены поврежден: {}".format(message))
+
+
+def journal_path_for(scene_path: Path):
+    return scene_path.with_name(scene_path.name + JOURNAL_SUFFIX)
+
+
+def entity_refs(entity):
+    if isinstance(entity, Segment):
+        return [entity.point_a.name, entity.point_b.name]
+    if isinstance(entity, Figure2):
+        return [el.name for el in entity.points]
+    if isinstance(entity, Figure3):
+        return [el.name for el in entity.faces]
+    if isinstance(entity, PlaneByPointSegment):
+        return [entity.point_a.name, entity.child_shapes[1]]
+    if isinstance(entity, PlaneBy3Point):
+        return [entity.point_a.name, entity.point_b.name, entity.point_c.name]
+    if isinstance(entity, PlaneByPlane):
+        return [entity.point_a.name, entity.base_plane.name]
+    return []
+
+
+def entity_to_record(entity):
+    record = {
+        "k": entity_kind(entity),
+        "r": entity_refs(entity),
+        "c": entity.child_shapes,
+    }
+    if isinstance(entity, Point):
+        record["p"] = entity.coordinates.tolist()
+    if isinstance(entity, LightPoint):
+        record["l"] = entity.lightGL
+    if isinstance(entity, Plane):
+        record["t"] = [
+            [el.name, [segment.name for segment in el.segments]]
+            for el in entity.contur
+        ]
+    return record
+
+
+def change_to_record(change: SceneChange, entities: dict):
+    return {
+        "del": list(change.removed),
+        "put": {
+            name: entity_to_record(entities[name])
+            for name in list(change.added) + list(change.modified)
+        },
+    }
+
+
+def order_by_refs(puts: dict):
+    # ссылки создаются раньше ссылающихся на них сущностей
+    result = dict()
+    for name in puts:
+        stack = [(name, False)]
+        while stack:
+            current, is_ready = stack.pop()
+            if current in result:
+                continue
+            if is_ready:
+                result[current] = puts[current]
+                continue
+            stack.append((current, True))
+            for ref in puts[current]["r"]:
+                if ref in puts and ref not in result:
+                    stack.append((ref, False))
+    return result
+
+
+def build_entity(name: str, record: dict, scene: Scene):
+    kind = record["k"]
+    if kind == KIND_POINT:
+        return Point(name, *record["p"], scene.point_store)
+    if kind == KIND_LIGHT:
+        return LightPoint(name, record["l"], *record["p"], scene.point_store)
+    refs = [scene.entities[el] for el in record["r"]]
+    if kind == KIND_SEGMENT:
+        return Segment(name, *refs)
+    if kind == KIND_FIGURE2:
+        return Figure2(name, refs)
+    if kind == KIND_FIGURE3:
+        return Figure3(name, refs)
+    if kind == KIND_PLANE_BY_3_POINT:
+        return PlaneBy3Point(name, *refs)
+    if kind == KIND_PLANE_BY_POINT_SEGMENT:
+        return PlaneByPointSegment(name, *refs)
+    if kind == KIND_PLANE_BY_PLANE:
+        return PlaneByPlane(name, *refs)
+    raise SceneJournalException("неизвестный тип {}".format(kind))
+
+
+def apply_put(name: str, record: dict, scene: Scene):
+    entity = scene.entities.get(name)
+    if entity is not None and (
+            entity_kind(entity) != record["k"]
+            or entity_refs(entity) != record["r"]
+    ):
+        scene.drop_entity(name)
+        entity = None
+    if entity is None:
+        entity = build_entity(name, record, scene)
+        if record["c"] is not None:
+            entity.add_children(record["c"])
+        scene.insert_entity(name, entity)
+    elif record["c"] is not None:
+        scene.set_children(name, record["c"])
+    else:
+        scene.mark_modified(name)
+    if "p" in record:
+        entity.x, entity.y, entity.z = record["p"]
+    if "t" in record:
+        conturs = [
+            [el.name, [segment.name for segment in el.segments]]
+            for el in entity.contur
+        ]
+        if conturs != record["t"]:
+            entity.contur = []
+            for contur_name, segments_names in record["t"]:
+                contur = Contur2(
+                    contur_name, [scene.entities[el] for el in segments_names]
+                )
+                contur.add_children(segments_names)
+                entity.add_contur(contur)
+            scene.relink(name)
+
+
+def apply_record(record: dict, scene: Scene):
+    with scene.batch():
+        for name in record["del"]:
+            if name in scene.entities:
+                scene.drop_entity(name)
+        for name, put in order_by_refs(record["put"]).items():
+            apply_put(name, put, scene)
+
+
+def read_journal(journal_path: Path):
+    with open(journal_path, "rb") as f:
+        lines = f.read().split(b"\n")
+    try:
+        header = json.loads(lines[0])
+    except ValueError:
+        raise SceneJournalException("нет заголовка")
+    if header.get("version", 0) > JOURNAL_FORMAT_VERSION:
+        raise SceneJournalException(
+            "версия {} не поддерживается".format(header.get("version"))
+        )
+    records = []
+    # последняя строка без перевода строки - оборванная запись
+    for line in lines[1:-1]:
+        try:
+            records.append(json.loads(line))
+        except ValueError:
+            break
+    return header["token"], records
+
+
+def read_snapshot_token(scene_path: Path):
+    with np.load(scene_path, allow_pickle=False) as columns:
+        if "journal_token" not in columns:
+            return None
+        return columns["journal_token"].tobytes().decode("utf-8")
+
+
+def pending_records(scene_path: Path):
+    journal_path = journal_path_for(scene_path)
+    if not journal_path.exists() or not scene_path.exists():
+        return []
+    token, records = read_journal(journal_path)
+    if token != read_snapshot_token(scene_path):
+        # журнал от прошлого снимка: все правки уже в файле сцены
+        return []
+    return records
+
+
+def replay_journal(scene: Scene, scene_path: Path):
+    records = pending_records(scene_path)
+    for record in records:
+        apply_record(record, scene)
+    return len(records)
+
+
+def open_scene(scene: Scene, scene_path: Path):
+    scene.load_entities_from_file(scene_path)
+    if scene_path.suffix != ".s3d":
+        return 0
+    return replay_journal(scene, scene_path)
+
+
+# маска процесса; читается при импорте, пока нет других потоков
+FILE_MODE_MASK = os.umask(0)
+os.umask(FILE_MODE_MASK)
+
+
+def write_file_atomic(filepath: Path, write: callable):
+    # свое имя у каждого писателя: параллельные записи не мешают друг другу
+    descriptor, temp_name = tempfile.mkstemp(
+        dir=filepath.parent, prefix=filepath.name + ".", suffix=".tmp"
+    )
+    temp_path = Path(temp_name)
+    try:
+        with os.fdopen(descriptor, "wb") as f:
+            write(f)
+            f.flush()
+            os.fsync(f.fileno())
+        # mkstemp создает файл с правами 0600, как open - по маске
+        os.chmod(temp_path, 0o666 & ~FILE_MODE_MASK)
+    except BaseException:
+        temp_path.unlink(missing_ok=True)
+        raise
+    os.replace(temp_path, filepath)
+
+
+class SceneJournal:
+    def __init__(
+            self, scene: Scene, scene_path: Path, compact_every: int = 10000
+    ):
+        self.scene = scene
+        self.scene_path = scene_path
+        self.journal_path = journal_path_for(scene_path)
+        self.compact_every = compact_every
+        self.edits_since_snapshot = 0
+        self.tasks = queue.Queue()
+        self.error = None
+        self.writer = None
+
+    def start(self):
+        self.writer = threading.Thread(target=self.write_loop, daemon=True)
+        self.writer.start()
+        self.compact()
+        self.scene.add_listener(self.on_scene_change)
+
+    def close(self):
+        if self.on_scene_change in self.scene.listeners:
+            self.scene.remove_listener(self.on_scene_change)
+        if self.writer is not None:
+            self.tasks.put(None)
+            self.writer.join()
+            self.writer = None
+        self.check_error()
+
+    def sync(self):
+        self.tasks.join()
+        self.check_error()
+
+    def check_error(self):
+        if self.error is not None:
+            error, self.error = self.error, None
+            raise error
+
+    def on_scene_change(self, change: SceneChange):
+        if change.is_reset:
+            self.compact()
+            return
+        record = change_to_record(change, self.scene.entities)
+        self.edits_since_snapshot += len(record["del"]) + len(record["put"])
+        if self.edits_since_snapshot >= self.compact_every:
+            self.compact()
+            return
+        self.tasks.put(("append", json.dumps(record).encode("utf-8")))
+
+    def compact(self):
+        # в потоке интерфейса только копия, колонки собираются в фоне
+        snapshot = EntitiesCopy(self.scene.entities)
+        token = uuid.uuid4().hex
+        self.edits_since_snapshot = 0
+        self.tasks.put(("snapshot", (snapshot, token)))
+
+    def write_loop(self):
+        while True:
+            task = self.tasks.get()
+            try:
+                if task is None:
+                    return
+                if self.error is None:
+                    self.run_task(*task)
+            except Exception as e:
+                self.error = e
+            finally:
+                self.tasks.task_done()
+
+    def run_task(self, name: str, payload):
+        if name == "append":
+            with open(self.journal_path, "ab") as f:
+                f.write(payload + b"\n")
+                f.flush()
+                os.fsync(f.fileno())
+            return
+        snapshot, token = payload
+        columns = entities_to_columns(snapshot)
+        columns["journal_token"] = np.frombuffer(
+            token.encode("utf-8"), dtype=np.uint8
+        )
+        write_file_atomic(
+            self.scene_path, lambda f: np.savez(f, **columns)
+        )
+        header = {"version": JOURNAL_FORMAT_VERSION, "token": token}
+        write_file_atomic(
+            self.journal_path,
+            lambda f: f.write(json.dumps(header).encode("utf-8") + b"\n")
+        )
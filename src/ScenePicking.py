@@ -0,0 +1,368 @@
+import math
+
+import numpy as np
+
+from src.BasicShapes import (
+    Point, LightPoint, Segment, Figure2, Plane, gather_coordinates
+)
+from src.SceneCamera import (
+    FIELD_OF_VIEW, NEAR_PLANE, FAR_PLANE, perspective_matrix,
+    look_at_matrix, camera_eye
+)
+
+# примитивов в листе иерархии
+PICK_LEAF_SIZE = 8
+# допуск попадания в точку или отрезок, в пикселях
+PICK_PIXELS = 4
+# бит на ось в коде Мортона, 3 * 21 = 63
+MORTON_BITS = 21
+
+
+def expand_bits(values):
+    # между соседними битами вставляется по два нуля
+    x = values.astype(np.uint64) & np.uint64(0x1fffff)
+    for shift, mask in (
+            (32, 0x1f00000000ffff),
+            (16, 0x1f0000ff0000ff),
+            (8, 0x100f00f00f00f00f),
+            (4, 0x10c30c30c30c30c3),
+            (2, 0x1249249249249249),
+    ):
+        x = (x | x << np.uint64(shift)) & np.uint64(mask)
+    return x
+
+
+def morton_codes(centers):
+    low = centers.min(axis=0)
+    size = centers.max(axis=0) - low
+    size[size == 0] = 1.0
+    cells = (centers - low) / size * ((1 << MORTON_BITS) - 1)
+    cells = cells.astype(np.uint64)
+    return (
+        expand_bits(cells[:, 0])
+        | expand_bits(cells[:, 1]) << np.uint64(1)
+        | expand_bits(cells[:, 2]) << np.uint64(2)
+    )
+
+
+def camera_ray(
+        rotation: float, lifting: float, distance: float, aspect,
+        x: float, y: float
+):
+    # x, y - нормированные координаты окна от -1 до 1, y вверх
+    inverse = np.linalg.inv(
+        perspective_matrix(FIELD_OF_VIEW, aspect, NEAR_PLANE, FAR_PLANE)
+        @ look_at_matrix(
+            camera_eye(rotation, lifting, distance),
+            [0.0, 0.0, 0.0], [0.0, 0.0, 1.0]
+        )
+    )
+    near = inverse @ [x, y, -1.0, 1.0]
+    far = inverse @ [x, y, 1.0, 1.0]
+    near = near[:3] / near[3]
+    far = far[:3] / far[3]
+    direction = far - near
+    return near, direction / np.linalg.norm(direction)
+
+
+def pick_radius(distance: float, height: int):
+    # размер PICK_PIXELS пикселей на расстоянии до центра сцены
+    view_height = 2 * distance * math.tan(math.radians(FIELD_OF_VIEW) / 2)
+    return PICK_PIXELS * view_height / max(height, 1)
+
+
+def ray_triangle(origin, direction, a, b, c):
+    # Möller, Trumbore; грани видны с обеих сторон
+    ox, oy, oz = origin
+    dx, dy, dz = direction
+    ax, ay, az = a
+    e1x, e1y, e1z = b[0] - ax, b[1] - ay, b[2] - az
+    e2x, e2y, e2z = c[0] - ax, c[1] - ay, c[2] - az
+    px, py, pz = dy * e2z - dz * e2y, dz * e2x - dx * e2z, dx * e2y - dy * e2x
+    det = e1x * px + e1y * py + e1z * pz
+    if -1e-12 < det < 1e-12:
+        return None
+    sx, sy, sz = ox - ax, oy - ay, oz - az
+    u = (sx * px + sy * py + sz * pz) / det
+    if u < 0.0 or u > 1.0:
+        return None
+    qx, qy, qz = sy * e1z - sz * e1y, sz * e1x - sx * e1z, sx * e1y - sy * e1x
+    v = (dx * qx + dy * qy + dz * qz) / det
+    if v < 0.0 or u + v > 1.0:
+        return None
+    t = (e2x * qx + e2y * qy + e2z * qz) / det
+    return t if t >= 0.0 else None
+
+
+def ray_segment(origin, direction, a, b, radius: float):
+    # ближайшие точки луча и отрезка; отрезок - цилиндр радиуса radius,
+    # точка - отрезок нулевой длины
+    ox, oy, oz = origin
+    dx, dy, dz = direction
+    ax, ay, az = a
+    vx, vy, vz = b[0] - ax, b[1] - ay, b[2] - az
+    wx, wy, wz = ox - ax, oy - ay, oz - az
+    dv = dx * vx + dy * vy + dz * vz
+    dw = dx * wx + dy * wy + dz * wz
+    vv = vx * vx + vy * vy + vz * vz
+    vw = vx * wx + vy * wy + vz * wz
+    denominator = vv - dv * dv
+    s = (vw - dv * dw) / denominator if denominator > 1e-12 else 0.0
+    s = min(max(s, 0.0), 1.0)
+    t = s * dv - dw
+    if t < 0.0:
+        return None
+    gx = wx + t * dx - s * vx
+    gy = wy + t * dy - s * vy
+    gz = wz + t * dz - s * vz
+    if gx * gx + gy * gy + gz * gz > radius * radius:
+        return None
+    # точки и отрезки выигрывают у граней, на которых лежат
+    return max(t - radius, 0.0)
+
+
+class BoundingVolumeHierarchy:
+    # полное двоичное дерево в массиве: дети узла k - 2k + 1 и 2k + 2,
+    # листья по PICK_LEAF_SIZE примитивов в порядке кривой Мортона
+    def __init__(self, vertices):
+        # (кол-во, 3, 3) - треугольники, (кол-во, 2, 3) - отрезки,
+        # точка - отрезок из двух одинаковых вершин
+        self.vertices = vertices
+        count = len(vertices)
+        leaves = max(1, -(-count // PICK_LEAF_SIZE))
+        self.leaf_count = 1 << (leaves - 1).bit_length()
+        self.first_leaf = self.leaf_count - 1
+        order = np.argsort(
+            morton_codes(vertices.mean(axis=1)), kind="stable"
+        )
+        # хвост последнего листа - копии последнего примитива
+        self.order = np.concatenate([
+            order,
+            np.full(self.leaf_count * PICK_LEAF_SIZE - count, order[-1])
+        ])
+        # (узел, низ/верх, ось)
+        self.boxes = np.zeros(shape=(2 * self.leaf_count - 1, 2, 3))
+        self.refit_leaves(np.arange(self.leaf_count))
+
+    def refit_leaves(self, leaves):
+        slots = (
+            leaves[:, None] * PICK_LEAF_SIZE + np.arange(PICK_LEAF_SIZE)
+        ).ravel()
+        corners = self.vertices[self.order[slots]].reshape(len(leaves), -1, 3)
+        nodes = leaves + self.first_leaf
+        self.boxes[nodes, 0] = corners.min(axis=1)
+        self.boxes[nodes, 1] = corners.max(axis=1)
+        # вверх по уровням только по предкам измененных листьев
+        while nodes[0] > 0:
+            nodes = np.unique((nodes - 1) // 2)
+            left = self.boxes[2 * nodes + 1]
+            right = self.boxes[2 * nodes + 2]
+            self.boxes[nodes, 0] = np.minimum(left[:, 0], right[:, 0])
+            self.boxes[nodes, 1] = np.maximum(left[:, 1], right[:, 1])
+
+    def refit(self, primitives):
+        # вершины уже обновлены в self.vertices, порядок листьев прежний
+        slots = np.flatnonzero(np.isin(self.order, primitives))
+        if len(slots) > 0:
+            self.refit_leaves(np.unique(slots // PICK_LEAF_SIZE))
+
+    def intersect(self, origin, direction, radius: float = 0.0):
+        # ближайшее попадание: (t, номер примитива) или None
+        origin = [float(el) for el in origin]
+        direction = [float(el) for el in direction]
+        inverse = [1.0 / (el if el != 0.0 else 1e-30) for el in direction]
+        best = (math.inf, None)
+        # (вход луча в коробку, узел), ближний узел в конце
+        stack = []
+        self.visit_boxes([0], origin, inverse, radius, stack, best[0])
+        while stack:
+            entry, node = stack.pop()
+            if entry > best[0]:
+                continue
+            if node < self.first_leaf:
+                self.visit_boxes(
+                    [2 * node + 1, 2 * node + 2], origin, inverse, radius,
+                    stack, best[0]
+                )
+                continue
+            hit = self.intersect_leaf(
+                node - self.first_leaf, origin, direction, radius
+            )
+            if hit[0] < best[0]:
+                best = hit
+        return None if best[1] is None else best
+
+    def visit_boxes(self, nodes, origin, inverse, radius, stack, limit):
+        ox, oy, oz = origin
+        ix, iy, iz = inverse
+        hits = []
+        for node, (low, high) in zip(
+                nodes, self.boxes[nodes[0]:nodes[-1] + 1].tolist()
+        ):
+            # пересечение отрезков луча внутри слоев по трем осям
+            near_x = (low[0] - radius - ox) * ix
+            far_x = (high[0] + radius - ox) * ix
+            if near_x > far_x:
+                near_x, far_x = far_x, near_x
+            near_y = (low[1] - radius - oy) * iy
+            far_y = (high[1] + radius - oy) * iy
+            if near_y > far_y:
+                near_y, far_y = far_y, near_y
+            near_z = (low[2] - radius - oz) * iz
+            far_z = (high[2] + radius - oz) * iz
+            if near_z > far_z:
+                near_z, far_z = far_z, near_z
+            entry = max(near_x, near_y, near_z, 0.0)
+            if entry <= min(far_x, far_y, far_z, limit):
+                hits.append((entry, node))
+        hits.sort(reverse=True)
+        stack.extend(hits)
+
+    def intersect_leaf(self, leaf, origin, direction, radius):
+        start = leaf * PICK_LEAF_SIZE
+        primitives = self.order[start:start + PICK_LEAF_SIZE].tolist()
+        best = (math.inf, None)
+        for primitive, vertices in zip(
+                primitives, self.vertices[primitives].tolist()
+        ):
+            if len(vertices) == 3:
+                t = ray_triangle(origin, direction, *vertices)
+            else:
+                t = ray_segment(origin, direction, *vertices, radius)
+            if t is not None and t < best[0]:
+                best = (t, primitive)
+        return best
+
+
+def fan_triangles(coordinates):
+    count = len(coordinates)
+    if count < 3:
+        return np.zeros(shape=(0, 3, 3))
+    indices = np.zeros(shape=(count - 2, 3), dtype=int)
+    indices[:, 1] = np.arange(1, count - 1)
+    indices[:, 2] = np.arange(2, count)
+    return coordinates[indices]
+
+
+def entity_primitives(entity):
+    # треугольники (кол-во, 3, 3), отрезки и точки (кол-во, 2, 3) или None
+    if isinstance(entity, LightPoint):
+        return None
+    if isinstance(entity, Point):
+        return np.repeat(entity.coordinates[None, None], 2, axis=1)
+    if isinstance(entity, Segment):
+        return np.array(
+            [[entity.point_a.coordinates, entity.point_b.coordinates]]
+        )
+    if isinstance(entity, Figure2):
+        return fan_triangles(gather_coordinates([entity.points])[0])
+    if isinstance(entity, Plane) and entity.contur:
+        # бесконечная плоскость закрыла бы собой всю сцену
+        entity.refresh()
+        points = [el.point_a for el in entity.contur[0].segments]
+        return fan_triangles(gather_coordinates([points])[0])
+    # грани тела - отдельные сущности Figure2
+    return None
+
+
+class PickLayer:
+    # одна иерархия: грани без допуска или отрезки и точки с допуском
+    def __init__(self, names: list, parts: list):
+        self.names = names
+        self.bvh = None
+        # имя -> (первый примитив, кол-во)
+        self.ranges = dict()
+        start = 0
+        for name, vertices in zip(names, parts):
+            self.ranges[name] = (start, len(vertices))
+            start += len(vertices)
+        self.owners = np.repeat(
+            np.arange(len(names)), [len(el) for el in parts]
+        )
+        if parts:
+            self.bvh = BoundingVolumeHierarchy(np.concatenate(parts))
+
+    def intersect(self, origin, direction, radius: float):
+        if self.bvh is None:
+            return None
+        hit = self.bvh.intersect(origin, direction, radius)
+        if hit is None:
+            return None
+        return hit[0], self.names[self.owners[hit[1]]]
+
+
+class ScenePicker:
+    def __init__(self):
+        self.layers = []
+        self.moved = dict()
+        self.is_dirty = True
+        self.rebuild_count = 0
+        self.refit_count = 0
+
+    def invalidate(self, change=None):
+        # сдвиги уточняют иерархию на месте, остальное - пересборка
+        if (
+                change is None or change.is_reset
+                or change.added or change.removed
+        ):
+            self.is_dirty = True
+            self.moved.clear()
+        elif not self.is_dirty:
+            self.moved.update(change.modified)
+
+    def rebuild(self, entities: dict):
+        # по кол-ву вершин примитива: 3 - грани, 2 - отрезки и точки
+        grouped = {3: ([], []), 2: ([], [])}
+        for name, entity in entities.items():
+            vertices = entity_primitives(entity)
+            if vertices is None or len(vertices) == 0:
+                continue
+            names, parts = grouped[vertices.shape[1]]
+            names.append(name)
+            parts.append(vertices)
+        self.layers = [PickLayer(*el) for el in grouped.values()]
+        self.is_dirty = False
+        self.moved.clear()
+        self.rebuild_count += 1
+
+    def refit(self, entities: dict):
+        for layer in self.layers:
+            changed = []
+            for name in self.moved:
+                if name not in layer.ranges:
+                    continue
+                start, count = layer.ranges[name]
+                vertices = entity_primitives(entities[name])
+                if vertices is None or vertices.shape[:2] != (
+                        count, layer.bvh.vertices.shape[1]
+                ):
+                    # другое кол-во примитивов, например новый контур
+                    self.rebuild(entities)
+                    return
+                layer.bvh.vertices[start:start + count] = vertices
+                changed.append(np.arange(start, start + count))
+            if changed:
+                layer.bvh.refit(np.concatenate(changed))
+        self.moved.clear()
+        self.refit_count += 1
+
+    def update(self, entities: dict):
+        if self.is_dirty:
+            self.rebuild(entities)
+        elif self.moved:
+            self.refit(entities)
+
+    def pick(self, entities: dict, origin, direction, radius: float = 0.0):
+        # ближайшая по лучу сущность; допуск только для отрезков и точек
+        self.update(entities)
+        faces, lines = self.layers
+        hits = [
+            el for el in (
+                faces.intersect(origin, direction, 0.0),
+                lines.intersect(origin, direction, radius)
+            )
+            if el is not None
+        ]
+        if not hits:
+            return None
+        return min(hits)[1]
@@ -0,0 +1,120 @@
+import pickle
+import zipfile
+import concurrent.futures
+from pathlib import Path
+
+import numpy as np
+
+from src.BasicShapes import CoordinateStore
+from src.SceneFileFormat import (
+    EntitiesCopy, entities_to_columns, columns_to_entities
+)
+from src.SceneBase import Scene, SCENE_FILE_SUFFIXES
+from src.SceneJournal import write_file_atomic
+
+
+class TaskCancelledException(Exception):
+    def __init__(self):
+        super().__init__("Операция отменена")
+
+
+class TaskProgress:
+    def __init__(self, on_progress: callable = None):
+        self.on_progress = on_progress
+        self.is_cancelled = False
+        self.fraction = 0.0
+
+    def cancel(self):
+        self.is_cancelled = True
+
+    def report(self, fraction: float):
+        # вызывается из рабочего потока, отмена - через исключение
+        if self.is_cancelled:
+            raise TaskCancelledException()
+        self.fraction = fraction
+        if self.on_progress is not None:
+            self.on_progress(fraction)
+
+
+class SceneTaskRunner:
+    def __init__(self, post: callable = None, max_workers: int = 1):
+        # post переносит вызов в поток интерфейса
+        self.post = post or (lambda function: function())
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers)
+
+    def submit(
+            self, work: callable, on_done: callable = None,
+            on_error: callable = None, on_progress: callable = None
+    ):
+        progress = TaskProgress(
+            None if on_progress is None
+            else lambda fraction: self.post(lambda: on_progress(fraction))
+        )
+
+        def run():
+            try:
+                result = work(progress)
+                progress.report(1.0)
+            except Exception as e:
+                if on_error is not None:
+                    # e удаляется после except, а вызов отложен
+                    self.post(lambda error=e: on_error(error))
+                return
+            if on_done is not None:
+                self.post(lambda: on_done(result))
+
+        progress.future = self.executor.submit(run)
+        return progress
+
+    def shutdown(self):
+        self.executor.shutdown(wait=True, cancel_futures=True)
+
+
+def snapshot_scene(scene: Scene, filepath: Path):
+    # в потоке интерфейса только копия координат и ссылок, пока сцену
+    # никто не меняет; колонки и pickle собираются в фоне
+    if filepath.suffix not in SCENE_FILE_SUFFIXES:
+        raise TypeError("file is not .pkl or .s3d")
+    return EntitiesCopy(scene.entities)
+
+
+def write_scene_snapshot(
+        snapshot: EntitiesCopy, filepath: Path, progress: TaskProgress
+):
+    progress.report(0.0)
+    snapshot = entities_to_columns(snapshot)
+    if filepath.suffix == ".pkl":
+        # pickle отдельных от сцены сущностей, собранных из колонок
+        snapshot = pickle.dumps(
+            columns_to_entities(snapshot, CoordinateStore())
+        )
+
+    def write(f):
+        if isinstance(snapshot, bytes):
+            step = 1 << 20
+            for start in range(0, len(snapshot), step):
+                progress.report(start / max(len(snapshot), 1))
+                f.write(snapshot[start:start + step])
+            return
+        # то же, что np.savez, но с отчетом после каждой колонки
+        with zipfile.ZipFile(f, mode="w", allowZip64=True) as archive:
+            for i, (name, column) in enumerate(snapshot.items()):
+                progress.report(i / len(snapshot))
+                with archive.open(name + ".npy", mode="w") as member:
+                    np.lib.format.write_array(
+                        member, column, allow_pickle=False
+                    )
+
+    write_file_atomic(filepath, write)
+
+
+def encode_png(
+        buffer, width: int, height: int, filepath: Path,
+        progress: TaskProgress
+):
+    # PIL нужен только для снимков экрана, ядро без него импортируется
+    from PIL import Image
+    image = Image.frombytes('RGB', (width, height), buffer)
+    progress.report(0.5)
+    image = image.transpose(Image.FLIP_TOP_BOTTOM)
+    image.save(str(filepath), format='PNG')
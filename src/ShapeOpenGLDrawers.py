@@ -1,9 +1,46 @@
 import numpy as np
 
 from src.Simple2DEditorImports import *
+import time
 
 
-def set_material(
+def init_gl_state():
+    glEnable(GL_DEPTH_TEST)
+    glClearColor(0.3, 0.3, 0.3, 1.0)
+    glEnable(GL_LIGHTING)
+    glEnable(GL_LIGHT0)
+    glLightModelfv(GL_LIGHT_MODEL_AMBIENT, [1.0, 1.0, 1.0, 1])
+    # Настройка источника света
+    # Направленный свет
+    glLightfv(GL_LIGHT0, GL_POSITION, [-100.0, 100.0, 100.0, 0.0])
+    # Цвет рассеянного света
+    glLightfv(GL_LIGHT0, GL_DIFFUSE, [1.0, 1.0, 1.0, 1.0])
+    # Цвет зеркального отражения
+    glLightfv(GL_LIGHT0, GL_SPECULAR, [1.0, 1.0, 1.0, 1.0])
+    # включение нормалей
+    glEnable(GL_NORMALIZE)
+    glLineWidth(2.0)
+    glEnable(GL_LINE_SMOOTH)
+    glHint(GL_LINE_SMOOTH_HINT, GL_NICEST)
+    glPointSize(4.0)
+    glEnable(GL_POINT_SMOOTH)
+    glHint(GL_POINT_SMOOTH_HINT, GL_NICEST)
+
+
+def set_camera(rotation: float, lifting: float, distance: float, aspect):
+    glMatrixMode(GL_PROJECTION)
+    glLoadIdentity()
+    gluPerspective(FIELD_OF_VIEW, aspect, NEAR_PLANE, FAR_PLANE)
+    gluLookAt(
+        math.cos(rotation) * math.cos(lifting) * distance,
+        math.sin(rotation) * math.cos(lifting) * distance,
+        math.sin(lifting) * distance,
+        0, 0, 0,
+        0, 0, 1
+    )
+
+
+def apply_material(
     color, shininess=100.0, ambient=0.2, diffuse=0.9, specular=0.001
 ):
     color = np.array(color)
@@ -14,21 +51,19 @@ def set_material(
     specular_val = np.ones(shape=(4,), dtype=float) * specular
     specular_val[3] = color[3]
     # Настройка материала
-    glEnable(GL_LIGHTING)
     glMaterialfv(GL_FRONT, GL_AMBIENT, ambient_val)
     glMaterialfv(GL_FRONT, GL_DIFFUSE, diffuse_val)
     glMaterialfv(GL_FRONT, GL_SPECULAR, specular_val)
     glMaterialfv(GL_FRONT, GL_SHININESS, shininess)
 
 
+def set_material(color, **kwargs):
+    glEnable(GL_LIGHTING)
+    apply_material(color, **kwargs)
+
+
 def find_normal_figure2(figure, inner_point):
-    points = [el.np_vector for el in figure.points]
-    q = np.mean(points, axis=0)
-    matrix = np.array([el - q for el in points])
-    _, _, right_matrix = np.linalg.svd(matrix)
-    if inner_point is None or np.dot(q - inner_point, right_matrix[2]) > 0:
-        return right_matrix[2]
-    return right_matrix[2] * (-1)
+    return figure.get_normal(inner_point)
 
 
 def out_light(func):
@@ -39,69 +74,285 @@ def out_light(func):
     return result
 
 
-@out_light
-def draw_point(figure):
+# emit_* только выдают вершины, состояние GL задает вызывающий
+
+def emit_points(points, color=POINT_COLOR):
     glBegin(GL_POINTS)
-    glColor3fv(POINT_COLOR[:3])
-    glVertex3f(figure.x, figure.y, figure.z)
+    glColor3fv(color[:3])
+    for point in points:
+        glVertex3fv(point.np_vector)
     glEnd()
 
 
-@out_light
-def draw_segment(figure, color=SEGMENT_COLOR):
+def emit_segments(segments, color=SEGMENT_COLOR):
     glBegin(GL_LINES)
     glColor3fv(color[:3])
-    glVertex3fv(figure.point_a.np_vector)
-    glVertex3fv(figure.point_b.np_vector)
+    for segment in segments:
+        glVertex3fv(segment.point_a.np_vector)
+        glVertex3fv(segment.point_b.np_vector)
     glEnd()
 
 
-@out_light
-def draw_contur2(points, color=SEGMENT_COLOR):
-    glBegin(GL_LINE_LOOP)
+def emit_loops(loops, color=SEGMENT_COLOR):
     glColor3fv(color[:3])
-    for point in points:
-        glVertex3fv(point.np_vector)
+    for points in loops:
+        glBegin(GL_LINE_LOOP)
+        for point in points:
+            glVertex3fv(point.np_vector)
+        glEnd()
+
+
+def emit_faces(faces, inner_point=None):
+    glBegin(GL_TRIANGLES)
+    for face in faces:
+        first_point = face.points[0].np_vector
+        glNormal3fv(find_normal_figure2(face, inner_point))
+        for i in range(2, len(face.points)):
+            glVertex3fv(first_point)
+            glVertex3fv(face.points[i - 1].np_vector)
+            glVertex3fv(face.points[i].np_vector)
     glEnd()
 
 
-def draw_figure2(figure, inner_point=None):
-    set_material(FIGURE2_COLOR)
-    first_point = figure.points[0].np_vector
-    normal_vec = find_normal_figure2(figure, inner_point)
-    for i in range(2, len(figure.points)):
-        glBegin(GL_POLYGON)
-        glNormal3fv(normal_vec)
-        glVertex3fv(first_point)
-        glVertex3fv(figure.points[i - 1].np_vector)
-        glVertex3fv(figure.points[i].np_vector)
-        glEnd()
-    draw_contur2(figure.points, color=EDGE_COLOR)
+def emit_solid(figure):
+    figure.update_face_normals()
+    emit_faces(figure.faces, figure.get_center())
 
 
-def draw_plane(figure):
-    set_material(PLANE_COLOR)
+def emit_plane(figure):
     glBegin(GL_POLYGON)
     glNormal3fv(figure.normal)
     if len(figure.contur) > 0:
         for segment in figure.contur[0].segments:
             glVertex3fv(segment.point_a.np_vector)
-        glEnd()
-        draw_contur2([el.point_a for el in figure.contur[0].segments])
     else:
         # не забыть: size меньше 2000,
-        size = 1000
-        glVertex3f(size, size, figure.count_new_z(size, size))
-        glVertex3f(size, -size, figure.count_new_z(size, -size))
-        glVertex3f(-size, -size, figure.count_new_z(-size, -size))
-        glVertex3f(-size, size, figure.count_new_z(-size, size))
-        glEnd()
+        corners = figure.infinite_corners(1000)
+        for corner in [] if corners is None else corners:
+            glVertex3fv(corner)
+    glEnd()
+
+
+def plane_contur_points(figure):
+    if len(figure.contur) == 0:
+        return []
+    return [[el.point_a for el in figure.contur[0].segments]]
+
+
+@out_light
+def draw_point(figure):
+    emit_points([figure])
+
+
+@out_light
+def draw_segment(figure, color=SEGMENT_COLOR):
+    emit_segments([figure], color)
+
+
+@out_light
+def draw_contur2(points, color=SEGMENT_COLOR):
+    emit_loops([points], color)
+
+
+def draw_figure2(figure, inner_point=None):
+    set_material(FIGURE2_COLOR)
+    emit_faces([figure], inner_point)
+    draw_contur2(figure.points, color=EDGE_COLOR)
+
+
+def draw_plane(figure):
+    set_material(PLANE_COLOR)
+    emit_plane(figure)
+    for points in plane_contur_points(figure):
+        draw_contur2(points)
 
 
 def draw_figure3(figure):
-    for face in figure.faces:
-        draw_figure2(face, figure.get_center())
+    set_material(FIGURE2_COLOR)
+    emit_solid(figure)
+    glDisable(GL_LIGHTING)
+    emit_loops([face.points for face in figure.faces], EDGE_COLOR)
+    glEnable(GL_LIGHTING)
 
 
 def draw_light(figure):
     glLightfv(figure.lightGL, GL_POSITION, [figure.x, figure.y, figure.z, 0.0])
+
+
+class GLStateCache:
+    # известное состояние GL, None - неизвестно (его меняли в обход)
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.lighting = None
+        self.material = None
+        self.lighting_changes = 0
+        self.material_changes = 0
+        self.elided_changes = 0
+
+    def set_lighting(self, enabled: bool):
+        if self.lighting == enabled:
+            self.elided_changes += 1
+            return
+        if enabled:
+            glEnable(GL_LIGHTING)
+        else:
+            glDisable(GL_LIGHTING)
+        self.lighting = enabled
+        self.lighting_changes += 1
+
+    def set_material(self, color: tuple):
+        self.set_lighting(True)
+        if self.material == color:
+            self.elided_changes += 1
+            return
+        apply_material(color)
+        self.material = color
+        self.material_changes += 1
+
+
+# порядок в очереди: свет, затем грани по материалам, затем линии и точки
+RANK_LIGHT = 0
+RANK_LIT = 1
+RANK_UNLIT = 2
+
+
+class RenderQueue:
+    # модуль отрисовки: draw_* копят элементы, flush рисует их по состояниям
+    def __init__(self):
+        self.items = []
+        self.state = GLStateCache()
+        self.owner = None
+        self.entity = None
+        self.slot = 0
+        self.frame_stats = dict()
+
+    def begin_entity(self, name: str, version: int, entity=None):
+        # элементы сущности кэшируются в списках по (имя, номер)
+        self.owner = (name, version)
+        self.entity = entity
+        self.slot = 0
+
+    def add(self, rank: int, color, emit: callable, *args):
+        key = (rank, () if color is None else tuple(color))
+        self.items.append(
+            (key, self.owner, self.entity, self.slot, emit, args)
+        )
+        self.slot += 1
+
+    def draw_point(self, figure):
+        self.add(RANK_UNLIT, None, emit_points, [figure])
+
+    def draw_segment(self, figure, color=SEGMENT_COLOR):
+        self.add(RANK_UNLIT, None, emit_segments, [figure], color)
+
+    def draw_figure2(self, figure, inner_point=None):
+        self.add(RANK_LIT, FIGURE2_COLOR, emit_faces, [figure], inner_point)
+        self.add(RANK_UNLIT, None, emit_loops, [figure.points], EDGE_COLOR)
+
+    def draw_plane(self, figure):
+        self.add(RANK_LIT, PLANE_COLOR, emit_plane, figure)
+        self.add(
+            RANK_UNLIT, None, emit_loops, plane_contur_points(figure),
+            SEGMENT_COLOR
+        )
+
+    def draw_figure3(self, figure):
+        self.add(RANK_LIT, FIGURE2_COLOR, emit_solid, figure)
+        self.add(
+            RANK_UNLIT, None, emit_loops,
+            [face.points for face in figure.faces], EDGE_COLOR
+        )
+
+    def draw_light(self, figure):
+        self.add(RANK_LIGHT, None, draw_light, figure)
+
+    def flush(self, display_lists=None, profiler=None):
+        # сортировка устойчивая: внутри состояния порядок отправки
+        self.items.sort(key=lambda el: el[0])
+        self.state.reset()
+        for (rank, color), owner, entity, slot, emit, args in self.items:
+            if rank == RANK_LIT:
+                self.state.set_material(color)
+            elif rank == RANK_UNLIT:
+                self.state.set_lighting(False)
+            start = time.perf_counter()
+            if display_lists is None or owner is None:
+                emit(*args)
+            else:
+                display_lists.call(owner[0], slot, owner[1], emit, *args)
+            if profiler is not None and entity is not None:
+                # элементы одной сущности разнесены по состояниям
+                profiler.record_entity(
+                    entity, time.perf_counter() - start, False
+                )
+        # остальной код рассчитывает на включенное освещение
+        self.state.set_lighting(True)
+        self.frame_stats = {
+            "queue items": len(self.items),
+            "lighting changes": self.state.lighting_changes,
+            "material changes": self.state.material_changes,
+            "elided changes": self.state.elided_changes,
+        }
+        self.items = []
+        self.owner = None
+        self.entity = None
+        return self.frame_stats
+
+
+class DisplayListCache:
+    def __init__(self):
+        # имя сущности -> {номер: (номер списка, версия при компиляции)}
+        self.lists = defaultdict(dict)
+        self.pending_delete = []
+        self.compiled_count = 0
+        self.replayed_count = 0
+
+    def begin_frame(self):
+        for list_id in self.pending_delete:
+            glDeleteLists(list_id, 1)
+        self.pending_delete = []
+        self.compiled_count = 0
+        self.replayed_count = 0
+
+    def call(self, name: str, slot, version: int, emit: callable, *args):
+        list_id, compiled_version = self.lists[name].get(slot, (None, None))
+        if list_id is not None and compiled_version == version:
+            glCallList(list_id)
+            self.replayed_count += 1
+            return
+        if list_id is None:
+            list_id = glGenLists(1)
+        glNewList(list_id, GL_COMPILE_AND_EXECUTE)
+        try:
+            emit(*args)
+        finally:
+            glEndList()
+        self.lists[name][slot] = (list_id, version)
+        self.compiled_count += 1
+
+    def draw(self, entity, version: int):
+        self.call(entity.name, None, version, entity.draw_shape)
+
+    def discard(self, names):
+        # контекст здесь может быть не текущим, удаление - в начале кадра
+        for name in names:
+            for list_id, _ in self.lists.pop(name, dict()).values():
+                self.pending_delete.append(list_id)
+
+    def discard_all(self):
+        self.discard(list(self.lists))
+
+    def flush(self):
+        # контекст текущий: списки удаляются сразу
+        self.discard_all()
+        self.begin_frame()
+
+    def forget(self):
+        # контекст пересоздан, старые номера списков недействительны
+        self.lists.clear()
+        self.pending_delete = []
+
+
+set_draw_backend(sys.modules[__name__])
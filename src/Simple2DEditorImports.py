@@ -4,10 +4,16 @@ import sys
 import os
 import traceback
 from collections import deque, defaultdict
+from contextlib import contextmanager
 import math
 import pickle
+import json
+import queue
+import threading
+import uuid
+import zipfile
+import concurrent.futures
 from pathlib import Path
-from PIL import Image
 
 ERROR_EXCEPTION = 1
 ERROR_WRONG_SETTINGS = 2
@@ -17,12 +23,6 @@ ERROR_QT_VERSION = 5
 ERROR_OPENGL_VERSION = 6
 ERROR_NUMPY_VERSION = 6
 
-PLANE_COLOR = [0.2, 0.7, 0.3, 1.0]
-FIGURE2_COLOR = [0.2, 0.2, 0.9, 1.0]
-SEGMENT_COLOR = [0.0, 0.9, 0.6, 1.0]
-EDGE_COLOR = [0.0, 0.0, 0.0, 1.0]
-POINT_COLOR = [1.0, 0.0, 0.0, 1.0]
-
 if sys.version_info < (3, 10):
     print('Use python >= 3.10', file=sys.stderr)
     sys.exit(ERROR_PYTHON_VERSION)
@@ -60,9 +60,10 @@ except Exception as e:
     sys.exit(ERROR_NUMPY_VERSION)
 
 try:
+    from src.SceneCore import *
     from src.ShapeOpenGLDrawers import *
-    from src.BasicShapes import *
-    from src.SceneBase import *
+    from src.SceneBufferRenderer import *
+    from src.OffscreenRenderer import *
     from src.AddingWindows import *
     from src.QtApp import *
 except Exception as e:
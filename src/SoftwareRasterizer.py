@@ -0,0 +1,437 @@
+from collections import defaultdict
+
+import numpy as np
+
+from src.SceneColors import *
+from src.BasicShapes import (
+    LightPoint, Plane, Figure3, gather_coordinates, using_draw_backend
+)
+from src.SceneCamera import (
+    FIELD_OF_VIEW, NEAR_PLANE, FAR_PLANE, perspective_matrix,
+    look_at_matrix, camera_eye
+)
+
+# как у GLWidget: glClearColor
+BACKGROUND_COLOR = [0.3, 0.3, 0.3]
+# GL_LIGHT0, единственный включенный источник
+LIGHT0 = 0x4000
+# направление GL_LIGHT0 из initializeGL
+DEFAULT_LIGHT_DIRECTION = [-100.0, 100.0, 100.0]
+POINT_SIZE = 4
+LINE_WIDTH = 2
+# линии и точки поверх граней, как ребра в окне
+LINE_DEPTH_BIAS = 1e-5
+# ограничение памяти на кандидатов-пикселей за один проход
+FRAGMENTS_PER_CHUNK = 1 << 22
+
+
+def color_to_bytes(colors):
+    # преобразование float -> ubyte как в OpenGL
+    return np.floor(np.clip(colors, 0.0, 1.0) * 255 + 0.5).astype(np.uint8)
+
+
+def shade(
+        color, normals, light_direction, shininess=100.0, ambient=0.2,
+        diffuse=0.9, specular=0.001
+):
+    # модель освещения фиксированного конвейера с материалом set_material
+    # и глобальным фоновым светом [1, 1, 1]; наблюдатель в бесконечности
+    color = np.asarray(color[:3], dtype=float)
+    normals = np.asarray(normals, dtype=float).reshape(-1, 3)
+    lengths = np.linalg.norm(normals, axis=1, keepdims=True)
+    normals = normals / np.where(lengths == 0, 1.0, lengths)
+    n_dot_l = np.maximum(normals @ light_direction, 0.0)
+    half = light_direction + np.array([0.0, 0.0, 1.0])
+    half /= np.linalg.norm(half)
+    n_dot_h = np.where(
+        n_dot_l > 0, np.maximum(normals @ half, 0.0) ** shininess, 0.0
+    )
+    return (
+        color * ambient
+        + color * diffuse * n_dot_l[:, None]
+        + specular * n_dot_h[:, None]
+    )
+
+
+def fan_triangles(count: int):
+    return np.stack(
+        [
+            np.zeros(count - 2, dtype=int),
+            np.arange(1, count - 1),
+            np.arange(2, count)
+        ],
+        axis=1
+    )
+
+
+def clip_polygon_near(polygon):
+    # Сазерленд-Ходжмен по плоскости z + w >= 0 в пространстве отсечения
+    result = []
+    for i in range(len(polygon)):
+        current = polygon[i]
+        previous = polygon[i - 1]
+        current_in = current[2] + current[3] >= 0
+        previous_in = previous[2] + previous[3] >= 0
+        if current_in != previous_in:
+            d_prev = previous[2] + previous[3]
+            d_curr = current[2] + current[3]
+            t = d_prev / (d_prev - d_curr)
+            result.append(previous + t * (current - previous))
+        if current_in:
+            result.append(current)
+    return result
+
+
+def join_batches(batches):
+    return tuple(np.concatenate(el) for el in zip(*batches))
+
+
+class SoftwareRasterizer:
+    def __init__(self, width: int, height: int):
+        self.width = width
+        self.height = height
+        self.matrix = np.identity(4)
+        self.clear()
+
+    def set_camera(self, rotation: float, lifting: float, distance: float):
+        self.matrix = perspective_matrix(
+            FIELD_OF_VIEW, self.width / self.height, NEAR_PLANE, FAR_PLANE
+        ) @ look_at_matrix(
+            camera_eye(rotation, lifting, distance),
+            [0.0, 0.0, 0.0],
+            [0.0, 0.0, 1.0]
+        )
+
+    def clear(self):
+        self.light_direction = np.array(DEFAULT_LIGHT_DIRECTION)
+        self.light_direction /= np.linalg.norm(self.light_direction)
+        self.triangles = []
+        self.lines = []
+        self.points = []
+        self.primitive_count = 0
+
+    def next_orders(self, count: int):
+        # порядок отправки: при равной глубине побеждает ранний (GL_LESS)
+        start = self.primitive_count
+        self.primitive_count += count
+        return np.arange(start, start + count)
+
+    def add_triangles(self, vertices, colors):
+        vertices = np.asarray(vertices, dtype=float).reshape(-1, 3, 3)
+        colors = np.broadcast_to(colors, (len(vertices), 3))
+        self.triangles.append(
+            (vertices, colors, self.next_orders(len(vertices)))
+        )
+
+    def add_lines(self, vertices, color):
+        vertices = np.asarray(vertices, dtype=float).reshape(-1, 2, 3)
+        colors = np.broadcast_to(color[:3], (len(vertices), 3))
+        self.lines.append((vertices, colors, self.next_orders(len(vertices))))
+
+    def add_points(self, vertices, color):
+        vertices = np.asarray(vertices, dtype=float).reshape(-1, 3)
+        colors = np.broadcast_to(color[:3], (len(vertices), 3))
+        self.points.append(
+            (vertices, colors, self.next_orders(len(vertices)))
+        )
+
+    def add_polygon(self, vertices, color, normal):
+        vertices = np.asarray(vertices, dtype=float).reshape(-1, 3)
+        if len(vertices) < 3:
+            return
+        self.add_triangles(
+            vertices[fan_triangles(len(vertices))],
+            shade(color, normal, self.light_direction)
+        )
+
+    def add_loop(self, vertices, color):
+        vertices = np.asarray(vertices, dtype=float).reshape(-1, 3)
+        self.add_lines(
+            np.stack([vertices, np.roll(vertices, -1, axis=0)], axis=1),
+            color
+        )
+
+    def draw_point(self, figure):
+        self.add_points(figure.np_vector, POINT_COLOR)
+
+    def draw_segment(self, figure, color=SEGMENT_COLOR):
+        self.add_lines(
+            [figure.point_a.np_vector, figure.point_b.np_vector], color
+        )
+
+    def draw_figure2(self, figure, inner_point=None):
+        vertices = gather_coordinates([figure.points])[0]
+        self.add_polygon(
+            vertices, FIGURE2_COLOR, figure.get_normal(inner_point)
+        )
+        self.add_loop(vertices, EDGE_COLOR)
+
+    def draw_plane(self, figure):
+        if len(figure.contur) > 0:
+            vertices = gather_coordinates(
+                [[el.point_a for el in figure.contur[0].segments]]
+            )[0]
+            self.add_polygon(vertices, PLANE_COLOR, figure.normal)
+            self.add_loop(vertices, SEGMENT_COLOR)
+            return
+        # не забыть: size меньше 2000,
+        corners = figure.infinite_corners(1000)
+        if corners is not None:
+            self.add_polygon(corners, PLANE_COLOR, figure.normal)
+
+    def draw_figure3(self, figure):
+        figure.update_face_normals()
+        center = figure.get_center()
+        groups = defaultdict(list)
+        for face in figure.faces:
+            groups[len(face.points)].append(face)
+        # грани с одинаковым числом вершин - одним массивом
+        for count, faces in groups.items():
+            if count < 3:
+                continue
+            vertices = gather_coordinates([el.points for el in faces])
+            colors = shade(
+                FIGURE2_COLOR,
+                [el.get_normal(center) for el in faces],
+                self.light_direction
+            )
+            fan = fan_triangles(count)
+            self.add_triangles(
+                vertices[:, fan].reshape(-1, 3, 3),
+                np.repeat(colors, len(fan), axis=0)
+            )
+            self.add_lines(
+                np.stack(
+                    [vertices, np.roll(vertices, -1, axis=1)], axis=2
+                ).reshape(-1, 2, 3),
+                EDGE_COLOR
+            )
+
+    def draw_light(self, figure):
+        if figure.lightGL != LIGHT0:
+            return
+        direction = np.array(figure.coordinates, dtype=float)
+        if np.linalg.norm(direction) > 0:
+            self.light_direction = direction / np.linalg.norm(direction)
+
+    def project(self, vertices):
+        vertices = np.asarray(vertices, dtype=float)
+        homogeneous = np.concatenate(
+            [vertices, np.ones(vertices.shape[:-1] + (1,))], axis=-1
+        )
+        return homogeneous @ self.matrix.T
+
+    def to_window(self, clip):
+        ndc = clip[..., :3] / clip[..., 3:]
+        return np.stack(
+            [
+                (ndc[..., 0] + 1) / 2 * self.width,
+                (ndc[..., 1] + 1) / 2 * self.height,
+                (ndc[..., 2] + 1) / 2
+            ],
+            axis=-1
+        )
+
+    def clip_triangles(self, clip, colors, orders):
+        inside = (clip[..., 2] + clip[..., 3] >= 0).all(axis=1)
+        if inside.all():
+            return clip, colors, orders
+        # треугольники через ближнюю плоскость режутся поштучно, их мало
+        result = [clip[inside]]
+        result_colors = [colors[inside]]
+        result_orders = [orders[inside]]
+        for i in np.flatnonzero(~inside):
+            polygon = clip_polygon_near(list(clip[i]))
+            for j in range(1, len(polygon) - 1):
+                result.append(
+                    np.array([[polygon[0], polygon[j], polygon[j + 1]]])
+                )
+                result_colors.append(colors[i:i + 1])
+                result_orders.append(orders[i:i + 1])
+        return (
+            np.concatenate(result),
+            np.concatenate(result_colors),
+            np.concatenate(result_orders)
+        )
+
+    def triangle_fragments(self, vertices, colors, orders):
+        clip, colors, orders = self.clip_triangles(
+            self.project(vertices), colors, orders
+        )
+        window = self.to_window(clip)
+        x0 = np.clip(np.floor(window[..., 0].min(axis=1)), 0, self.width)
+        x1 = np.clip(np.ceil(window[..., 0].max(axis=1)), 0, self.width)
+        y0 = np.clip(np.floor(window[..., 1].min(axis=1)), 0, self.height)
+        y1 = np.clip(np.ceil(window[..., 1].max(axis=1)), 0, self.height)
+        widths = (x1 - x0).astype(np.int64)
+        areas = widths * (y1 - y0).astype(np.int64)
+        start = 0
+        while start < len(window):
+            # кусок треугольников, чтобы кандидатов было не слишком много
+            end = start + 1
+            total = areas[start]
+            while end < len(window) and total + areas[end] <= (
+                    FRAGMENTS_PER_CHUNK
+            ):
+                total += areas[end]
+                end += 1
+            yield self.rasterize_chunk(
+                window[start:end], colors[start:end], orders[start:end],
+                x0[start:end], y0[start:end], widths[start:end],
+                areas[start:end]
+            )
+            start = end
+
+    def rasterize_chunk(
+            self, window, colors, orders, x0, y0, widths, areas
+    ):
+        triangle = np.repeat(np.arange(len(window)), areas)
+        offsets = np.arange(len(triangle)) - np.repeat(
+            np.cumsum(areas) - areas, areas
+        )
+        width = np.maximum(widths[triangle], 1)
+        px = x0[triangle].astype(np.int64) + offsets % width
+        py = y0[triangle].astype(np.int64) + offsets // width
+        sx = px + 0.5
+        sy = py + 0.5
+        a = window[triangle, 0]
+        b = window[triangle, 1]
+        c = window[triangle, 2]
+
+        def edge(p, q):
+            return (
+                (q[:, 0] - p[:, 0]) * (sy - p[:, 1])
+                - (q[:, 1] - p[:, 1]) * (sx - p[:, 0])
+            )
+
+        w0 = edge(b, c)
+        w1 = edge(c, a)
+        w2 = edge(a, b)
+        area = w0 + w1 + w2
+        inside = (area != 0) & (
+            ((w0 >= 0) & (w1 >= 0) & (w2 >= 0))
+            | ((w0 <= 0) & (w1 <= 0) & (w2 <= 0))
+        )
+        area = np.where(area == 0, 1.0, area)
+        depth = (w0 * a[:, 2] + w1 * b[:, 2] + w2 * c[:, 2]) / area
+        return (
+            px[inside], py[inside], depth[inside],
+            orders[triangle[inside]], colors[triangle[inside]]
+        )
+
+    def clip_lines(self, clip):
+        distance = clip[..., 2] + clip[..., 3]
+        keep = (distance >= 0).any(axis=1)
+        clip = clip[keep].copy()
+        distance = distance[keep]
+        for end in (0, 1):
+            outside = distance[:, end] < 0
+            t = distance[outside, end] / (
+                distance[outside, end] - distance[outside, 1 - end]
+            )
+            clip[outside, end] += t[:, None] * (
+                clip[outside, 1 - end] - clip[outside, end]
+            )
+        return clip, keep
+
+    def line_fragments(self, vertices, colors, orders):
+        clip, keep = self.clip_lines(self.project(vertices))
+        window = self.to_window(clip)
+        colors = colors[keep]
+        orders = orders[keep]
+        delta = window[:, 1] - window[:, 0]
+        steps = np.ceil(np.abs(delta[:, :2]).max(axis=1)).astype(np.int64)
+        steps = np.minimum(steps, 4 * (self.width + self.height)) + 1
+        line = np.repeat(np.arange(len(window)), steps)
+        offsets = np.arange(len(line)) - np.repeat(
+            np.cumsum(steps) - steps, steps
+        )
+        t = offsets / np.maximum(steps[line] - 1, 1)
+        samples = window[line, 0] + t[:, None] * delta[line]
+        px = np.floor(samples[:, 0]).astype(np.int64)
+        py = np.floor(samples[:, 1]).astype(np.int64)
+        depth = samples[:, 2] - LINE_DEPTH_BIAS
+        # толщина линии - соседний пиксель поперек основного направления
+        steep = np.abs(delta[line, 1]) > np.abs(delta[line, 0])
+        return (
+            np.concatenate([px, px + (~steep)]),
+            np.concatenate([py, py + steep]),
+            np.tile(depth, LINE_WIDTH),
+            np.tile(orders[line], LINE_WIDTH),
+            np.tile(colors[line], (LINE_WIDTH, 1))
+        )
+
+    def point_fragments(self, vertices, colors, orders):
+        clip = self.project(vertices)
+        keep = clip[:, 2] + clip[:, 3] >= 0
+        window = self.to_window(clip[keep])
+        offsets = np.arange(POINT_SIZE) - POINT_SIZE // 2
+        dx, dy = np.meshgrid(offsets, offsets)
+        count = POINT_SIZE * POINT_SIZE
+        px = np.floor(window[:, 0]).astype(np.int64)[:, None] + dx.ravel()
+        py = np.floor(window[:, 1]).astype(np.int64)[:, None] + dy.ravel()
+        return (
+            px.ravel(), py.ravel(),
+            np.repeat(window[:, 2] - LINE_DEPTH_BIAS, count),
+            np.repeat(orders[keep], count),
+            np.repeat(colors[keep], count, axis=0)
+        )
+
+    def fragments(self):
+        # все примитивы одного вида - один проход по массивам
+        if self.triangles:
+            yield from self.triangle_fragments(*join_batches(self.triangles))
+        if self.lines:
+            yield self.line_fragments(*join_batches(self.lines))
+        if self.points:
+            yield self.point_fragments(*join_batches(self.points))
+
+    def rasterize(self):
+        image = np.empty(shape=(self.height * self.width, 3), dtype=np.uint8)
+        image[:] = color_to_bytes(BACKGROUND_COLOR)
+        parts = [el for el in self.fragments() if len(el[0])]
+        if not parts:
+            return image.reshape(self.height, self.width, 3)
+        px, py, depth, orders, colors = (
+            np.concatenate(el) for el in zip(*parts)
+        )
+        visible = (
+            (px >= 0) & (px < self.width) & (py >= 0) & (py < self.height)
+            & (depth >= 0) & (depth <= 1)
+        )
+        pixel = (py * self.width + px)[visible]
+        depth = depth[visible]
+        orders = orders[visible]
+        colors = colors[visible]
+        # z-буфер: на пиксель - ближайший, при равенстве - ранний
+        order = np.lexsort((orders, depth, pixel))
+        pixel = pixel[order]
+        first = np.ones(len(pixel), dtype=bool)
+        first[1:] = pixel[1:] != pixel[:-1]
+        image[pixel[first]] = color_to_bytes(colors[order][first])
+        return image.reshape(self.height, self.width, 3)
+
+    def render(self, entities: dict, camera):
+        # тот же порядок, что у SceneBufferRenderer: свет, тела, остальное
+        self.set_camera(*camera)
+        self.clear()
+        with using_draw_backend(self):
+            for entity in entities.values():
+                if isinstance(entity, Plane):
+                    entity.refresh()
+                elif isinstance(entity, LightPoint):
+                    entity.draw_shape()
+            drawn_faces = set()
+            for entity in entities.values():
+                if isinstance(entity, Figure3):
+                    entity.draw_shape()
+                    drawn_faces.update(id(el) for el in entity.faces)
+            for entity in entities.values():
+                if isinstance(entity, (LightPoint, Figure3)):
+                    continue
+                if isinstance(entity, Plane):
+                    self.draw_plane(entity)
+                elif id(entity) not in drawn_faces:
+                    entity.draw_shape()
+        # строки снизу вверх, как у glReadPixels
+        return self.rasterize().tobytes(), self.width, self.height
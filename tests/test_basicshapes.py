@@ -35,6 +35,42 @@ class TestBasicShape(unittest.TestCase):
         self.assertEqual(self.shape.child_shapes, children)
 
 
+class TestCoordinateStore(unittest.TestCase):
+    def setUp(self):
+        self.store = CoordinateStore(capacity=2)
+
+    def test_allocate_and_grow(self):
+        indices = [self.store.allocate((i, i, i)) for i in range(5)]
+        self.assertEqual(indices, [0, 1, 2, 3, 4])
+        self.assertEqual(self.store.size, 5)
+        self.assertGreaterEqual(len(self.store.data), 5)
+        np.testing.assert_array_equal(self.store.used[:, 0], range(5))
+
+    def test_release_reuses_index(self):
+        self.store.allocate((1, 1, 1))
+        index = self.store.allocate((2, 2, 2))
+        self.store.release(index)
+        self.assertEqual(self.store.allocate((3, 3, 3)), index)
+        np.testing.assert_array_equal(self.store.data[index], [3, 3, 3])
+
+    def test_points_share_store(self):
+        point_a = Point("a", 1.0, 2.0, 3.0, self.store)
+        point_b = Point("b", 4.0, 5.0, 6.0, self.store)
+        point_c = Point("c", 7.0, 8.0, 9.0, self.store)
+        point_b.y = 10.0
+        np.testing.assert_array_equal(
+            self.store.used, [[1, 2, 3], [4, 10, 6], [7, 8, 9]]
+        )
+        self.assertEqual(point_a.x, 1.0)
+        self.assertEqual(point_c.z, 9.0)
+
+    def test_move_to_store(self):
+        point = Point("a", 1.0, 2.0, 3.0)
+        point.move_to_store(self.store)
+        self.assertIs(point.store, self.store)
+        np.testing.assert_array_equal(self.store.used, [[1.0, 2.0, 3.0]])
+
+
 class TestPoint(unittest.TestCase):
     def setUp(self):
         self.point = Point("test_point", 1.0, 2.0, 3.0)
@@ -49,6 +85,25 @@ class TestPoint(unittest.TestCase):
         np.testing.assert_array_equal(
             self.point.np_vector, np.array([1.0, 2.0, 3.0])
         )
+        with self.assertRaises(ValueError):
+            self.point.np_vector[0] = 5.0
+        self.assertEqual(self.point.x, 1.0)
+
+    def test_move_notifies_dependents(self):
+        dependent = MagicMock()
+        self.point.add_dependent(dependent)
+        self.point.add_dependent(dependent)
+        self.point.x = 5.0
+        dependent.on_point_moved.assert_called_once_with(self.point)
+
+    def test_old_pickle_state(self):
+        point = Point.__new__(Point)
+        point.__setstate__(
+            {"name": "old", "x": 1.0, "y": 2.0, "z": 3.0,
+             "child_shapes": None, "last_update": 0}
+        )
+        np.testing.assert_array_equal(point.np_vector, [1.0, 2.0, 3.0])
+        self.assertEqual(point.dependents, [])
 
 
 class TestLightPoint(unittest.TestCase):
@@ -108,6 +163,45 @@ class TestFigure2(unittest.TestCase):
         self.assertEqual(self.figure.z, 0.0)
 
 
+class TestFigure2Normal(unittest.TestCase):
+    def setUp(self):
+        self.points = [
+            Point("point_0", 0.0, 0.0, 0.0),
+            Point("point_1", 1.0, 0.0, 0.0),
+            Point("point_2", 0.0, 1.0, 0.0)
+        ]
+        self.figure = Figure2("test_figure", self.points)
+
+    def test_normal_is_cached(self):
+        normal = self.figure.get_normal()
+        self.assertIs(self.figure.get_normal(), normal)
+        np.testing.assert_array_almost_equal(np.abs(normal), [0, 0, 1])
+        np.testing.assert_array_almost_equal(
+            self.figure.get_centroid(), [1 / 3, 1 / 3, 0]
+        )
+
+    def test_normal_oriented_from_inner_point(self):
+        normal = self.figure.get_normal(np.array([0.0, 0.0, -1.0]))
+        np.testing.assert_array_almost_equal(normal, [0, 0, 1])
+        normal = self.figure.get_normal(np.array([0.0, 0.0, 1.0]))
+        np.testing.assert_array_almost_equal(normal, [0, 0, -1])
+
+    def test_point_move_invalidates_cache(self):
+        self.figure.get_normal()
+        self.points[2].set(x=0.0, y=0.0, z=1.0, upd=1)
+        self.assertIsNone(self.figure.normal_cache)
+        np.testing.assert_array_almost_equal(
+            np.abs(self.figure.get_normal()), [0, 1, 0]
+        )
+
+    def test_pickle_relinks_points(self):
+        figure = pickle.loads(pickle.dumps(self.figure))
+        self.assertIn(figure, figure.points[0].dependents)
+        figure.get_normal()
+        figure.points[0].z = 5.0
+        self.assertIsNone(figure.normal_cache)
+
+
 class TestPlane(unittest.TestCase):
     def setUp(self):
         self.point = Point("plane_point", 0.0, 0.0, 0.0)
@@ -119,14 +213,9 @@ class TestPlane(unittest.TestCase):
             self.plane.normal, np.array([0.0, 0.0, 0.0])
         )
         self.assertEqual(self.plane.point_a, self.point)
-        self.assertEqual(self.plane.redraw, 0)
+        self.assertTrue(self.plane.is_dirty)
         self.assertEqual(self.plane.contur, [])
 
-    def test_count_new_z(self):
-        self.plane.normal = np.array([1.0, 1.0, 1.0])
-        z = self.plane.count_new_z(1.0, 1.0)
-        self.assertEqual(z, -2.0)
-
     def test_add_contur(self):
         segment = Segment("seg", Point("p1", 0, 0, 0), Point("p2", 1, 1, 1))
         contur = Contur2("contur", [segment])
@@ -164,6 +253,65 @@ class TestPlaneBy3Point(unittest.TestCase):
         self.assertEqual(self.plane.y, 0.0)
         self.assertEqual(self.plane.z, 0.0)
 
+    def test_refresh_only_when_dirty(self):
+        self.assertFalse(self.plane.is_dirty)
+        self.assertFalse(self.plane.refresh())
+        self.points[2].x = 5.0
+        self.assertTrue(self.plane.is_dirty)
+        self.assertTrue(self.plane.refresh())
+        self.assertFalse(self.plane.is_dirty)
+        self.assertNotEqual(np.linalg.norm(self.plane.normal), 0.0)
+
+    def test_pickle_relinks_points(self):
+        plane = pickle.loads(pickle.dumps(self.plane))
+        plane.refresh()
+        plane.point_c.x = 5.0
+        self.assertTrue(plane.is_dirty)
+
+
+class TestPlaneContur(unittest.TestCase):
+    def make_contur(self, plane, n):
+        store = CoordinateStore()
+        points = [
+            Point(f"p_{i}", math.cos(i), math.sin(i), 3.0, store)
+            for i in range(n)
+        ]
+        segments = [
+            Segment(f"s_{i}", points[i], points[(i + 1) % n])
+            for i in range(n)
+        ]
+        plane.add_contur(Contur2("contur", segments))
+        return points
+
+    def test_projection_onto_tilted_plane(self):
+        plane = PlaneBy3Point(
+            "plane", Point("a", 0, 0, 0), Point("b", 1, 0, 1),
+            Point("c", 0, 1, 2)
+        )
+        points = self.make_contur(plane, 50)
+        coordinates = gather_coordinates([points])[0]
+        np.testing.assert_array_almost_equal(
+            coordinates @ plane.normal, np.zeros(50)
+        )
+
+    def test_vertical_plane(self):
+        plane = PlaneBy3Point(
+            "plane", Point("a", 1, 0, 0), Point("b", 1, 1, 0),
+            Point("c", 1, 0, 1)
+        )
+        points = self.make_contur(plane, 6)
+        for point in points:
+            self.assertAlmostEqual(point.x, 1.0)
+            self.assertAlmostEqual(point.z, 3.0)
+        corners = plane.infinite_corners(10.0)
+        np.testing.assert_array_almost_equal(corners[:, 0], np.ones(4))
+
+    def test_degenerate_plane_keeps_points(self):
+        plane = Plane("plane", Point("a", 0, 0, 0))
+        points = self.make_contur(plane, 4)
+        self.assertEqual(points[0].z, 3.0)
+        self.assertIsNone(plane.infinite_corners(10.0))
+
 
 class TestPlaneByPointSegment(unittest.TestCase):
     def setUp(self):
@@ -195,6 +343,13 @@ class TestPlaneByPlane(unittest.TestCase):
         self.plane.update_plane()
         np.testing.assert_array_equal(self.plane.normal, self.base_plane.normal)
 
+    def test_follows_base_plane(self):
+        self.base_plane.normal = np.array([0.0, 0.0, 1.0])
+        self.base_point.z = 1.0
+        self.assertTrue(self.plane.refresh())
+        np.testing.assert_array_equal(self.plane.normal, [0.0, 0.0, 1.0])
+        self.assertFalse(self.plane.refresh())
+
     def test_update_coordinates(self):
         self.plane.set(x=1.0, y=2.0, z=3.0, upd=1)
         self.assertEqual(self.plane.point_a.last_update, 1)
@@ -227,5 +382,88 @@ class TestFigure3(unittest.TestCase):
         np.testing.assert_array_almost_equal(center, np.array([1.0, 1.0, 1.0]))
 
 
+class TestFigure3Bounds(unittest.TestCase):
+    def setUp(self):
+        self.points = [
+            Point("point_0", 0.0, 0.0, 0.0),
+            Point("point_1", 2.0, 0.0, 0.0),
+            Point("point_2", 0.0, 2.0, 0.0),
+            Point("point_3", 0.0, 0.0, 2.0)
+        ]
+        faces = [
+            Figure2("face_0", self.points[:3]),
+            Figure2("face_1", self.points[1:])
+        ]
+        self.figure = Figure3("test_figure", faces)
+
+    def test_center_follows_point_move(self):
+        np.testing.assert_array_almost_equal(
+            self.figure.get_center(), [0.5, 0.5, 0.5]
+        )
+        self.points[0].set(x=4.0, y=0.0, z=0.0, upd=1)
+        np.testing.assert_array_almost_equal(
+            self.figure.get_center(), [1.5, 0.5, 0.5]
+        )
+
+    def test_center_follows_figure_move(self):
+        self.figure.set(x=1.0, y=2.0, z=3.0, upd=1)
+        np.testing.assert_array_almost_equal(
+            self.figure.get_center(), [1.5, 2.5, 3.5]
+        )
+
+    def test_bounding_box(self):
+        low, high = self.figure.get_bounding_box()
+        np.testing.assert_array_equal(low, [0.0, 0.0, 0.0])
+        np.testing.assert_array_equal(high, [2.0, 2.0, 2.0])
+        self.points[3].z = 5.0
+        low, high = self.figure.get_bounding_box()
+        np.testing.assert_array_equal(high, [2.0, 2.0, 5.0])
+        self.points[3].z = 1.0
+        low, high = self.figure.get_bounding_box()
+        np.testing.assert_array_equal(high, [2.0, 2.0, 1.0])
+
+    def test_pickle_restores_center(self):
+        figure = pickle.loads(pickle.dumps(self.figure))
+        next(iter(figure.points)).x += 4.0
+        np.testing.assert_array_almost_equal(
+            figure.get_center(), [1.5, 0.5, 0.5]
+        )
+
+
+class TestFigure3Normals(unittest.TestCase):
+    def setUp(self):
+        scene = Scene(MagicMock())
+        scene.add_prism_n("prism", 5, 1.0, 2.0)
+        self.figure = scene.entities["prism"]
+
+    def test_batch_matches_per_face(self):
+        center = self.figure.get_center()
+        expected = [face.get_normal(center) for face in self.figure.faces]
+        for face in self.figure.faces:
+            face.normal_cache = None
+        self.figure.update_face_normals()
+        for face, normal in zip(self.figure.faces, expected):
+            np.testing.assert_array_almost_equal(face.normal_cache, normal)
+
+    def test_normals_oriented_outside(self):
+        self.figure.update_face_normals()
+        center = self.figure.get_center()
+        for face in self.figure.faces:
+            self.assertGreater(
+                np.dot(face.get_centroid() - center, face.normal_cache), 0
+            )
+
+    def test_only_stale_faces_recomputed(self):
+        self.figure.update_face_normals()
+        cached = [face.normal_cache for face in self.figure.faces]
+        self.figure.faces[0].points[0].z += 0.5
+        self.figure.update_face_normals()
+        for face, normal in zip(self.figure.faces, cached):
+            if self.figure.faces[0].points[0] in face.points:
+                self.assertIsNot(face.normal_cache, normal)
+            else:
+                self.assertIs(face.normal_cache, normal)
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,83 @@
+from benchmarks.bench_suite import *
+import unittest
+import tempfile
+import io
+from contextlib import redirect_stdout, redirect_stderr
+from unittest.mock import patch
+
+
+class TestBenchSuite(unittest.TestCase):
+    def test_compare_results(self):
+        baseline = {"a[1]": {"min": 1.0}, "b[1]": {"min": 1.0}}
+        results = {
+            "a[1]": {"min": 1.1},
+            "b[1]": {"min": 1.5},
+            "c[1]": {"min": 9.0},
+        }
+        regressions = compare_results(results, baseline, 0.2)
+        self.assertEqual(list(regressions), ["b[1]"])
+        self.assertAlmostEqual(regressions["b[1]"], 1.5)
+
+    def test_run_suite(self):
+        cases = []
+        results = run_suite(
+            "add_sphere_nm[10,10]", quick=True, repeats=2,
+            report=lambda case, result: cases.append(case)
+        )
+        self.assertEqual(cases, ["add_sphere_nm[10,10]"])
+        self.assertEqual(results[cases[0]]["repeats"], 2)
+        self.assertLessEqual(
+            results[cases[0]]["min"], results[cases[0]]["median"]
+        )
+
+    def test_skipped_case(self):
+        def bench_nothing(param):
+            raise BenchmarkSkipped("нет контекста")
+
+        benchmarks = {"nothing": (bench_nothing, [1], [1])}
+        with patch.dict(BENCHMARKS, benchmarks, clear=True):
+            results = run_suite(quick=True)
+        self.assertEqual(results, {"nothing[1]": {"skipped": "нет контекста"}})
+        # пропущенный замер не сравнивается с базой
+        self.assertEqual(
+            compare_results(results, {"nothing[1]": {"min": 1e-9}}, 0.2), {}
+        )
+
+    def test_regression_exit_code(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / "baseline.json"
+            write_results(path, {"add_sphere_nm[10,10]": {"min": 1e-9}})
+            with redirect_stderr(io.StringIO()), \
+                    redirect_stdout(io.StringIO()):
+                code = main([
+                    "--quick", "-k", "[10,10]", "--repeats", "1",
+                    "--baseline", str(path)
+                ])
+            self.assertEqual(code, 1)
+
+    def test_missing_baseline(self):
+        with tempfile.TemporaryDirectory() as directory:
+            stderr = io.StringIO()
+            with redirect_stderr(stderr), redirect_stdout(io.StringIO()):
+                code = main([
+                    "--quick", "-k", "[10,10]", "--repeats", "1",
+                    "--baseline", str(Path(directory) / "baseline.json")
+                ])
+        self.assertEqual(code, 2)
+        self.assertIn("--save-baseline", stderr.getvalue())
+
+    def test_save_load_cleans_up(self):
+        run = bench_save_load((".s3d", 10000))
+        run()
+        cells = [el.cell_contents for el in run.__closure__]
+        path = next(
+            Path(el.name) for el in cells
+            if isinstance(el, tempfile.TemporaryDirectory)
+        )
+        self.assertTrue(path.exists())
+        del run, cells
+        self.assertFalse(path.exists())
+
+
+if __name__ == '__main__':
+    unittest.main()
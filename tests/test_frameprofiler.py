@@ -0,0 +1,106 @@
+from src.SceneCore import *
+import unittest
+import tempfile
+import csv
+import time
+from unittest.mock import MagicMock
+
+
+class TestFrameProfiler(unittest.TestCase):
+    def setUp(self):
+        self.profiler = FrameProfiler(capacity=3)
+        self.profiler.set_enabled(True)
+        self.scene = Scene()
+        self.scene.add_point("point", 0.0, 0.0, 0.0)
+        self.scene.add_figure2_n("figure", 4, 1.0)
+
+    def draw_frame(self, frame):
+        self.profiler.begin_frame(frame)
+        with self.profiler.phase("clear"):
+            pass
+        # как GLWidget.paint_profiled без очереди и буферов
+        with using_draw_backend(MagicMock()):
+            for entity in self.scene.entities.values():
+                start = time.perf_counter()
+                entity.draw_shape()
+                self.profiler.record_entity(
+                    entity, time.perf_counter() - start
+                )
+        self.profiler.end_frame()
+
+    def test_phases_and_entities(self):
+        self.draw_frame(1)
+        frame = self.profiler.frames[-1]
+        self.assertEqual(frame.frame, 1)
+        self.assertEqual(frame.entities["point"][0], "Point")
+        self.assertEqual(frame.entities["figure"][0], "Figure2")
+        self.assertIn("clear", frame.phases)
+        self.assertIn("draw Figure2", frame.phases)
+        self.assertGreaterEqual(frame.total, sum(frame.phases.values()))
+
+    def test_record_batch(self):
+        self.profiler.begin_frame(1)
+        entities = [self.scene.entities[el] for el in ("point", "figure")]
+        self.profiler.record_batch(entities, [1, 3], 0.4)
+        self.profiler.end_frame()
+        frame = self.profiler.frames[-1]
+        self.assertAlmostEqual(frame.entities["point"][1], 0.1)
+        self.assertAlmostEqual(frame.entities["figure"][1], 0.3)
+        # время уже в фазе отрисовки группы
+        self.assertEqual(dict(frame.phases), dict())
+
+    def test_ring_buffer(self):
+        for i in range(5):
+            self.draw_frame(i)
+        self.assertEqual([el.frame for el in self.profiler.frames], [2, 3, 4])
+        self.assertEqual(len(self.profiler.top_entities(1)), 1)
+
+    def test_phase_without_frame(self):
+        with self.profiler.phase("clear"):
+            pass
+        self.assertEqual(len(self.profiler.frames), 0)
+
+    def test_export(self):
+        self.draw_frame(7)
+        with tempfile.TemporaryDirectory() as directory:
+            json_path = Path(directory) / "frames.json"
+            csv_path = Path(directory) / "frames.csv"
+            self.profiler.export_json(json_path)
+            self.profiler.export_csv(csv_path)
+            with open(json_path, encoding="utf-8") as f:
+                frames = json.load(f)["frames"]
+            with open(csv_path, encoding="utf-8", newline="") as f:
+                rows = list(csv.DictReader(f))
+        self.assertEqual(frames[0]["frame"], 7)
+        self.assertEqual(frames[0]["entities"]["point"]["type"], "Point")
+        self.assertIn(
+            ("entity", "figure", "Figure2"),
+            [(el["section"], el["name"], el["type"]) for el in rows]
+        )
+
+    def test_counters(self):
+        self.profiler.begin_frame(1)
+        self.profiler.record_counters({"material changes": 2})
+        self.profiler.record_counters({"material changes": 1})
+        self.profiler.end_frame()
+        self.profiler.record_counters({"material changes": 5})
+        self.assertEqual(
+            self.profiler.frames[-1].counters, {"material changes": 3}
+        )
+        self.assertEqual(
+            self.profiler.to_records()[-1]["counters"],
+            {"material changes": 3}
+        )
+        self.assertEqual(
+            self.profiler.mean_counters(), {"material changes": 3.0}
+        )
+
+    def test_summary(self):
+        self.draw_frame(1)
+        lines = self.profiler.summary_lines()
+        self.assertTrue(lines[0].startswith("кадр"))
+        self.assertLessEqual(len(self.profiler.hud_lines()), HUD_LINES)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,114 @@
+from src.SceneCore import *
+import unittest
+
+CAMERA = (0.0, math.pi / 9, 5.0)
+
+
+class TestFrustum(unittest.TestCase):
+    def setUp(self):
+        self.frustum = Frustum.from_camera(*CAMERA, 1.0)
+
+    def visible(self, *points):
+        return self.frustum.boxes_visible(points, points).tolist()
+
+    def test_points(self):
+        eye = camera_eye(*CAMERA)
+        self.assertEqual(
+            self.visible(
+                [0.0, 0.0, 0.0],
+                # за камерой, дальше дальней плоскости и сбоку
+                eye * 2, -eye * 30, [0.0, 50.0, 0.0]
+            ),
+            [True, False, False, False]
+        )
+
+    def test_matches_projection(self):
+        rasterizer = SoftwareRasterizer(1, 1)
+        rasterizer.set_camera(*CAMERA)
+        points = np.random.default_rng(1).uniform(-20.0, 20.0, (500, 3))
+        clip = rasterizer.project(points)
+        inside = (np.abs(clip[:, :3]) <= clip[:, 3:]).all(axis=1)
+        self.assertEqual(self.visible(*points), inside.tolist())
+
+    def test_box_across_plane(self):
+        # углы снаружи, но коробка пересекает пирамиду видимости
+        low = [-50.0, -50.0, -0.1]
+        high = [50.0, 50.0, 0.1]
+        self.assertEqual(self.visible(low, high), [False, False])
+        self.assertTrue(self.frustum.boxes_visible([low], [high])[0])
+
+    def test_degenerate_camera(self):
+        frustum = Frustum.from_camera(0.0, 0.0, 0.0, 1.0)
+        point = [[0.0, 90.0, 0.0]]
+        self.assertTrue(frustum.boxes_visible(point, point)[0])
+
+
+class TestFrustumCuller(unittest.TestCase):
+    def setUp(self):
+        self.scene = Scene()
+        self.scene.add_light("light", 16384, 100.0, 100.0, 100.0)
+        self.scene.add_point("near", 0.0, 0.0, 0.0)
+        self.scene.add_point("far", 0.0, 50.0, 0.0)
+        self.scene.add_segment("segment", "near", "far")
+        self.scene.add_point("side", 1.0, 0.0, 0.0)
+        self.scene.add_plane_by_points("plane", "near", "far", "side")
+        self.scene.add_figure2_n("figure", 4, 1.0)
+        self.culler = FrustumCuller()
+        self.frustum = Frustum.from_camera(*CAMERA, 1.0)
+
+    def visible_names(self):
+        return [
+            name for name, _ in self.culler.cull(
+                self.scene.entities, self.frustum
+            )
+        ]
+
+    def test_counters(self):
+        self.scene.add_point("behind", *camera_eye(*CAMERA) * 2)
+        names = self.visible_names()
+        self.assertEqual(
+            [el for el in self.scene.entities if el not in names],
+            ["far", "behind"]
+        )
+        # свет и плоскость без контура не отсекаются
+        self.assertIn("light", names)
+        self.assertIn("plane", names)
+        self.assertEqual(
+            self.culler.frame_stats(),
+            {
+                "drawn entities": len(self.scene.entities) - 2,
+                "culled entities": 2
+            }
+        )
+
+    def test_bounds_follow_points(self):
+        self.assertIn("figure", self.visible_names())
+        self.scene.set_entity("figure", x=0.0, y=60.0, z=0.0)
+        # без invalidate габариты прошлого кадра
+        self.assertIn("figure", self.visible_names())
+        self.culler.invalidate()
+        self.assertNotIn("figure", self.visible_names())
+        self.assertEqual(self.culler.rebuild_count, 2)
+        low, high = self.scene.entities["figure"].get_bounding_box()
+        self.assertGreaterEqual(low[1], 59.0)
+
+    def test_cached_result(self):
+        names = self.visible_names()
+        self.assertEqual(self.visible_names(), names)
+        self.assertEqual(self.culler.cache_hits, 1)
+        # другая камера или правка сцены - отсечение заново
+        self.frustum = Frustum.from_camera(1.0, math.pi / 9, 5.0, 1.0)
+        self.visible_names()
+        self.culler.invalidate()
+        self.visible_names()
+        self.assertEqual(self.culler.cache_hits, 1)
+        self.assertEqual(self.culler.rebuild_count, 2)
+
+    def test_plane_with_contur(self):
+        self.scene.add_contur_n_to_plane("plane", 4, 1.0)
+        self.assertIsNotNone(self.scene.entities["plane"].get_bounding_box())
+        self.assertIn("plane", self.visible_names())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -87,6 +87,30 @@ class TestScene(unittest.TestCase):
         self.assertIn("test_point", self.scene.entities)
         self.mock_update.assert_called_once()
 
+    def test_points_use_scene_store(self):
+        self.scene.add_point("point1", 1.0, 2.0, 3.0)
+        self.scene.add_point("point2", 4.0, 5.0, 6.0)
+        self.assertIs(
+            self.scene.entities["point1"].store, self.scene.point_store
+        )
+        np.testing.assert_array_equal(
+            self.scene.point_store.used, [[1, 2, 3], [4, 5, 6]]
+        )
+
+    def test_load_demo_scene(self):
+        self.scene.load_entities_from_file(
+            Path(__file__).parent.parent / "demo_pyromid.pkl"
+        )
+        figure = self.scene.entities["ghth"]
+        for point in figure.points:
+            self.assertIs(point.store, self.scene.point_store)
+        center = figure.get_center()
+        figure.update_face_normals()
+        for face in figure.faces:
+            self.assertGreater(
+                np.dot(face.get_centroid() - center, face.normal_cache), 0
+            )
+
     def test_add_light(self):
         self.scene.add_light("test_light", "lightGL", 1.0, 2.0, 3.0)
         self.assertIn("test_light", self.scene.entities)
@@ -213,7 +237,221 @@ class TestScene(unittest.TestCase):
         self.assertIn("test_sphere", self.scene.entities)
         self.assertIn("pnt_up_test_sphere", self.scene.entities)
         self.assertIn("pnt_down_test_sphere", self.scene.entities)
-        self.mock_update.assert_called()
+        self.mock_update.assert_called_once()
+
+
+class TestSceneBulk(unittest.TestCase):
+    def setUp(self):
+        self.mock_update = MagicMock()
+        self.scene = Scene(self.mock_update)
+
+    def test_add_points_bulk(self):
+        self.scene.add_points_bulk(
+            ["point1", "point2"], np.array([[1, 2, 3], [4, 5, 6]])
+        )
+        self.assertEqual(self.scene.entities["point2"].y, 5.0)
+        self.assertIs(
+            self.scene.entities["point1"].store, self.scene.point_store
+        )
+        self.mock_update.assert_called_once()
+
+    def test_add_points_bulk_checks_names(self):
+        self.scene.add_point("point1", 0.0, 0.0, 0.0)
+        with self.assertRaises(EntityNameAlreadyExistsException):
+            self.scene.add_points_bulk(["point2", "point1"], np.zeros((2, 3)))
+        with self.assertRaises(EntityNameAlreadyExistsException):
+            self.scene.add_points_bulk(["point2", "point2"], np.zeros((2, 3)))
+        with self.assertRaises(EmptyFieldException):
+            self.scene.add_points_bulk([""], np.zeros((1, 3)))
+        with self.assertRaises(ValueError):
+            self.scene.add_points_bulk(["point2"], np.zeros((2, 3)))
+        self.assertEqual(list(self.scene.entities), ["point1"])
+
+    def test_add_faces_and_segments_bulk(self):
+        points = ["point1", "point2", "point3", "point4"]
+        self.scene.add_points_bulk(
+            points, [[0, 0, 0], [1, 0, 0], [1, 1, 0], [0, 1, 0]]
+        )
+        self.scene.add_faces_bulk(
+            ["face1", "face2"], points, np.array([[0, 1, 2], [0, 2, 3]])
+        )
+        self.scene.add_segments_bulk(["segment"], points, [[1, 3]])
+        self.assertEqual(
+            self.scene.entities["face2"].child_shapes,
+            ["point1", "point3", "point4"]
+        )
+        self.assertIs(
+            self.scene.entities["segment"].point_b,
+            self.scene.entities["point4"]
+        )
+
+    def test_add_faces_bulk_checks_points(self):
+        with self.assertRaises(EntityNotFoundException):
+            self.scene.add_faces_bulk(["face"], ["missing"], [[0, 0, 0]])
+
+    def test_sphere_faces(self):
+        self.scene.add_sphere_nm("sphere", 6, 4, 2.0)
+        sphere = self.scene.entities["sphere"]
+        self.assertEqual(len(sphere.faces), 6 * 4)
+        self.assertEqual(len(sphere.points), 6 * 3 + 2)
+        self.assertEqual(
+            self.scene.entities["face_r_0_sphere_1"].child_shapes,
+            ["pnt_up_sphere", "pnt_r_1_sphere_2", "pnt_r_1_sphere_1"]
+        )
+        self.assertEqual(
+            self.scene.entities["face_r_2_sphere_6"].child_shapes,
+            [
+                "pnt_r_2_sphere_6", "pnt_r_2_sphere_1",
+                "pnt_r_3_sphere_1", "pnt_r_3_sphere_6"
+            ]
+        )
+        for point in sphere.points:
+            self.assertAlmostEqual(np.linalg.norm(point.np_vector), 2.0)
+
+    def test_sphere_needs_two_rings(self):
+        with self.assertRaises(ValueError):
+            self.scene.add_sphere_nm("sphere", 4, 1, 1.0)
+
+
+class TestSceneBatch(unittest.TestCase):
+    def setUp(self):
+        self.mock_update = MagicMock()
+        self.scene = Scene(self.mock_update)
+
+    def test_batch_notifies_once(self):
+        with self.scene.batch():
+            self.scene.add_point("point1", 0.0, 0.0, 0.0)
+            self.scene.add_point("point2", 1.0, 0.0, 0.0)
+            self.scene.add_segment("segment", "point1", "point2")
+            self.mock_update.assert_not_called()
+        self.mock_update.assert_called_once()
+
+    def test_empty_batch_does_not_notify(self):
+        with self.scene.batch():
+            pass
+        self.mock_update.assert_not_called()
+
+    def test_batch_rollback(self):
+        self.scene.add_point("existing", 0.0, 0.0, 0.0)
+        self.mock_update.reset_mock()
+        with self.assertRaises(EntityNameAlreadyExistsException):
+            with self.scene.batch():
+                self.scene.add_point("point1", 0.0, 0.0, 0.0)
+                self.scene.add_figure2_n("figure", 3, 1.0)
+                self.scene.add_point("existing", 1.0, 1.0, 1.0)
+        self.assertEqual(list(self.scene.entities), ["existing"])
+        self.assertEqual(
+            sorted(self.scene.point_store.free_indices), [1, 2, 3, 4]
+        )
+        self.assertEqual(self.scene.batch_depth, 0)
+        self.mock_update.assert_not_called()
+
+    def test_failed_generator_rolls_back(self):
+        self.scene.add_point("pnt_up_sphere", 0.0, 0.0, 0.0)
+        with self.assertRaises(EntityNameAlreadyExistsException):
+            self.scene.add_sphere_nm("sphere", 4, 3, 1.0)
+        self.assertEqual(list(self.scene.entities), ["pnt_up_sphere"])
+
+    def test_rollback_unlinks_points(self):
+        self.scene.add_point("point1", 0.0, 0.0, 0.0)
+        self.scene.add_point("point2", 1.0, 0.0, 0.0)
+        self.scene.add_point("point3", 0.0, 1.0, 0.0)
+        with self.assertRaises(ValueError):
+            with self.scene.batch():
+                self.scene.add_figure2("face", ["point1", "point2", "point3"])
+                raise ValueError()
+        self.assertEqual(self.scene.entities["point1"].dependents, [])
+
+    def test_nested_batch_savepoint(self):
+        with self.scene.batch():
+            self.scene.add_point("point1", 0.0, 0.0, 0.0)
+            try:
+                with self.scene.batch():
+                    self.scene.add_point("point2", 0.0, 0.0, 0.0)
+                    raise ValueError()
+            except ValueError:
+                pass
+        self.assertEqual(list(self.scene.entities), ["point1"])
+        self.mock_update.assert_called_once()
+
+    def test_contur_rollback_restores_points(self):
+        self.scene.add_point("point1", 0.0, 0.0, 0.0)
+        self.scene.add_point("point2", 1.0, 0.0, 1.0)
+        self.scene.add_point("point3", 0.0, 1.0, 0.0)
+        self.scene.add_plane_by_points(
+            "plane", "point1", "point2", "point3"
+        )
+        with self.assertRaises(ValueError):
+            with self.scene.batch():
+                self.scene.add_contur_n_to_plane("plane", 4, 1.0)
+                raise ValueError()
+        self.assertEqual(self.scene.entities["plane"].contur, [])
+        self.assertEqual(list(self.scene.entities)[-1], "plane")
+        self.assertEqual(
+            self.scene.graph.children_of("plane"),
+            ["point1", "point2", "point3"]
+        )
+
+
+class TestSceneChange(unittest.TestCase):
+    def setUp(self):
+        self.changes = []
+        self.scene = Scene()
+        self.scene.add_listener(self.changes.append)
+
+    def test_add_reports_name_and_links(self):
+        self.scene.add_point("point1", 0.0, 0.0, 0.0)
+        self.scene.add_point("point2", 1.0, 0.0, 0.0)
+        self.scene.add_segment("segment", "point1", "point2")
+        self.assertEqual(len(self.changes), 3)
+        self.assertEqual(list(self.changes[2].added), ["segment"])
+        self.assertEqual(
+            self.changes[2].links["segment"], ["point1", "point2"]
+        )
+
+    def test_batch_aggregates_change(self):
+        self.scene.add_prism_n("prism", 3, 1.0, 1.0)
+        self.assertEqual(len(self.changes), 1)
+        self.assertEqual(
+            list(self.changes[0].added), list(self.scene.entities)
+        )
+
+    def test_rolled_back_adds_are_not_reported(self):
+        with self.scene.batch():
+            self.scene.add_point("point1", 0.0, 0.0, 0.0)
+            try:
+                with self.scene.batch():
+                    self.scene.add_point("point2", 0.0, 0.0, 0.0)
+                    raise ValueError()
+            except ValueError:
+                pass
+        self.assertEqual(list(self.changes[0].added), ["point1"])
+        self.assertEqual(list(self.changes[0].removed), [])
+
+    def test_set_entity_reports_descendants(self):
+        self.scene.add_point("point1", 0.0, 0.0, 0.0)
+        self.scene.add_point("point2", 1.0, 0.0, 0.0)
+        self.scene.add_segment("segment", "point1", "point2")
+        self.scene.set_entity("segment", x=1.0, y=0.0, z=0.0, upd=1)
+        self.assertEqual(
+            set(self.changes[-1].modified), {"segment", "point1", "point2"}
+        )
+        self.assertEqual(self.scene.entities["point2"].x, 2.0)
+
+    def test_set_entity_rollback(self):
+        self.scene.add_point("point1", 0.0, 0.0, 0.0)
+        with self.assertRaises(ValueError):
+            with self.scene.batch():
+                self.scene.set_entity("point1", x=1.0, y=2.0, z=3.0, upd=1)
+                raise ValueError()
+        np.testing.assert_array_equal(
+            self.scene.entities["point1"].np_vector, [0.0, 0.0, 0.0]
+        )
+
+    def test_remove_listener(self):
+        self.scene.remove_listener(self.changes.append)
+        self.scene.add_point("point1", 0.0, 0.0, 0.0)
+        self.assertEqual(self.changes, [])
 
 
 class TestCollinearCheck(unittest.TestCase):
@@ -0,0 +1,167 @@
+from src.Simple2DEditorImports import *
+import unittest
+from unittest.mock import MagicMock, patch
+
+
+class TestIndices(unittest.TestCase):
+    def test_fan_indices(self):
+        np.testing.assert_array_equal(
+            fan_indices(5), [[0, 1, 2], [0, 2, 3], [0, 3, 4]]
+        )
+
+    def test_loop_indices(self):
+        np.testing.assert_array_equal(
+            loop_indices(3), [[0, 1], [1, 2], [2, 0]]
+        )
+
+
+class TestPackSceneGeometry(unittest.TestCase):
+    def setUp(self):
+        self.scene = Scene(MagicMock())
+
+    def test_empty_scene(self):
+        geometry = pack_scene_geometry(self.scene.entities)
+        self.assertEqual(geometry.vertex_count, 0)
+        self.assertEqual(len(geometry.index_array), 0)
+
+    def test_prism_faces_are_packed_once(self):
+        self.scene.add_prism_n("prism", 4, 1.0, 2.0)
+        geometry = pack_scene_geometry(self.scene.entities)
+        faces = geometry.groups["faces"]
+        edges = geometry.groups["edges"]
+        points = geometry.groups["points"]
+        self.assertEqual(faces.count, 6 * 2 * 3)
+        self.assertEqual(edges.count, 6 * 4 * 2)
+        self.assertEqual(points.count, 8)
+        self.assertEqual(geometry.vertex_count, 6 * 4 + 8)
+        self.assertEqual(
+            len(geometry.index_array),
+            sum(el.count for el in geometry.groups.values())
+        )
+
+    def test_figure3_normals_point_outside(self):
+        self.scene.add_prism_n("prism", 4, 1.0, 2.0)
+        geometry = pack_scene_geometry(self.scene.entities)
+        faces = geometry.groups["faces"]
+        triangles = geometry.index_array[
+            faces.offset:faces.offset + faces.count
+        ].reshape(-1, 3)
+        center = self.scene.entities["prism"].get_center()
+        for triangle in triangles:
+            vertex = geometry.vertex_array[triangle[0]]
+            self.assertGreater(np.dot(vertex[:3] - center, vertex[3:]), 0)
+
+    def test_segments_and_lights(self):
+        self.scene.add_light("light", "lightGL", 1.0, 1.0, 1.0)
+        self.scene.add_point("a", 0.0, 0.0, 0.0)
+        self.scene.add_point("b", 1.0, 2.0, 3.0)
+        self.scene.add_segment("ab", "a", "b")
+        geometry = pack_scene_geometry(self.scene.entities)
+        self.assertEqual(geometry.lights, [self.scene.entities["light"]])
+        segments = geometry.groups["segments"]
+        self.assertEqual(segments.count, 2)
+        index = geometry.index_array[segments.offset + 1]
+        np.testing.assert_array_equal(
+            geometry.vertex_array[index, :3], [1.0, 2.0, 3.0]
+        )
+
+    def test_plane_with_contur(self):
+        self.scene.add_point("point1", 0.0, 0.0, 0.0)
+        self.scene.add_point("point2", 1.0, 0.0, 0.0)
+        self.scene.add_point("point3", 0.0, 1.0, 0.0)
+        self.scene.add_plane_by_points(
+            "plane", "point1", "point2", "point3"
+        )
+        self.scene.add_contur_n_to_plane("plane", 5, 1.0)
+        geometry = pack_scene_geometry(self.scene.entities)
+        self.assertEqual(geometry.groups["planes"].count, 3 * 3)
+
+
+class TestChunkCulling(unittest.TestCase):
+    def setUp(self):
+        self.scene = Scene(MagicMock())
+        # три куска отрезков: у центра, далеко за кадром и снова у центра
+        count = CHUNK_INDICES // 2
+        shift = np.repeat([0.0, 100.0, 0.0], count)
+        starts = np.column_stack([shift, np.zeros((3 * count, 2))])
+        coordinates = np.stack([starts, starts + 0.1], axis=1)
+        names = ["p{}".format(i) for i in range(6 * count)]
+        self.scene.add_points_bulk(names, coordinates)
+        self.scene.add_segments_bulk(
+            ["s{}".format(i) for i in range(3 * count)], names,
+            np.arange(6 * count).reshape(-1, 2)
+        )
+        self.geometry = pack_scene_geometry(self.scene.entities)
+        self.segments = self.geometry.groups["segments"]
+        self.frustum = Frustum.from_camera(0.0, math.pi / 9, 5.0, 1.0)
+
+    def test_chunk_bounds(self):
+        self.assertEqual(self.segments.chunk_starts.tolist(), [
+            0, CHUNK_INDICES, 2 * CHUNK_INDICES
+        ])
+        np.testing.assert_allclose(
+            self.segments.chunk_centers[:, 0], [0.05, 100.05, 0.05]
+        )
+
+    def test_visible_ranges(self):
+        self.assertEqual(
+            self.segments.visible_ranges(),
+            [(0, 3 * CHUNK_INDICES)]
+        )
+        self.assertEqual(
+            self.segments.visible_ranges(self.frustum),
+            [(0, CHUNK_INDICES), (2 * CHUNK_INDICES, CHUNK_INDICES)]
+        )
+        drawn = self.segments.drawn_counts(
+            self.segments.visible_ranges(self.frustum)
+        )
+        # у каждого отрезка два индекса, средний кусок не нарисован
+        count = CHUNK_INDICES // 2
+        self.assertEqual(
+            drawn.tolist(), [2] * count + [0] * count + [2] * count
+        )
+        self.assertIs(
+            self.segments.owners[0], self.scene.entities["s0"]
+        )
+        far = Frustum.from_camera(math.pi, 0.0, 5.0, 1.0)
+        far.offsets = far.offsets - 1000.0
+        self.assertEqual(self.segments.visible_ranges(far), [])
+
+
+class TestSceneBufferRenderer(unittest.TestCase):
+    def setUp(self):
+        module = sys.modules["src.SceneBufferRenderer"]
+        self.gl = {
+            name: MagicMock()
+            for name in (
+                "glGenBuffers", "glBindBuffer", "glBufferData",
+                "glEnableClientState", "glDisableClientState",
+                "glVertexPointer", "glNormalPointer", "glDrawElements",
+                "glEnable", "glDisable", "glColor3fv", "set_material",
+                "draw_light"
+            )
+        }
+        self.gl["glGenBuffers"].return_value = (1, 2)
+        patcher = patch.multiple(module, **self.gl)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.scene = Scene(MagicMock())
+        self.scene.add_figure2_n("figure", 4, 1.0)
+        self.scene.add_point("point", 0.0, 0.0, 0.0)
+        self.renderer = SceneBufferRenderer()
+
+    def test_entity_costs(self):
+        profiler = FrameProfiler()
+        profiler.set_enabled(True)
+        profiler.begin_frame(1)
+        self.renderer.draw(self.scene.entities, profiler)
+        profiler.end_frame()
+        frame = profiler.frames[-1]
+        self.assertEqual(frame.entities["figure"][0], "Figure2")
+        self.assertIn("point", frame.entities)
+        self.assertIn("draw faces", frame.phases)
+        self.assertNotIn("draw Figure2", frame.phases)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,101 @@
+from src.SceneCli import *
+import unittest
+import tempfile
+import io
+from contextlib import redirect_stdout, redirect_stderr
+
+
+class TestSceneCli(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.root = Path(self.directory.name)
+        scene = Scene()
+        scene.add_light("light", 16384, 100.0, 100.0, 100.0)
+        scene.add_prism_n("prism", 4, 1.0, 2.0)
+        self.s3d = self.root / "prism.s3d"
+        self.pkl = self.root / "prism.pkl"
+        scene.save_entities_to_file(self.s3d)
+        scene.save_entities_to_file(self.pkl)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def run_cli(self, *args):
+        out = io.StringIO()
+        err = io.StringIO()
+        with redirect_stdout(out), redirect_stderr(err):
+            code = main(list(args))
+        return code, out.getvalue(), err.getvalue()
+
+    def test_stats(self):
+        code, out, _ = self.run_cli("stats", "--json", str(self.s3d))
+        self.assertEqual(code, 0)
+        stats = json.loads(out)
+        self.assertEqual(stats["points"], 8)
+        self.assertEqual(stats["lights"], 1)
+        self.assertEqual(stats["faces"], 6)
+        self.assertEqual(stats["solids"], 1)
+        self.assertEqual(stats["bounds_max"][2], 2.0)
+
+    def test_convert(self):
+        output = self.root / "out"
+        output.mkdir()
+        code, _, _ = self.run_cli(
+            "convert", "--to", "s3d", "-o", str(output), str(self.pkl)
+        )
+        self.assertEqual(code, 0)
+        entities, _ = read_entities_from_file(output / "prism.s3d")
+        self.assertEqual(len(entities), 16)
+
+    def test_convert_same_output(self):
+        other = self.root / "other"
+        other.mkdir()
+        (other / "prism.pkl").write_bytes(self.pkl.read_bytes())
+        output = self.root / "out"
+        output.mkdir()
+        code, out, err = self.run_cli(
+            "convert", "-o", str(output), str(self.pkl),
+            str(other / "prism.pkl")
+        )
+        self.assertEqual(code, 2)
+        self.assertIn("prism.s3d", err)
+        self.assertEqual(list(output.iterdir()), [])
+        # тот же файл дважды - одна задача
+        code, out, _ = self.run_cli(
+            "convert", "-o", str(output), str(self.pkl), str(self.pkl)
+        )
+        self.assertEqual(code, 0)
+        self.assertEqual(len(out.splitlines()), 1)
+
+    def test_errors_do_not_stop_batch(self):
+        missing = self.root / "missing.s3d"
+        code, out, err = self.run_cli(
+            "stats", "-j", "1", str(missing), str(self.s3d)
+        )
+        self.assertEqual(code, 1)
+        self.assertIn("missing.s3d", err)
+        self.assertIn("prism.s3d", out)
+
+    def test_process_pool(self):
+        paths = []
+        for i in range(4):
+            paths.append(self.root / "prism_{}.pkl".format(i))
+            paths[-1].write_bytes(self.pkl.read_bytes())
+        code, out, _ = self.run_cli(
+            "convert", "-j", "2", *[str(el) for el in paths]
+        )
+        self.assertEqual(code, 0)
+        self.assertEqual(len(out.splitlines()), 4)
+        for path in paths:
+            self.assertTrue(path.with_suffix(".s3d").exists())
+
+    def test_fit_camera_distance(self):
+        scene = Scene()
+        scene.add_light("light", 16384, 100.0, 100.0, 100.0)
+        scene.add_point("point", 0.0, 0.0, 2.0)
+        distance = fit_camera_distance(scene.entities)
+        self.assertAlmostEqual(distance * math.sin(math.radians(35)), 2.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+import unittest
+import subprocess
+import sys
+import json
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# запас на медленные машины, сейчас ядро добавляет к numpy ~40 мс
+CORE_IMPORT_BUDGET_MS = 150
+
+IMPORT_TIME_SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+import numpy
+numpy_done = time.perf_counter()
+import src.SceneCore
+core_done = time.perf_counter()
+print(json.dumps({
+    "numpy_ms": (numpy_done - start) * 1000,
+    "core_ms": (core_done - numpy_done) * 1000,
+    "modules": sorted(sys.modules),
+}))
+"""
+
+HEADLESS_SCRIPT = """
+from src.SceneCore import *
+scene = Scene()
+scene.add_prism_n("prism", 4, 1.0, 2.0)
+try:
+    scene.entities["prism"].draw_shape()
+except DrawBackendMissingException:
+    print("no backend")
+"""
+
+
+# модули ядра, каждый должен импортироваться первым и сам по себе
+CORE_MODULES = [
+    "SceneColors", "BasicShapes", "SceneFileFormat", "SceneGraph",
+    "SceneBase", "SceneJournal", "SceneTasks", "FrameProfiler",
+    "SceneCamera", "SoftwareRasterizer", "FrustumCulling", "ScenePicking",
+    "SceneCli",
+]
+
+
+def run_python(script):
+    return subprocess.run(
+        [sys.executable, "-c", script],
+        cwd=ROOT, capture_output=True, text=True, check=True
+    ).stdout
+
+
+class TestSceneCoreImport(unittest.TestCase):
+    def test_core_has_no_ui_dependencies(self):
+        result = json.loads(run_python(IMPORT_TIME_SCRIPT))
+        for module in ("PyQt5", "OpenGL", "PIL", "tkinter"):
+            self.assertNotIn(module, result["modules"])
+
+    def test_core_import_time(self):
+        # лучший из трех запусков, чтобы не ловить шум
+        core_ms = min(
+            json.loads(run_python(IMPORT_TIME_SCRIPT))["core_ms"]
+            for _ in range(3)
+        )
+        self.assertLess(core_ms, CORE_IMPORT_BUDGET_MS)
+
+    def test_modules_import_alone(self):
+        for module in CORE_MODULES:
+            with self.subTest(module=module):
+                result = subprocess.run(
+                    [sys.executable, "-c", "import src." + module],
+                    cwd=ROOT, capture_output=True, text=True
+                )
+                self.assertEqual(result.returncode, 0, result.stderr)
+
+    def test_headless_scene(self):
+        self.assertEqual(run_python(HEADLESS_SCRIPT).strip(), "no backend")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,123 @@
+from src.Simple2DEditorImports import *
+import unittest
+import tempfile
+from unittest.mock import MagicMock
+
+
+def build_scene():
+    scene = Scene(MagicMock())
+    scene.add_light("light", 16384, 100.0, 100.0, 100.0)
+    scene.add_prism_n("prism", 5, 1.0, 2.0)
+    scene.add_point("point1", 0.0, 0.0, 0.0)
+    scene.add_point("point2", 1.0, 0.0, 0.0)
+    scene.add_point("point3", 0.0, 1.0, 0.5)
+    scene.add_segment("segment", "point2", "point3")
+    scene.add_plane_by_points("plane1", "point1", "point2", "point3")
+    scene.add_plane_by_point_and_segment("plane2", "point1", "segment")
+    scene.add_plane_by_plane("plane3", "pnt_upr_prism_1", "plane1")
+    scene.add_contur_n_to_plane("plane1", 6, 2.0)
+    return scene
+
+
+class TestSceneFileFormat(unittest.TestCase):
+    def setUp(self):
+        self.scene = build_scene()
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = Path(self.directory.name) / "scene.s3d"
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def load(self):
+        scene = Scene(MagicMock())
+        scene.load_entities_from_file(self.path)
+        return scene
+
+    def test_round_trip(self):
+        self.scene.save_entities_to_file(self.path)
+        loaded = self.load()
+        self.assertEqual(list(loaded.entities), list(self.scene.entities))
+        for name, entity in self.scene.entities.items():
+            other = loaded.entities[name]
+            self.assertIs(type(other), type(entity))
+            self.assertEqual(other.child_shapes, entity.child_shapes)
+            if isinstance(entity, Point):
+                np.testing.assert_array_equal(
+                    other.np_vector, entity.np_vector
+                )
+                self.assertIs(other.store, loaded.point_store)
+            if isinstance(entity, Plane):
+                np.testing.assert_array_almost_equal(
+                    other.normal, entity.normal
+                )
+        self.assertEqual(loaded.entities["light"].lightGL, 16384)
+
+    def test_references_are_shared(self):
+        self.scene.save_entities_to_file(self.path)
+        entities = self.load().entities
+        self.assertIs(
+            entities["segment"].point_a, entities["point2"]
+        )
+        self.assertIs(entities["plane3"].base_plane, entities["plane1"])
+        prism = entities["prism"]
+        self.assertIs(prism.faces[0], entities["face_upper_prism"])
+        self.assertIn(entities["pnt_upr_prism_3"], prism.points)
+        contur = entities["plane1"].contur[0]
+        self.assertEqual(contur.name, "contur_plane1_0")
+        self.assertIs(contur.segments[0], entities["segment_plane1_1"])
+        self.assertEqual(contur.child_shapes[0], "segment_plane1_1")
+
+    def test_loaded_shapes_are_linked(self):
+        self.scene.save_entities_to_file(self.path)
+        loaded = self.load()
+        loaded.set_entity("pnt_upr_prism_1", x=0.0, y=0.0, z=4.0, upd=1)
+        center = loaded.entities["prism"].get_center()
+        self.assertAlmostEqual(center[2], 1.2)
+
+    def test_file_has_no_pickled_objects(self):
+        self.scene.save_entities_to_file(self.path)
+        with np.load(self.path, allow_pickle=False) as columns:
+            self.assertEqual(
+                int(columns["format_version"][0]), SCENE_FORMAT_VERSION
+            )
+            self.assertEqual(columns["coordinates"].shape, (20, 3))
+
+    def test_newer_version_rejected(self):
+        columns = entities_to_columns(self.scene.entities)
+        columns["format_version"][0] = SCENE_FORMAT_VERSION + 1
+        with self.assertRaises(SceneFormatException):
+            columns_to_entities(columns, CoordinateStore())
+
+    def test_string_light_id(self):
+        self.scene.add_light("named", "lightGL", 1.0, 1.0, 1.0)
+        self.scene.save_entities_to_file(self.path)
+        loaded = self.load()
+        self.assertEqual(loaded.entities["named"].lightGL, "lightGL")
+        self.assertEqual(loaded.entities["light"].lightGL, 16384)
+
+    def test_version_1_light_ids(self):
+        columns = entities_to_columns(self.scene.entities)
+        del columns["light_id_data"], columns["light_id_offsets"]
+        columns["light_ids"] = np.array([16384], dtype=np.int64)
+        columns["format_version"][0] = 1
+        entities = columns_to_entities(columns, CoordinateStore())
+        self.assertEqual(entities["light"].lightGL, 16384)
+
+    def test_empty_scene(self):
+        Scene(MagicMock()).save_entities_to_file(self.path)
+        self.assertEqual(self.load().entities, {})
+
+    def test_pickle_still_supported(self):
+        path = Path(self.directory.name) / "scene.pkl"
+        self.scene.save_entities_to_file(path)
+        loaded = Scene(MagicMock())
+        loaded.load_entities_from_file(path)
+        self.assertEqual(list(loaded.entities), list(self.scene.entities))
+
+    def test_unknown_suffix(self):
+        with self.assertRaises(TypeError):
+            self.scene.save_entities_to_file(Path("scene.txt"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,157 @@
+from src.SceneCore import *
+import unittest
+from unittest.mock import MagicMock
+
+
+class TestDependencyGraph(unittest.TestCase):
+    def setUp(self):
+        self.graph = DependencyGraph()
+        self.graph.link("a", [])
+        self.graph.link("b", [])
+        self.graph.link("segment", ["a", "b"])
+        self.graph.link("face", ["a", "b", "segment"])
+        self.graph.link("other", ["b"])
+
+    def test_adjacency(self):
+        self.assertEqual(self.graph.children_of("face"), ["a", "b", "segment"])
+        self.assertEqual(
+            self.graph.parents_of("b"), ["segment", "face", "other"]
+        )
+
+    def test_propagation_order(self):
+        order = self.graph.propagation_order(["a"])
+        self.assertEqual(set(order), {"a", "segment", "face"})
+        self.assertLess(order.index("segment"), order.index("face"))
+
+    def test_versions(self):
+        before = {name: self.graph.version(name) for name in "ab"}
+        self.graph.touch(self.graph.propagation_order(["a"]))
+        self.assertGreater(self.graph.version("a"), before["a"])
+        self.assertEqual(self.graph.version("b"), before["b"])
+        self.assertGreater(
+            self.graph.version("face"), self.graph.version("segment")
+        )
+
+    def test_cycle(self):
+        with self.assertRaises(DependencyCycleException):
+            self.graph.link("a", ["face"])
+        self.assertEqual(self.graph.children_of("a"), [])
+
+    def test_remove(self):
+        self.graph.remove("face")
+        self.assertEqual(self.graph.parents_of("a"), ["segment"])
+        self.assertEqual(self.graph.version("face"), 0)
+
+
+class TestSceneGraph(unittest.TestCase):
+    def setUp(self):
+        self.scene = Scene(MagicMock())
+        self.changes = []
+        self.scene.add_listener(self.changes.append)
+
+    def test_graph_follows_scene(self):
+        self.scene.add_prism_n("prism", 3, 1.0, 1.0)
+        self.assertEqual(
+            self.scene.graph.parents_of("face_upper_prism"), ["prism"]
+        )
+        self.assertIn(
+            "face_middle_prism_1",
+            self.scene.graph.parents_of("pnt_upr_prism_1")
+        )
+        graph = DependencyGraph()
+        graph.rebuild(self.scene.entities)
+        self.assertEqual(graph.children, self.scene.graph.children)
+
+    def test_point_move_reaches_dependents(self):
+        self.scene.add_prism_n("prism", 3, 1.0, 1.0)
+        self.scene.add_prism_n("other", 3, 1.0, 1.0)
+        version = self.scene.graph.version("prism")
+        self.scene.set_entity("pnt_upr_prism_1", x=0.0, y=0.0, z=5.0)
+        self.assertEqual(set(self.changes[-1].modified), {
+            "pnt_upr_prism_1", "face_upper_prism", "face_middle_prism_1",
+            "face_middle_prism_3", "prism",
+        })
+        self.assertGreater(self.scene.graph.version("prism"), version)
+
+    def test_figure_move_moves_each_point_once(self):
+        self.scene.add_prism_n("prism", 4, 1.0, 1.0)
+        center = self.scene.entities["prism"].get_center().copy()
+        self.scene.set_entity("prism", x=1.0, y=0.0, z=0.0, upd=3)
+        np.testing.assert_array_almost_equal(
+            self.scene.entities["prism"].get_center(), center + [1, 0, 0]
+        )
+        self.assertAlmostEqual(
+            self.scene.entities["pnt_lwr_prism_1"].x, 1.0
+        )
+
+    def test_plane_by_plane_keeps_base(self):
+        self.scene.add_point("a", 0.0, 0.0, 0.0)
+        self.scene.add_point("b", 1.0, 0.0, 0.0)
+        self.scene.add_point("c", 0.0, 1.0, 0.0)
+        self.scene.add_point("d", 0.0, 0.0, 1.0)
+        self.scene.add_plane_by_points("base", "a", "b", "c")
+        self.scene.add_plane_by_plane("plane", "d", "base")
+        self.scene.set_entity("plane", x=0.0, y=0.0, z=1.0)
+        self.assertEqual(self.scene.entities["d"].z, 2.0)
+        self.assertEqual(self.scene.entities["a"].z, 0.0)
+        self.assertNotIn("base", self.changes[-1].modified)
+
+    def test_plane_updates_in_same_edit(self):
+        self.scene.add_point("a", 0.0, 0.0, 0.0)
+        self.scene.add_point("b", 1.0, 0.0, 0.0)
+        self.scene.add_point("c", 0.0, 1.0, 0.0)
+        self.scene.add_plane_by_points("plane", "a", "b", "c")
+        self.scene.add_contur_n_to_plane("plane", 4, 1.0)
+        self.scene.set_entity("b", x=1.0, y=0.0, z=1.0)
+        plane = self.scene.entities["plane"]
+        self.assertFalse(plane.is_dirty)
+        # плоскость z = x: контур поднят вслед за точкой
+        point = self.scene.entities["contur_point_plane_2"]
+        self.assertAlmostEqual(point.z, point.x)
+        self.assertIn("contur_point_plane_2", self.changes[-1].modified)
+        self.assertIn("segment_plane_2", self.changes[-1].modified)
+
+    def test_contur_point_move_reaches_plane(self):
+        self.scene.add_point("a", 0.0, 0.0, 0.0)
+        self.scene.add_point("b", 1.0, 0.0, 0.0)
+        self.scene.add_point("c", 0.0, 1.0, 0.0)
+        self.scene.add_plane_by_points("plane", "a", "b", "c")
+        self.scene.add_contur_n_to_plane("plane", 4, 1.0)
+        self.assertIn("segment_plane_1", self.scene.graph.children_of("plane"))
+        graph = DependencyGraph()
+        graph.rebuild(self.scene.entities)
+        self.assertEqual(graph.children, self.scene.graph.children)
+        version = self.scene.graph.version("plane")
+        self.scene.set_entity("contur_point_plane_1", x=0.5, y=0.5, z=3.0)
+        self.assertEqual(set(self.changes[-1].modified), {
+            "contur_point_plane_1", "segment_plane_1", "segment_plane_4",
+            "plane",
+        })
+        self.assertGreater(self.scene.graph.version("plane"), version)
+        # точка возвращена на плоскость z = 0
+        self.assertEqual(
+            self.scene.entities["contur_point_plane_1"].coordinates.tolist(),
+            [0.5, 0.5, 0.0]
+        )
+
+    def test_rollback_restores_points(self):
+        self.scene.add_prism_n("prism", 3, 1.0, 1.0)
+        with self.assertRaises(ValueError):
+            with self.scene.batch():
+                self.scene.set_entity("prism", x=1.0, y=1.0, z=1.0)
+                raise ValueError()
+        self.assertEqual(self.scene.entities["pnt_lwr_prism_1"].z, 0.0)
+
+    def test_dropped_entity_leaves_graph(self):
+        with self.assertRaises(ValueError):
+            with self.scene.batch():
+                self.scene.add_point("a", 0.0, 0.0, 0.0)
+                self.scene.add_point("b", 1.0, 0.0, 0.0)
+                self.scene.add_segment("segment", "a", "b")
+                raise ValueError()
+        self.assertEqual(self.scene.graph.children, dict())
+        self.assertEqual(dict(self.scene.graph.parents), dict())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,267 @@
+from src.Simple2DEditorImports import *
+import unittest
+import tempfile
+from unittest.mock import MagicMock, patch
+
+
+def assert_same_scene(test, scene, other):
+    test.assertEqual(set(scene.entities), set(other.entities))
+    for name, entity in scene.entities.items():
+        test.assertIs(type(other.entities[name]), type(entity))
+        test.assertEqual(
+            entity_to_record(other.entities[name]), entity_to_record(entity)
+        )
+        test.assertEqual(
+            other.graph.children_of(name), scene.graph.children_of(name)
+        )
+
+
+class TestSceneJournal(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = Path(self.directory.name) / "scene.s3d"
+        self.scene = Scene(MagicMock())
+        self.scene.add_light("light", 16384, 100.0, 100.0, 100.0)
+        self.scene.add_prism_n("prism", 4, 1.0, 2.0)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def start_journal(self, compact_every=10000):
+        journal = SceneJournal(self.scene, self.path, compact_every)
+        journal.start()
+        return journal
+
+    def recover(self):
+        scene = Scene(MagicMock())
+        replayed = open_scene(scene, self.path)
+        return scene, replayed
+
+    def edit_scene(self):
+        self.scene.add_point("point1", 0.0, 0.0, 0.0)
+        self.scene.add_point("point2", 1.0, 0.0, 0.0)
+        self.scene.add_point("point3", 0.0, 1.0, 0.5)
+        self.scene.add_segment("segment", "point2", "point3")
+        self.scene.add_plane_by_point_and_segment(
+            "plane", "point1", "segment"
+        )
+        self.scene.add_contur_n_to_plane("plane", 5, 2.0)
+        self.scene.set_entity("pnt_upr_prism_1", x=0.0, y=0.0, z=4.0, upd=1)
+        self.scene.set_entity("segment", x=1.0, y=0.0, z=0.0, upd=2)
+
+    def test_start_writes_snapshot(self):
+        journal = self.start_journal()
+        journal.sync()
+        scene, replayed = self.recover()
+        self.assertEqual(replayed, 0)
+        assert_same_scene(self, self.scene, scene)
+        journal.close()
+
+    def test_replay_after_crash(self):
+        journal = self.start_journal()
+        self.edit_scene()
+        journal.sync()
+        # падение: журнал не закрыт и не сжат
+        scene, replayed = self.recover()
+        self.assertEqual(replayed, 8)
+        assert_same_scene(self, self.scene, scene)
+        self.assertAlmostEqual(
+            scene.entities["prism"].get_center()[2], 1.25
+        )
+        journal.close()
+
+    def test_edits_append_not_rewrite(self):
+        journal = self.start_journal()
+        journal.sync()
+        snapshot = self.path.stat().st_mtime_ns
+        self.scene.add_point("point", 1.0, 2.0, 3.0)
+        journal.sync()
+        self.assertEqual(self.path.stat().st_mtime_ns, snapshot)
+        _, records = read_journal(journal.journal_path)
+        self.assertEqual(list(records[0]["put"]), ["point"])
+        self.assertEqual(records[0]["put"]["point"]["p"], [1.0, 2.0, 3.0])
+        journal.close()
+
+    def test_compaction(self):
+        journal = self.start_journal(compact_every=10)
+        self.edit_scene()
+        journal.sync()
+        token, records = read_journal(journal.journal_path)
+        self.assertEqual(token, read_snapshot_token(self.path))
+        self.assertLess(len(records), 8)
+        scene, _ = self.recover()
+        assert_same_scene(self, self.scene, scene)
+        journal.close()
+
+    def test_stale_journal_ignored(self):
+        journal = self.start_journal()
+        self.scene.add_point("point", 1.0, 2.0, 3.0)
+        journal.sync()
+        stale = journal.journal_path.read_bytes()
+        journal.compact()
+        journal.close()
+        # падение между записью снимка и нового журнала
+        journal.journal_path.write_bytes(stale)
+        scene, replayed = self.recover()
+        self.assertEqual(replayed, 0)
+        assert_same_scene(self, self.scene, scene)
+
+    def test_torn_record_dropped(self):
+        journal = self.start_journal()
+        self.scene.add_point("point1", 1.0, 2.0, 3.0)
+        self.scene.add_point("point2", 1.0, 2.0, 3.0)
+        journal.close()
+        data = journal.journal_path.read_bytes()
+        journal.journal_path.write_bytes(data[:-5])
+        scene, replayed = self.recover()
+        self.assertEqual(replayed, 1)
+        self.assertIn("point1", scene.entities)
+        self.assertNotIn("point2", scene.entities)
+
+    def test_removal_replayed(self):
+        journal = self.start_journal()
+        with self.assertRaises(ValueError):
+            with self.scene.batch():
+                self.scene.add_point("point", 1.0, 2.0, 3.0)
+                raise ValueError()
+        self.scene.add_figure2_n("figure", 4, 1.0)
+        self.scene.drop_entity("figure")
+        self.scene.notify_update()
+        journal.close()
+        scene, replayed = self.recover()
+        self.assertEqual(replayed, 2)
+        assert_same_scene(self, self.scene, scene)
+
+    def test_contur_links_replayed(self):
+        journal = self.start_journal()
+        self.scene.add_point("point1", 0.0, 0.0, 0.0)
+        self.scene.add_point("point2", 1.0, 0.0, 0.0)
+        self.scene.add_point("point3", 0.0, 1.0, 0.0)
+        self.scene.add_plane_by_points(
+            "plane", "point1", "point2", "point3"
+        )
+        self.scene.add_contur_n_to_plane("plane", 4, 1.0)
+        journal.close()
+        scene, _ = self.recover()
+        assert_same_scene(self, self.scene, scene)
+        self.assertIn("segment_plane_1", scene.graph.children_of("plane"))
+
+    def test_order_by_refs(self):
+        puts = {
+            "segment": {"r": ["a", "b"]},
+            "a": {"r": []},
+            "plane": {"r": ["a", "segment"]},
+            "b": {"r": []},
+        }
+        order = list(order_by_refs(puts))
+        self.assertLess(order.index("a"), order.index("segment"))
+        self.assertLess(order.index("b"), order.index("segment"))
+        self.assertLess(order.index("segment"), order.index("plane"))
+
+
+class TestWriteFileAtomic(unittest.TestCase):
+    def test_concurrent_writers(self):
+        with tempfile.TemporaryDirectory() as directory:
+            target = Path(directory) / "demo.s3d"
+            # оба писателя одновременно держат открытые временные файлы
+            barrier = threading.Barrier(2)
+
+            def write(data):
+                def writer(f):
+                    barrier.wait(timeout=5)
+                    f.write(data)
+                return writer
+
+            threads = [
+                threading.Thread(
+                    target=write_file_atomic, args=(target, write(el))
+                )
+                for el in (b"first", b"second")
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            self.assertIn(target.read_bytes(), (b"first", b"second"))
+            self.assertEqual(list(Path(directory).iterdir()), [target])
+            self.assertEqual(
+                target.stat().st_mode & 0o777, 0o666 & ~FILE_MODE_MASK
+            )
+
+
+class TestRecoverJournals(unittest.TestCase):
+    def setUp(self):
+        os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+        self.application = (
+            QApplication.instance() or QApplication(sys.argv[:1])
+        )
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        directory = Path(self.directory.name)
+        self.path = directory / "scene.s3d"
+        self.settings = QtCore.QSettings(
+            str(directory / "settings.ini"), QtCore.QSettings.IniFormat
+        )
+
+    def crash_with_edits(self):
+        window = MainWindow(settings=self.settings)
+        window.scene.add_point("point", 0.0, 0.0, 0.0)
+        window.start_journal(self.path)
+        window.scene.add_point("edited", 1.0, 0.0, 0.0)
+        window.journal.sync()
+        # окно брошено без closeEvent, журнал остался открытым
+        window.journal.close()
+        self.assertEqual(window.open_journals(), [self.path])
+
+    def test_recover_offered(self):
+        self.crash_with_edits()
+        window = MainWindow(settings=self.settings)
+        with patch.object(
+                QMessageBox, "question", return_value=QMessageBox.Yes
+        ) as question, patch.object(window, "load_scene") as load_scene:
+            window.recover_journals()
+        question.assert_called_once()
+        load_scene.assert_called_once_with(self.path)
+        self.assertEqual(window.open_journals(), [])
+
+    def test_closed_journal_not_offered(self):
+        window = MainWindow(settings=self.settings)
+        window.start_journal(self.path)
+        window.scene.add_point("edited", 1.0, 0.0, 0.0)
+        window.close_journal()
+        with patch.object(QMessageBox, "question") as question:
+            window.recover_journals()
+        question.assert_not_called()
+
+    def test_close_journal_reports_error(self):
+        window = MainWindow(settings=self.settings)
+        journal = window.start_journal(self.path)
+        journal.sync()
+        with patch.object(
+                journal, "run_task", side_effect=OSError("диск заполнен")
+        ):
+            window.scene.add_point("edited", 1.0, 0.0, 0.0)
+            window.close_journal()
+        self.assertIsNone(window.journal)
+        self.assertIn("диск заполнен", window.statusbar.currentMessage())
+        self.assertEqual(window.open_journals(), [])
+
+    def test_tree_follows_new_children(self):
+        window = MainWindow(settings=self.settings)
+        for name, x in (("a", 0.0), ("b", 1.0), ("c", 2.0)):
+            window.scene.add_point(name, x, 0.0, 0.0)
+        window.scene.add_segment("segment", "a", "b")
+        # как apply_record при воспроизведении журнала
+        with window.scene.batch():
+            window.scene.set_children("segment", ["a", "c"])
+        (item,) = window.tree_items["segment"]
+        self.assertEqual(
+            [item.child(i).text(0) for i in range(item.childCount())],
+            ["a", "c"]
+        )
+        self.assertEqual(len(window.tree_items["b"]), 1)
+        self.assertEqual(len(window.tree_items["c"]), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
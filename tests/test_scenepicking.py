@@ -0,0 +1,122 @@
+from src.SceneCore import *
+import unittest
+
+CAMERA = (0.0, math.pi / 9, 5.0)
+
+
+def brute_force(triangles, origin, direction):
+    hits = [
+        (t, i) for i, triangle in enumerate(triangles.tolist())
+        for t in [ray_triangle(origin, direction, *triangle)]
+        if t is not None
+    ]
+    return min(hits) if hits else None
+
+
+class TestBoundingVolumeHierarchy(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(3)
+        corners = rng.uniform(-1.0, 1.0, (300, 1, 3))
+        self.triangles = corners + rng.uniform(-0.2, 0.2, (300, 3, 3))
+        self.bvh = BoundingVolumeHierarchy(self.triangles.copy())
+        self.rays = [
+            camera_ray(*CAMERA, 1.0, x, y)
+            for x, y in rng.uniform(-0.4, 0.4, (50, 2))
+        ]
+
+    def test_matches_brute_force(self):
+        for origin, direction in self.rays:
+            self.assertEqual(
+                self.bvh.intersect(origin, direction),
+                brute_force(self.triangles, origin, direction)
+            )
+
+    def test_refit(self):
+        moved = np.arange(0, 300, 7)
+        self.triangles[moved] += [0.0, 0.5, 0.0]
+        self.bvh.vertices[moved] = self.triangles[moved]
+        self.bvh.refit(moved)
+        for origin, direction in self.rays:
+            self.assertEqual(
+                self.bvh.intersect(origin, direction),
+                brute_force(self.triangles, origin, direction)
+            )
+        root = self.bvh.boxes[0]
+        self.assertEqual(
+            root.tolist(),
+            [
+                self.triangles.min(axis=(0, 1)).tolist(),
+                self.triangles.max(axis=(0, 1)).tolist()
+            ]
+        )
+
+    def test_segment_tolerance(self):
+        origin = [0.0, 0.0, 5.0]
+        direction = [0.0, 0.0, -1.0]
+        segment = [[-1.0, 0.05, 1.0], [1.0, 0.05, 1.0]]
+        self.assertIsNone(ray_segment(origin, direction, *segment, 0.01))
+        self.assertAlmostEqual(
+            ray_segment(origin, direction, *segment, 0.1), 3.9
+        )
+
+
+class TestScenePicker(unittest.TestCase):
+    def setUp(self):
+        self.scene = Scene()
+        self.scene.add_light("light", 16384, 0.0, 0.0, 0.0)
+        self.scene.add_figure2_n("figure", 4, 1.0)
+        self.scene.add_point("a", 0.5, 0.0, 0.5)
+        self.scene.add_point("b", -0.5, 0.5, 0.2)
+        self.scene.add_point("c", 0.5, 0.5, 0.2)
+        self.scene.add_segment("segment", "b", "c")
+        self.picker = ScenePicker()
+        # как MainWindow: каждая правка сцены доходит до ScenePicker
+        self.scene.add_listener(self.picker.invalidate)
+
+    def pick(self, x, y, radius=0.05):
+        # сверху вниз вдоль z
+        return self.picker.pick(
+            self.scene.entities, [x, y, 5.0], [0.0, 0.0, -1.0], radius
+        )
+
+    def test_pick(self):
+        self.assertEqual(self.pick(0.1, 0.1), "figure")
+        # точка над гранью ближе к камере
+        self.assertEqual(self.pick(0.51, 0.0), "a")
+        self.assertEqual(self.pick(0.0, 0.52), "segment")
+        self.assertIsNone(self.pick(3.0, 3.0))
+
+    def test_moved_entity(self):
+        self.assertEqual(self.pick(0.1, 0.1), "figure")
+        self.scene.set_entity("figure", x=3.0, y=3.0, z=0.0)
+        self.assertIsNone(self.pick(0.1, 0.1))
+        self.assertEqual(self.pick(3.1, 3.1), "figure")
+        self.assertEqual(self.picker.rebuild_count, 1)
+        self.assertEqual(self.picker.refit_count, 1)
+
+    def test_moved_contur(self):
+        # плоскость z = 1 над фигурой
+        self.scene.add_point("p1", 2.0, 0.0, 1.0)
+        self.scene.add_point("p2", 3.0, 0.0, 1.0)
+        self.scene.add_point("p3", 2.0, 1.0, 1.0)
+        self.scene.add_plane_by_points("plane", "p1", "p2", "p3")
+        self.scene.add_contur_n_to_plane("plane", 4, 0.5)
+        self.assertEqual(self.pick(0.0, 0.0), "plane")
+        self.assertIsNone(self.pick(-2.0, -0.05, 0.01))
+        # треугольники плоскости обновлены refit-ом вслед за контуром
+        self.scene.set_entity(
+            "contur_point_plane_1", x=-3.0, y=0.0, z=0.0
+        )
+        self.assertEqual(self.pick(-2.0, -0.05, 0.01), "plane")
+        self.assertEqual(self.picker.rebuild_count, 1)
+        self.assertEqual(self.picker.refit_count, 1)
+
+    def test_added_entity(self):
+        self.pick(0.0, 0.0)
+        self.scene.add_point("d", 2.0, 2.0, 0.0)
+        self.assertEqual(self.pick(2.0, 2.0), "d")
+        self.assertEqual(self.picker.rebuild_count, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
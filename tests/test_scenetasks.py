@@ -0,0 +1,167 @@
+from src.Simple2DEditorImports import *
+import unittest
+import tempfile
+from PIL import Image
+from unittest.mock import MagicMock
+
+
+class TestTaskProgress(unittest.TestCase):
+    def test_report(self):
+        on_progress = MagicMock()
+        progress = TaskProgress(on_progress)
+        progress.report(0.5)
+        self.assertEqual(progress.fraction, 0.5)
+        on_progress.assert_called_once_with(0.5)
+
+    def test_cancel(self):
+        progress = TaskProgress()
+        progress.cancel()
+        with self.assertRaises(TaskCancelledException):
+            progress.report(0.5)
+
+
+class TestSceneTaskRunner(unittest.TestCase):
+    def setUp(self):
+        self.runner = SceneTaskRunner()
+
+    def tearDown(self):
+        self.runner.shutdown()
+
+    def test_done(self):
+        on_done = MagicMock()
+        on_progress = MagicMock()
+        task = self.runner.submit(
+            lambda progress: progress.report(0.3) or 42,
+            on_done, on_progress=on_progress
+        )
+        task.future.result()
+        on_done.assert_called_once_with(42)
+        self.assertEqual(
+            [el.args[0] for el in on_progress.call_args_list], [0.3, 1.0]
+        )
+
+    def test_error(self):
+        on_error = MagicMock()
+        task = self.runner.submit(
+            lambda progress: 1 / 0, on_error=on_error
+        )
+        task.future.result()
+        self.assertIsInstance(on_error.call_args.args[0], ZeroDivisionError)
+
+    def test_error_posted_later(self):
+        # как MainThreadInvoker: вызов уходит в очередь событий
+        posted = []
+        runner = SceneTaskRunner(posted.append)
+        self.addCleanup(runner.shutdown)
+        on_error = MagicMock()
+        task = runner.submit(lambda progress: 1 / 0, on_error=on_error)
+        task.future.result()
+        for function in posted:
+            function()
+        self.assertIsInstance(on_error.call_args.args[0], ZeroDivisionError)
+
+    def test_cancel(self):
+        started = threading.Event()
+        release = threading.Event()
+        on_done = MagicMock()
+        on_error = MagicMock()
+
+        def work(progress):
+            started.set()
+            release.wait()
+            progress.report(0.5)
+
+        task = self.runner.submit(work, on_done, on_error)
+        started.wait()
+        task.cancel()
+        release.set()
+        task.future.result()
+        on_done.assert_not_called()
+        self.assertIsInstance(
+            on_error.call_args.args[0], TaskCancelledException
+        )
+
+
+class TestSceneFileTasks(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.scene = Scene(MagicMock())
+        self.scene.add_prism_n("prism", 5, 1.0, 2.0)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def round_trip(self, suffix):
+        path = Path(self.directory.name) / ("scene" + suffix)
+        snapshot = snapshot_scene(self.scene, path)
+        write_scene_snapshot(snapshot, path, TaskProgress())
+        fractions = []
+        entities, store = read_entities_from_file(path, fractions.append)
+        self.assertEqual(list(entities), list(self.scene.entities))
+        self.assertIs(entities["pnt_upr_prism_1"].store, store)
+        self.assertEqual(fractions, sorted(fractions))
+        self.assertEqual(fractions[-1], 1.0)
+
+    def test_round_trip_s3d(self):
+        self.round_trip(".s3d")
+
+    def test_round_trip_pkl(self):
+        self.round_trip(".pkl")
+
+    def test_snapshot_is_consistent(self):
+        for suffix in (".s3d", ".pkl"):
+            with self.subTest(suffix=suffix):
+                scene = Scene(MagicMock())
+                scene.add_prism_n("prism", 5, 1.0, 2.0)
+                scene.add_point("a", 0.0, 0.0, 3.0)
+                scene.add_point("b", 1.0, 0.0, 3.0)
+                scene.add_point("c", 0.0, 1.0, 3.0)
+                scene.add_plane_by_points("plane", "a", "b", "c")
+                path = Path(self.directory.name) / ("scene" + suffix)
+                snapshot = snapshot_scene(scene, path)
+                # колонки и pickle собираются уже в фоне
+                self.assertIsInstance(snapshot, EntitiesCopy)
+                # правки после снимка, пока файл пишется в фоне
+                scene.set_entity("pnt_upr_prism_1", x=9.0, y=9.0, z=9.0)
+                scene.add_contur_n_to_plane("plane", 4, 1.0)
+                write_scene_snapshot(snapshot, path, TaskProgress())
+                entities, _ = read_entities_from_file(path)
+                self.assertNotEqual(entities["pnt_upr_prism_1"].x, 9.0)
+                self.assertEqual(entities["plane"].contur, [])
+                self.assertNotIn("contur_point_plane_1", entities)
+
+    def test_cancel_keeps_old_file(self):
+        path = Path(self.directory.name) / "scene.s3d"
+        self.scene.save_entities_to_file(path)
+        data = path.read_bytes()
+        progress = TaskProgress()
+        progress.cancel()
+        with self.assertRaises(TaskCancelledException):
+            write_scene_snapshot(
+                snapshot_scene(Scene(MagicMock()), path), path, progress
+            )
+        self.assertEqual(path.read_bytes(), data)
+        self.assertEqual(os.listdir(self.directory.name), ["scene.s3d"])
+
+    def test_replace_entities(self):
+        listener = MagicMock()
+        self.scene.add_listener(listener)
+        store = CoordinateStore()
+        entities = {"point": Point("point", 1.0, 2.0, 3.0, store)}
+        self.scene.replace_entities(entities, store)
+        self.assertIs(self.scene.entities, entities)
+        self.assertIs(self.scene.point_store, store)
+        self.assertTrue(listener.call_args.args[0].is_reset)
+
+    def test_encode_png(self):
+        path = Path(self.directory.name) / "frame.png"
+        buffer = bytes([255, 0, 0] * 2 + [0, 0, 255] * 2)
+        encode_png(buffer, 2, 2, path, TaskProgress())
+        image = Image.open(path)
+        self.assertEqual(image.size, (2, 2))
+        # строки кадра OpenGL идут снизу вверх
+        self.assertEqual(image.getpixel((0, 0)), (0, 0, 255))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,235 @@
+from src.Simple2DEditorImports import *
+import unittest
+import tempfile
+from unittest.mock import MagicMock, patch
+
+DRAWERS = sys.modules["src.ShapeOpenGLDrawers"]
+
+
+class TestDisplayListCache(unittest.TestCase):
+    def setUp(self):
+        self.gl = {
+            name: MagicMock()
+            for name in (
+                "glGenLists", "glNewList", "glEndList", "glCallList",
+                "glDeleteLists"
+            )
+        }
+        self.gl["glGenLists"].side_effect = iter(range(1, 100))
+        patcher = patch.multiple(DRAWERS, **self.gl)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.backend = MagicMock()
+        backend = using_draw_backend(self.backend)
+        backend.__enter__()
+        self.addCleanup(backend.__exit__, None, None, None)
+        self.cache = DisplayListCache()
+        self.scene = Scene(MagicMock())
+        self.scene.add_point("a", 0.0, 0.0, 0.0)
+        self.scene.add_point("b", 1.0, 0.0, 0.0)
+        self.scene.add_segment("segment", "a", "b")
+
+    def draw_frame(self):
+        self.cache.begin_frame()
+        for name, entity in self.scene.entities.items():
+            self.cache.draw(entity, self.scene.graph.version(name))
+
+    def test_compiled_once(self):
+        self.draw_frame()
+        self.draw_frame()
+        self.assertEqual(self.cache.compiled_count, 0)
+        self.assertEqual(self.cache.replayed_count, 3)
+        self.assertEqual(self.backend.draw_segment.call_count, 1)
+        self.gl["glCallList"].assert_any_call(
+            self.cache.lists["segment"][None][0]
+        )
+
+    def test_recompiled_on_version(self):
+        self.draw_frame()
+        self.scene.set_entity("b", x=2.0, y=0.0, z=0.0)
+        self.draw_frame()
+        self.assertEqual(self.cache.compiled_count, 2)
+        self.assertEqual(self.backend.draw_segment.call_count, 2)
+        self.assertEqual(self.gl["glGenLists"].call_count, 3)
+
+    def test_plane_recompiled_on_contur_move(self):
+        self.scene.add_point("c", 0.0, 1.0, 0.0)
+        self.scene.add_plane_by_points("plane", "a", "b", "c")
+        self.scene.add_contur_n_to_plane("plane", 4, 1.0)
+        self.draw_frame()
+        self.scene.set_entity("contur_point_plane_1", x=0.5, y=0.5, z=0.0)
+        self.draw_frame()
+        # точка, два ее отрезка и плоскость с контуром
+        self.assertEqual(self.cache.compiled_count, 4)
+        self.assertEqual(self.backend.draw_plane.call_count, 2)
+
+    def test_discard_deletes_next_frame(self):
+        self.draw_frame()
+        list_id = self.cache.lists["segment"][None][0]
+        self.cache.discard(["segment", "unknown"])
+        self.gl["glDeleteLists"].assert_not_called()
+        self.cache.begin_frame()
+        self.gl["glDeleteLists"].assert_called_once_with(list_id, 1)
+
+    def test_forget(self):
+        self.draw_frame()
+        self.cache.forget()
+        self.cache.flush()
+        self.gl["glDeleteLists"].assert_not_called()
+        self.draw_frame()
+        self.assertEqual(self.cache.compiled_count, 3)
+
+
+class TestRenderQueue(unittest.TestCase):
+    def setUp(self):
+        self.gl = {
+            name: MagicMock()
+            for name in (
+                "glGenLists", "glNewList", "glEndList", "glCallList",
+                "glDeleteLists", "glEnable", "glDisable", "glMaterialfv",
+                "glBegin", "glEnd", "glVertex3fv", "glNormal3fv",
+                "glColor3fv", "glLightfv"
+            )
+        }
+        self.gl["glGenLists"].side_effect = iter(range(1, 100))
+        patcher = patch.multiple(DRAWERS, **self.gl)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.queue = RenderQueue()
+        self.scene = Scene(MagicMock())
+        self.scene.add_light("light", 16384, 100.0, 100.0, 100.0)
+        self.scene.add_figure2_n("first", 4, 1.0)
+        self.scene.add_point("a", 0.0, 0.0, 0.0)
+        self.scene.add_point("b", 1.0, 0.0, 0.0)
+        self.scene.add_segment("segment", "a", "b")
+        self.scene.add_figure2_n("second", 3, 1.0)
+
+    def draw_frame(self, display_lists=None, profiler=None):
+        with using_draw_backend(self.queue):
+            for name, entity in self.scene.entities.items():
+                self.queue.begin_entity(
+                    name, self.scene.graph.version(name), entity
+                )
+                entity.draw_shape()
+        return self.queue.flush(display_lists, profiler)
+
+    def test_material_set_once(self):
+        stats = self.draw_frame()
+        # две грани с одним материалом вперемешку с линиями и точками
+        self.assertEqual(stats["material changes"], 1)
+        self.assertEqual(self.gl["glMaterialfv"].call_count, 4)
+        self.assertEqual(self.gl["glDisable"].call_count, 1)
+        self.assertEqual(self.gl["glEnable"].call_count, 2)
+        self.assertEqual(stats["lighting changes"], 3)
+        self.assertGreater(stats["elided changes"], 0)
+
+    def test_sorted_by_state(self):
+        order = []
+        for name in ("glLightfv", "glNormal3fv", "glColor3fv"):
+            self.gl[name].side_effect = (
+                lambda *args, name=name: order.append(name)
+            )
+        self.draw_frame()
+        # свет, затем все освещенные грани, затем линии и точки
+        self.assertEqual(order[0], "glLightfv")
+        last_normal = len(order) - 1 - order[::-1].index("glNormal3fv")
+        self.assertLess(last_normal, order.index("glColor3fv"))
+        self.assertEqual(self.queue.items, [])
+
+    def test_entity_costs(self):
+        profiler = FrameProfiler()
+        profiler.set_enabled(True)
+        profiler.begin_frame(1)
+        self.draw_frame(profiler=profiler)
+        profiler.end_frame()
+        frame = profiler.frames[-1]
+        self.assertEqual(set(frame.entities), set(self.scene.entities))
+        self.assertEqual(frame.entities["first"][0], "Figure2")
+        # время уже внутри фазы очереди
+        self.assertEqual(dict(frame.phases), dict())
+
+    def test_lighting_restored(self):
+        self.scene = Scene(MagicMock())
+        self.scene.add_point("point", 0.0, 0.0, 0.0)
+        self.draw_frame()
+        self.gl["glEnable"].assert_called_once_with(GL_LIGHTING)
+
+    def test_display_lists(self):
+        cache = DisplayListCache()
+        cache.begin_frame()
+        self.draw_frame(cache)
+        cache.begin_frame()
+        self.draw_frame(cache)
+        self.assertEqual(cache.compiled_count, 0)
+        self.assertEqual(
+            cache.replayed_count, self.gl["glGenLists"].call_count
+        )
+        cache.discard(["first"])
+        cache.begin_frame()
+        self.assertEqual(self.gl["glDeleteLists"].call_count, 2)
+
+
+class TestRenderModeToggle(unittest.TestCase):
+    def setUp(self):
+        os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+        self.application = (
+            QApplication.instance() or QApplication(sys.argv[:1])
+        )
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.settings = QtCore.QSettings(
+            str(Path(self.directory.name) / "settings.ini"),
+            QtCore.QSettings.IniFormat
+        )
+
+    def test_modes_reachable_from_dock(self):
+        window = MainWindow(settings=self.settings)
+        glwidget = window.openGL_widget
+        self.assertTrue(glwidget.retained_rendering)
+        window.render_mode_box.setCurrentText("Очередь + списки")
+        self.assertFalse(glwidget.retained_rendering)
+        self.assertTrue(glwidget.use_render_queue)
+        self.assertTrue(glwidget.use_display_lists)
+        window.render_mode_box.setCurrentText("Напрямую")
+        self.assertFalse(glwidget.use_render_queue)
+        self.assertFalse(glwidget.use_display_lists)
+        window.render_mode_box.setCurrentText("Буферы")
+        self.assertTrue(glwidget.retained_rendering)
+
+
+class TestLoadUi(unittest.TestCase):
+    def setUp(self):
+        os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+        self.application = (
+            QApplication.instance() or QApplication(sys.argv[:1])
+        )
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.ui_path = Path(self.directory.name) / "form.ui"
+        self.ui_path.write_bytes(UI_PATH.read_bytes())
+        self.cache_path = (
+            self.ui_path.parent / "__pycache__" / "form_ui.py"
+        )
+
+    def test_compiled_once(self):
+        load_ui(QMainWindow(), self.ui_path)
+        self.assertTrue(self.cache_path.exists())
+        with patch.object(uic, "compileUi") as compile_ui:
+            window = QMainWindow()
+            load_ui(window, self.ui_path)
+        compile_ui.assert_not_called()
+        self.assertIsNotNone(window.statusbar)
+
+    def test_failed_compile_leaves_no_cache(self):
+        def compile_ui(ui_file, f):
+            f.write("class Ui_")
+            raise KeyboardInterrupt
+
+        with patch.object(uic, "compileUi", side_effect=compile_ui):
+            with self.assertRaises(KeyboardInterrupt):
+                load_ui(QMainWindow(), self.ui_path)
+        self.assertEqual(list(self.cache_path.parent.iterdir()), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,104 @@
+from src.SceneCli import *
+import unittest
+import tempfile
+import io
+from contextlib import redirect_stdout
+from PIL import Image
+
+CAMERA = (0.0, math.pi / 3, 5.0)
+
+
+class TestSoftwareRasterizer(unittest.TestCase):
+    def setUp(self):
+        self.rasterizer = SoftwareRasterizer(32, 32)
+
+    def render(self, scene):
+        buffer, width, height = self.rasterizer.render(scene.entities, CAMERA)
+        return np.frombuffer(buffer, dtype=np.uint8).reshape(height, width, 3)
+
+    def test_empty_scene(self):
+        image = self.render(Scene())
+        self.assertTrue((image == 77).all())
+
+    def test_origin_in_center(self):
+        self.rasterizer.set_camera(*CAMERA)
+        clip = self.rasterizer.project([[0.0, 0.0, 0.0]])
+        window = self.rasterizer.to_window(clip)[0]
+        self.assertAlmostEqual(window[0], 16.0)
+        self.assertAlmostEqual(window[1], 16.0)
+
+    def test_lighting_matches_opengl(self):
+        scene = Scene()
+        scene.add_figure2_n("figure", 4, 1.0)
+        image = self.render(scene)
+        # значения сняты с окна редактора для той же грани
+        self.assertEqual(image[16, 16].tolist(), [37, 37, 165])
+
+    def test_deterministic(self):
+        scene = Scene()
+        scene.add_light("light", 16384, 100.0, 100.0, 100.0)
+        scene.add_sphere_nm("sphere", 12, 8, 1.0)
+        first = self.rasterizer.render(scene.entities, CAMERA)
+        second = SoftwareRasterizer(32, 32).render(scene.entities, CAMERA)
+        self.assertEqual(first, second)
+
+    def test_string_light_id_ignored(self):
+        scene = Scene()
+        scene.add_light("light", "lamp", 100.0, 100.0, 100.0)
+        scene.add_figure2_n("figure", 4, 1.0)
+        image = self.render(scene)
+        self.assertEqual(image[16, 16].tolist(), [37, 37, 165])
+
+    def test_depth(self):
+        self.rasterizer.set_camera(*CAMERA)
+        far = [[-2.0, -2.0, 0.0], [2.0, -2.0, 0.0], [0.0, 2.0, 0.0]]
+        near = [[x, y, 1.0] for x, y, _ in far]
+        self.rasterizer.add_triangles(near, [0.0, 1.0, 0.0])
+        self.rasterizer.add_triangles(far, [1.0, 0.0, 0.0])
+        image = self.rasterizer.rasterize()
+        self.assertEqual(image[16, 16].tolist(), [0, 255, 0])
+
+    def test_infinite_plane(self):
+        scene = Scene()
+        scene.add_point("a", 1.0, 0.0, 0.0)
+        scene.add_point("b", 0.0, 1.0, 0.0)
+        scene.add_point("c", 0.0, 0.0, 0.0)
+        scene.add_plane_by_points("plane", "a", "b", "c")
+        image = self.render(scene)
+        # плоскость за ближней плоскостью отсечения обрезается
+        self.assertFalse((image[0, 0] == 77).all())
+        self.assertFalse((image[31, 31] == 77).all())
+
+    def test_point(self):
+        scene = Scene()
+        scene.add_point("point", 0.0, 0.0, 0.0)
+        image = self.render(scene)
+        self.assertEqual(image[16, 16].tolist(), [255, 0, 0])
+        self.assertEqual(image[0, 0].tolist(), [77, 77, 77])
+
+    def test_using_draw_backend(self):
+        backend = sys.modules["src.BasicShapes"].draw_backend
+        with using_draw_backend(self.rasterizer):
+            self.assertIs(get_draw_backend(), self.rasterizer)
+        self.assertIs(sys.modules["src.BasicShapes"].draw_backend, backend)
+
+
+class TestSoftwareRender(unittest.TestCase):
+    def test_render_command(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / "prism.s3d"
+            scene = Scene()
+            scene.add_prism_n("prism", 6, 1.0, 1.0)
+            scene.save_entities_to_file(path)
+            with redirect_stdout(io.StringIO()):
+                code = main([
+                    "render", "--backend", "software", "--width", "40",
+                    "--height", "30", str(path)
+                ])
+            self.assertEqual(code, 0)
+            image = Image.open(path.with_suffix(".png"))
+            self.assertEqual(image.size, (40, 30))
+
+
+if __name__ == '__main__':
+    unittest.main()